@@ -7,6 +7,10 @@ from tframe.base_strategy import BaseStrategy, StrategyTrigger
 from tframe.tframe import TContext
 from datetime import datetime
 from tframe.strategyinfo.backtesting_strategyinfo import BacktestingStrategyInfo
+from tframe.backtest.backtest_recorder import BacktestRecorder
+
+# 回测结果导出目录，为 None 时不导出，设置后导出 parquet 文件(需要安装 pyarrow)
+EXPORT_DIR = None
 
 class BacktestStrategy(BaseStrategy):
     def __init__(self):
@@ -47,7 +51,6 @@ class BacktestStrategy(BaseStrategy):
     # 交易分钟结束时的回调函数
     def AfterTradeMinute(self, time: datetime, context: TContext):
         logging.info(f"交易分钟结束: {time}")
-        logging.warn(f"总资产: {context.accontinfo.TotalValue()}, time: {time}")
         pass
 
 if __name__ == "__main__":
@@ -62,6 +65,8 @@ if __name__ == "__main__":
     strategyinfo.SetStrategyName("test")
     # 设置策略基准指数
     strategyinfo.SetStrategyBenchmarkIndex("000001.SH")
+    # 设置策略股票池后，回测只在股票池内有 bar 的分钟调用 AfterTradeMinute
+    strategyinfo.SetStrategyUniverse(["000001.SZ"])
 
     # 创建TContext
     context = TContextFactory.CreateTContext("backtest", strategyinfo)
@@ -73,7 +78,16 @@ if __name__ == "__main__":
     
     # 初始化时间管理器
     context.timemanager.AddTimeMethod(trigger)
+    # 记录总资产曲线和成交，需要放在策略之后
+    recorder = BacktestRecorder(context.accontinfo, context.timemanager.GetTradeDays(),
+                                strategyinfo.GetStrategyBenchmarkIndex())
+    context.accontinfo.AddOrderObserver(recorder)
+    context.timemanager.AddTimeMethod(recorder)
     # 运行时间管理器
     context.timemanager.TimeLoop()
 
+    logging.warning(f"回测结果: {recorder.GetStats()}")
+    if EXPORT_DIR:
+        recorder.ExportParquet(EXPORT_DIR)
+
     
\ No newline at end of file
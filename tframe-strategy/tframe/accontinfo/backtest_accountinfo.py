@@ -1,12 +1,20 @@
+import gzip
 import logging
+import os
+import pickle
+import numpy as np
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from datetime import datetime
-from tframe.accontinfo.base_accontinfo import BaseAccount, BasePosition, BaseOrder, OrderStatus
+from datetime import datetime, date
+from tframe.accontinfo.base_accontinfo import BaseAccount, BasePosition, BaseOrder, OrderStatus, LOT_SIZE, \
+    NormalizeTargetWeights, ComputeRebalanceAmounts, FitBuyAmounts
+from tframe.accontinfo.backtest_matching_engine import BacktestMatchingEngine
+from tframe.accontinfo.backtest_book import OrderBook, PositionBook
 from tframe.stockdata.base_stockdata import BaseStockData, BaseSingleStockData
-from tframe.timemanager.base_timemanager import TimeMethod, BaseTimeManager
+from tframe.timemanager.base_timemanager import TimeMethod, BaseTimeManager, FREQ_1M, FREQ_DAILY, \
+    EVENT_BEFORE_TRADE_DAY, EVENT_ON_TRADE_DAY_START, EVENT_ON_TRADE_DAY_END, EVENT_AFTER_TRADE_DAY, EVENT_AFTER_TRADE_MINUTE
 
-LOT_SIZE = 100  # A股的最小交易单位
+SNAPSHOT_VERSION = 1    # 检查点格式版本
 
 
 
@@ -93,10 +101,18 @@ class PositionObserver(ABC):
 
 
 # 回测订单类
+# 数值字段是普通属性，逐个订单访问时没有额外开销
+# _frozen_cash 和 _status 同时写入 OrderBook 中对应槽位的列，供冻结资金、按状态筛选等按列汇总使用
+# 不传 book 时订单不在任何订单表中，加入订单管理器时通过 _MoveTo 分配槽位
 class BacktestOrder(BaseOrder):
     _order_code: str
     _last_update_time: datetime
-    def __init__(self, order_code: str, stock_id: str, amount: int, create_time: datetime, price: float = None):
+    _book: OrderBook
+    _slot: int
+    def __init__(self, order_code: str, stock_id: str, amount: int, create_time: datetime, price: float = None,
+                 book: OrderBook = None):
+        self._book = None
+        self._slot = -1
         self._order_code = order_code
         self._last_update_time = create_time
         self._stock_id = stock_id
@@ -110,10 +126,68 @@ class BacktestOrder(BaseOrder):
             self._frozen_cash = amount * price
         else:
             self._frozen_cash = 0
+        if book is not None:
+            self._MoveTo(book)
+
+    @property
+    def _frozen_cash(self) -> float:
+        return self.__frozen_cash
+
+    @_frozen_cash.setter
+    def _frozen_cash(self, value: float):
+        self.__frozen_cash = value
+        if self._book is not None:
+            self._book.Column('frozen_cash')[self._slot] = value
+
+    @property
+    def _status(self) -> OrderStatus:
+        return self.__status
+
+    @_status.setter
+    def _status(self, value: OrderStatus):
+        self.__status = value
+        if self._book is not None:
+            self._book.Column('status')[self._slot] = value.value
+
+    # 是否在当日订单集合中，用于 OrderBook 按列汇总冻结资金
+    def _SetLive(self, live: bool):
+        self._book.Column('live')[self._slot] = live
+
+    # 将订单移到另一个订单表，释放原来的槽位
+    def _MoveTo(self, book: OrderBook):
+        if book is self._book:
+            return
+        live = False
+        if self._book is not None:
+            live = bool(self._book.Column('live')[self._slot])
+            self._book.Free(self._slot)
+        self._book, self._slot = book, book.Allocate()
+        book.Column('frozen_cash')[self._slot] = self.__frozen_cash
+        book.Column('status')[self._slot] = self.__status.value
+        book.Column('live')[self._slot] = live
 
     def GetOrderCode(self):
         return self._order_code
 
+    # 导出订单状态，只包含基础类型，便于序列化
+    def GetSnapshot(self) -> tuple:
+        return (self._order_code, self._stock_id, self._amount, self._create_time, self._price,
+                self._status.name, self._filled_amount, self._average_filled_price, self._frozen_cash,
+                self._last_update_time)
+
+    # 从导出的状态恢复订单，订单放入 book 中
+    @staticmethod
+    def FromSnapshot(snapshot: tuple, book: OrderBook) -> 'BacktestOrder':
+        order = BacktestOrder.__new__(BacktestOrder)
+        order._book = None
+        order._slot = -1
+        (order._order_code, order._stock_id, order._amount, order._create_time, order._price,
+         status, order._filled_amount, order._average_filled_price, order._frozen_cash,
+         order._last_update_time) = snapshot
+        order._status = OrderStatus[status]
+        order._MoveTo(book)
+        return order
+
 # 订单管理器
 class BacktestOrderManager(TimeMethod):
     __history_order_set: dict[str, BacktestOrder]       # 历史订单（不参与持仓计算）
@@ -124,16 +198,20 @@ class BacktestOrderManager(TimeMethod):
     __position_manager: 'BacktestPositionManager'
     __order_observers: list[OrderObserver] = []         # 观察者列表
     __order_validator_manager: OrderValidatorManager
+    __matching_engine: BacktestMatchingEngine
+    __order_book: OrderBook                             # 当日订单和历史订单的数值字段
 
     def __init__(self, account_info: 'BacktestAccount', base_stockdata: BaseStockData):
         """初始化订单管理器"""
         self.__account_info = account_info
         self.__base_stockdata = base_stockdata
+        self.__matching_engine = BacktestMatchingEngine(base_stockdata)
         
         # 初始化订单集合
         self.__order_set = {}               # 当日订单
         self.__history_order_set = {}       # 历史订单
         self.__order_observers = []         # 观察者列表
+        self.__order_book = OrderBook()
         
         # 创建验证器管理器
         self.__order_validator_manager = OrderValidatorManager()    # 初始化订单验证器管理器, 后期改成依赖注入的形式
@@ -148,17 +226,23 @@ class BacktestOrderManager(TimeMethod):
 
     def CreateOrder(self, stock_id: str, amount: int, create_time: datetime, price: float = None) -> str:
         order_code = f"{stock_id}_{create_time.strftime('%Y%m%d%H%M%S')}_{amount}"
-        order = BacktestOrder(order_code, stock_id, amount, create_time, price)
+        order = BacktestOrder(order_code, stock_id, amount, create_time, price, self.__order_book)
         result = self.Validate(order)
         if not result.is_valid:
             logging.error(f"订单{order_code}，创建失败: {result.message}")
+            self.__order_book.Free(order._slot)
             return None
         self.__order_set[order.GetOrderCode()] = order
+        order._SetLive(True)
 
         for observer in self.__order_observers:
             observer.OnOrderCreate(order, amount, price)
 
         return order.GetOrderCode()
+
+    # 只需要在每分钟结束时撮合订单
+    def GetSubscriptions(self) -> dict[str, str]:
+        return {EVENT_AFTER_TRADE_MINUTE: FREQ_1M}
     
     # 交易开始时的回调函数
     def TradeInit(self, time: datetime):
@@ -184,48 +268,48 @@ class BacktestOrderManager(TimeMethod):
     def AfterTradeMinute(self, time: datetime):
         self.UpdateOrderStatus(time)
 
-    # 更新订单状态
-    def UpdateOrderStatus(self, time: datetime):
-        for order in self.__order_set.values():
-            # 如果 order 的创建时间不为今天，则将它变为CANCELLED
-            order._last_update_time = time
+    # 将非当日创建的订单撤销并移入历史订单
+    def _ExpireOrders(self, time: datetime):
+        for order in list(self.__order_set.values()):
             if order.GetCreateTime().date() != time.date():
+                unfilled = order.GetUnfilledAmount() if order._status in (OrderStatus.PENDING, OrderStatus.ACTIVE) else 0
+                self.__account_info._ReleaseFrozenCash(order)
                 order._status = OrderStatus.CANCELLED
+                order._SetLive(False)
                 self.__order_set.pop(order.GetOrderCode())
                 self.__history_order_set[order.GetOrderCode()] = order
-                logging.info(f"订单 {order._order_code} 已过期撤销")
-                continue
-            if order._status == OrderStatus.COMPLETED:
-                continue
-            if order._status == OrderStatus.FAILED:
-                continue
-            if order._status == OrderStatus.CANCELLED:
-                continue
+                if unfilled != 0:
+                    logging.warning(f"订单 {order._order_code} 已过期撤销，未成交 {unfilled} 股")
+                else:
+                    logging.info(f"订单 {order._order_code} 已过期撤销")
+
+    # 通知观察者订单成交
+    def _NotifyOrderFilled(self, order: 'BacktestOrder', filled_amount: int, price: float):
+        if filled_amount != 0:
+            for observer in self.__order_observers:
+                observer.OnOrderUpdate(order, filled_amount, price)
+
+        if order._status == OrderStatus.COMPLETED:
+            for observer in self.__order_observers:
+                observer.OnOrderCompleted(order, filled_amount, price)
+
+    # 获取股票数据
+    def _GetStockData(self) -> BaseStockData:
+        return self.__base_stockdata
+
+    # 更新订单状态，按股票分组撮合，每只股票每分钟只读取一次 bar
+    def UpdateOrderStatus(self, time: datetime):
+        self._ExpireOrders(time)
+        for order in self.__order_set.values():
+            order._last_update_time = time
 
-            # 获取订单对应股票的1分钟级别数据, 更新订单信息，这里可能在 time 处遍历两次，不过一般不会影响最终结果
-            df = self.__base_stockdata[order._stock_id].Get1MinBars(order._last_update_time, time).get_dataframe()
-            # 从 df 的末尾开始遍历
-            for i in range(len(df)-1, -1, -1):
-                row = df.iloc[i]
-                if abs(order._filled_amount) >= abs(order._amount):
-                    break
-                
-                # 暂时使用收盘价作为成交价，后续需要修改
-                # 成交量的1/2为可买到的量
-                price = float(row['close'])
-                filled_amount = order.Fill(int(row['volume']/2)*100, price)
-                if filled_amount != 0:
-                    logging.warn(f"订单 {order._order_code} 在 {df['date'][i]} {df['time'][i]} 成交 {filled_amount} 股， 剩余 {order._amount - order._filled_amount} 股，成交价 {price}")
-                    for observer in self.__order_observers:
-                        observer.OnOrderUpdate(order, filled_amount, price)
-
-                if order._status == OrderStatus.COMPLETED:
-                    for observer in self.__order_observers:
-                        observer.OnOrderCompleted(order, filled_amount, price)
-                    
-                
+        for order, filled_amount, price in self.__matching_engine.Match(list(self.__order_set.values()), time):
+            logging.warning(f"订单 {order._order_code} 在 {time} 成交 {filled_amount} 股， 剩余 {order._amount - order._filled_amount} 股，成交价 {price}")
+            self._NotifyOrderFilled(order, filled_amount, price)
 
     def SetOrder(self, order: 'BacktestOrder'):
+        order._MoveTo(self.__order_book)
+        order._SetLive(True)
         self.__order_set[order.GetOrderCode()] = order
 
     def GetOrder(self, order_code: str):
@@ -234,57 +318,133 @@ class BacktestOrderManager(TimeMethod):
     def GetOrderSet(self):
         return self.__order_set
 
+    # 当日订单的冻结资金合计，按 OrderBook 的列求和
     def GetFrozenCash(self):
-        frozen_cash = 0
-        for order in self.__order_set.values():
-            frozen_cash += order._frozen_cash
-        return frozen_cash
+        return self.__order_book.GetFrozenCash()
+
+    # 导出当日订单和历史订单
+    def GetSnapshot(self) -> dict:
+        return {
+            'orders': [order.GetSnapshot() for order in self.__order_set.values()],
+            'history_orders': [order.GetSnapshot() for order in self.__history_order_set.values()],
+        }
+
+    # 从导出的状态恢复订单，会覆盖现有订单
+    def LoadSnapshot(self, snapshot: dict):
+        self.__order_set = {}
+        self.__history_order_set = {}
+        self.__order_book = OrderBook()
+        for order_snapshot in snapshot['orders']:
+            order = BacktestOrder.FromSnapshot(order_snapshot, self.__order_book)
+            order._SetLive(True)
+            self.__order_set[order.GetOrderCode()] = order
+        for order_snapshot in snapshot['history_orders']:
+            order = BacktestOrder.FromSnapshot(order_snapshot, self.__order_book)
+            self.__history_order_set[order.GetOrderCode()] = order
+
+# 日线订单管理器，按日线 OHLC 撮合，不依赖1分钟数据
+# 09:31 之前提交的订单在 OnTradeDayStart 按开盘价撮合，开盘价不满足限价的订单和之后提交的订单在 AfterTradeDay 撮合
+# 开盘撮合时当天的最高/最低价还未知，只看开盘价；收盘撮合时限价单在当日最高/最低价覆盖限价时按限价成交
+# 每个订单每天最多成交当日成交量的 1/2，开盘和收盘两次撮合共用这个额度
+class BacktestDailyOrderManager(BacktestOrderManager):
+    def __init__(self, account_info: 'BacktestAccount', base_stockdata: BaseStockData):
+        super().__init__(account_info, base_stockdata)
+        self.__filled_day: date = None
+        self.__filled_today: dict[str, int] = {}    # 订单编号 -> 当天已成交数量(绝对值)
+
+    # 只在开盘和收盘后撮合订单
+    def GetSubscriptions(self) -> dict[str, str]:
+        return {EVENT_ON_TRADE_DAY_START: FREQ_DAILY, EVENT_AFTER_TRADE_DAY: FREQ_DAILY}
+
+    # 交易日开始时(09:31:00)按开盘价撮合
+    def OnTradeDayStart(self, time: datetime):
+        self._ExpireOrders(time)
+        self.UpdateOrderStatus(time, 'open')
+
+    # 交易日结束时按收盘价撮合
+    def AfterTradeDay(self, time: datetime):
+        self.UpdateOrderStatus(time, 'close')
+
+    # 日线模式没有分钟事件
+    def AfterTradeMinute(self, time: datetime):
+        pass
+
+    # 根据日线数据计算订单成交价，无法成交时返回 None
+    # 只有收盘撮合可以使用当日最高/最低价
+    @staticmethod
+    def _MatchPrice(order: BacktestOrder, bar: dict, price_field: str) -> float:
+        price = bar[price_field]
+        limit = order.GetPrice()
+        if limit is None:
+            return price
+        if order.GetAmount() > 0:
+            if price <= limit:
+                return price
+            if price_field == 'close' and bar['low'] <= limit:
+                return limit
+        else:
+            if price >= limit:
+                return price
+            if price_field == 'close' and bar['high'] >= limit:
+                return limit
+        return None
+
+    # 更新订单状态
+    def UpdateOrderStatus(self, time: datetime, price_field: str = 'close'):
+        if self.__filled_day != time.date():
+            self.__filled_day = time.date()
+            self.__filled_today = {}
+        for order in self.GetOrderSet().values():
+            if order._status in (OrderStatus.COMPLETED, OrderStatus.FAILED, OrderStatus.CANCELLED):
+                continue
+            # 开盘撮合只处理开盘前提交的订单
+            if price_field == 'open' and order.GetCreateTime() > time:
+                continue
+            order._last_update_time = time
+
+            bar = self._GetStockData()[order._stock_id].GetDailyBar(time.date())
+            if bar is None:     # 停牌
+                continue
+            price = self._MatchPrice(order, bar, price_field)
+            if price is None:
+                continue
+
+            # 成交量的1/2为可买到的量，扣除当天开盘时已成交的部分
+            filled_before = self.__filled_today.get(order._order_code, 0)
+            allowance = int(bar['volume']/2)*100 - filled_before
+            if allowance <= 0:
+                continue
+            filled_amount = order.Fill(min(allowance, abs(order.GetUnfilledAmount())), price)
+            if filled_amount != 0:
+                self.__filled_today[order._order_code] = filled_before + abs(filled_amount)
+                logging.info(f"订单 {order._order_code} 在 {time.date()} 成交 {filled_amount} 股， 剩余 {order._amount - order._filled_amount} 股，成交价 {price}")
+            self._NotifyOrderFilled(order, filled_amount, price)
 
 # 持仓类
+# 持仓数量、成本价、当前价存储在 PositionBook 的列中，持仓对象是某个槽位的视图
+# 清理空仓后槽位会被其他股票复用，此后再访问旧的持仓对象会抛出 ValueError
 class BacktestPosition(BasePosition):
-    __stock_id: str     # 证券代码
-    __stock_name: str   # 证券名称
-    __amount: int      # 持仓数量
-    __cost_price: float # 成本价
-    __buy_time: datetime # 买入时间
-    __current_price: float # 当前价
-    __market_value: float # 市值
-    __profit: float # 盈亏
-    __profit_rate: float # 盈亏率
-    __today_profit: float # 当日盈亏
-    __today_profit_rate: float # 当日盈亏率
-    __base_stockdata: BaseStockData # 股票数据
-
-    # 初始化持仓信息
-    # 由于是回测，所以需要传入初始时间
-    def __init__(self, stock_id : str, amount : int, cost_price : float, time : datetime, base_stockdata: BaseStockData):
+    __book: PositionBook    # 持仓表
+    __slot: int             # 槽位
+    __generation: int       # 创建视图时槽位的代数
+    __stock_id: str         # 证券代码
+    __stock_name: str       # 证券名称
+    __buy_time: datetime    # 买入时间
+
+    # 回测数据没有证券名称时使用证券代码
+    def __init__(self, book: PositionBook, stock_id: str, time: datetime, stock_name: str = None):
+        self.__book = book
+        self.__slot = book.GetSlot(stock_id)
+        self.__generation = book.GetGeneration(self.__slot)
         self.__stock_id = stock_id
-        self.__amount = amount
-        self.__cost_price = cost_price
+        self.__stock_name = stock_name if stock_name is not None else stock_id
         self.__buy_time = time
-        self.__base_stockdata = base_stockdata
-        self.__current_price = self.__base_stockdata[self.__stock_id].GetCurrentPrice(time)
-        self.__market_value = self.__amount * self.__current_price
-        self.__profit = 0
-        self.__profit_rate = 0
-        self.__today_profit = 0
-        self.__today_profit_rate = 0
-        
-    # 更新持仓信息
-    # 由于是回测，所以需要传入当前时间，会根据当前时间计算当前价格和收益
-    def Update(self, delta_amount: int, price: float, time: datetime):
-        if self.__amount + delta_amount == 0:
-            self.__cost_price = 0
-            self.__profit_rate = 0
-        else:
-            self.__cost_price = (self.__cost_price * self.__amount + delta_amount * price) / (self.__amount + delta_amount)
-            self.__profit_rate = self.__profit / (self.__cost_price * self.__amount)
-        self.__amount += delta_amount
-        self.__current_price = self.__base_stockdata[self.__stock_id].GetCurrentPrice(time)
-        self.__market_value = self.__amount * self.__current_price
-        self.__profit = (self.__current_price - self.__cost_price) * self.__amount
-        self.__today_profit = 0
-        self.__today_profit_rate = 0
+
+    # 读取本持仓的某一列
+    def __Get(self, name: str):
+        if not self.__book.IsValid(self.__slot, self.__generation):
+            raise ValueError(f"Position {self.__stock_id} has been removed")
+        return self.__book.Column(name)[self.__slot]
 
     # 获取证券代码
     def StockId(self):
@@ -296,60 +456,96 @@ class BacktestPosition(BasePosition):
 
     # 获取持仓数量
     def Amount(self):
-        return self.__amount
+        return int(self.__Get('amount'))
 
     # 获取可卖数量
     def SellableAmount(self):
-        return self.__amount
+        return self.Amount()
 
     # 获取成本价
     def CostPrice(self):
-        return self.__cost_price
+        return float(self.__Get('cost_price'))
 
     # 获取当前价
     def CurrentPrice(self):
-        return self.__current_price
+        return float(self.__Get('current_price'))
 
     # 获取当前市值
     def MarketValue(self):
-        return self.__market_value
+        return self.Amount() * self.CurrentPrice()
 
     # 获取持仓盈亏
     def Profit(self):
-        return self.__profit
+        return (self.CurrentPrice() - self.CostPrice()) * self.Amount()
 
     # 获取持仓盈亏率
     def ProfitRate(self):
-        return self.__profit_rate
+        cost = self.CostPrice() * self.Amount()
+        return self.Profit() / cost if cost != 0 else 0
 
     # 获取当日盈亏
     def TodayProfit(self):
-        return self.__today_profit
+        return 0
 
     # 获取当日盈亏率
     def TodayProfitRate(self):
-        return self.__today_profit_rate
+        return 0
 
 # 持仓集合类
+# 持仓的数值字段存储在 PositionBook 中，__position_set 保存各持仓的视图
 class BacktestPositionManager(OrderObserver, TimeMethod):
     __position_set: dict[str, BacktestPosition]
     # 每天根据 Order 成交情况更新持仓
     __order_set: BacktestOrderManager
     __base_stockdata: BaseStockData
     __account_info: 'BacktestAccount'
-    __position_observers: list[PositionObserver] = []
-    __position_set: dict[str, BacktestPosition]
+    __position_observers: list[PositionObserver]
+    __position_book: PositionBook
     def __init__(self, account_info: 'BacktestAccount', order_set: BacktestOrderManager, base_stockdata: BaseStockData):
         self.__account_info = account_info
         self.__order_set = order_set
         self.__base_stockdata = base_stockdata
         self.__position_set = {}
+        self.__position_book = PositionBook()
+        self.__position_observers = []      # 观察者列表，每个实例独立，避免多个账户之间互相串扰
+        self.__version = 0                  # 持仓变化(成交、恢复)时加一
+        self.__valuation: tuple = None      # 最近一次估值 (time, version, 持仓市值)
 
     def AddPositionObserver(self, observer: PositionObserver):
         self.__position_observers.append(observer)
 
     def GetPositionSet(self) -> dict[str, BacktestPosition]:
         return self.__position_set
+
+    # 直接设置持仓，用于从检查点恢复
+    def SetPosition(self, stock_id: str, amount: int, cost_price: float, time: datetime):
+        self._AddPosition(stock_id, amount, cost_price, time)
+        self.__version += 1
+
+    # 在持仓表中添加持仓并创建视图
+    def _AddPosition(self, stock_id: str, amount: int, cost_price: float, time: datetime):
+        current_price = self.__base_stockdata[stock_id].GetCurrentPrice(time)
+        self.__position_book.Add(stock_id, amount, cost_price, current_price)
+        self.__position_set[stock_id] = BacktestPosition(self.__position_book, stock_id, time)
+
+    # 导出持仓 [(证券代码, 持仓数量, 成本价)]，当前价在恢复时重新获取
+    def GetSnapshot(self) -> list[tuple[str, int, float]]:
+        return [(position.StockId(), position.Amount(), position.CostPrice())
+                for position in self.__position_set.values()]
+
+    # 从导出的状态恢复持仓，会覆盖现有持仓，旧的持仓对象失效
+    def LoadSnapshot(self, snapshot: list[tuple[str, int, float]], time: datetime):
+        for stock_id in self.__position_book.GetStockIds():
+            self.__position_book.Remove(stock_id)
+        self.__position_set = {}
+        self.__position_book = PositionBook()
+        self.__version += 1
+        for stock_id, amount, cost_price in snapshot:
+            self.SetPosition(stock_id, amount, cost_price, time)
+
+    # 只需要在交易日结束时清理空仓
+    def GetSubscriptions(self) -> dict[str, str]:
+        return {EVENT_AFTER_TRADE_DAY: FREQ_DAILY}
     
     # 交易开始时的回调函数
     def TradeInit(self, time: datetime):
@@ -371,33 +567,35 @@ class BacktestPositionManager(OrderObserver, TimeMethod):
     def AfterTradeMinute(self, time: datetime):
         pass
 
-    # 更新持仓信息
-    def UpdatePosition(self, time: datetime):
-        for position in self.__position_set.values():
-            position.Update(0, 0, time)
-
-    # 交易日结束时更新持仓信息
+    # 按 time 的价格更新持仓市值，返回持仓总市值
+    # 同一时间、持仓没有变化时直接返回上一次的结果，否则用一次 GetPrices 批量获取全部持仓的价格
+    def UpdatePosition(self, time: datetime) -> float:
+        if self.__valuation is not None and self.__valuation[:2] == (time, self.__version):
+            return self.__valuation[2]
+        book = self.__position_book
+        book.SetPrices(book.GetSlots(), self.__base_stockdata.GetPrices(book.GetStockIds(), time))
+        market_value = book.MarketValue()
+        self.__valuation = (time, self.__version, market_value)
+        return market_value
+
+    # 持仓总盈亏
+    def GetProfit(self) -> float:
+        return self.__position_book.Profit()
+
+    # 交易日结束时清理空仓
     def AfterTradeDay(self, time: datetime):
-        # 创建一个列表来存储需要删除的股票代码
-        to_remove = []
-        
-        # 先收集需要删除的持仓
-        for position in self.__position_set.values():
-            if position.Amount() == 0:
-                to_remove.append(position.StockId())
-        
-        # 遍历完成后再删除
-        for stock_id in to_remove:
+        for stock_id in self.__position_book.GetEmptyStockIds():
+            self.__position_book.Remove(stock_id)
             self.__position_set.pop(stock_id)
 
     # 订单更新时更新持仓信息
     def OnOrderUpdate(self, order: BaseOrder, amount: int, price: float):
         if order._stock_id not in self.__position_set:
-            self.__position_set[order._stock_id] = \
-                BacktestPosition(order._stock_id, amount,\
-                                    price, order._last_update_time, self.__base_stockdata)
+            self._AddPosition(order._stock_id, amount, price, order._last_update_time)
         else:
-            self.__position_set[order._stock_id].Update(amount, price, order._last_update_time)
+            current_price = self.__base_stockdata[order._stock_id].GetCurrentPrice(order._last_update_time)
+            self.__position_book.ApplyFill(order._stock_id, amount, price, current_price)
+        self.__version += 1
 
     def OnOrderCreate(self, order: BaseOrder, amount: int, price: float):
         pass
@@ -415,6 +613,8 @@ class BacktestAccount(BaseAccount, OrderObserver, PositionObserver, TimeMethod):
     __order_manager: BacktestOrderManager
     __time: datetime            # 当前回测的时间
     _validator_manager: OrderValidatorManager
+    __pending_buys: list[tuple[str, int]]   # 批量调仓中等待卖出释放资金的买单 (证券代码, 数量)
+    __rebalance_sells: list[str]            # 批量调仓中提交的卖单
 
     def __init__(self):
         """构造函数只做最基本的初始化"""
@@ -425,11 +625,16 @@ class BacktestAccount(BaseAccount, OrderObserver, PositionObserver, TimeMethod):
         self.__order_manager = None
         self.__position_manager = None
         self.__time = None
+        self.__pending_buys = []
+        self.__rebalance_sells = []
 
 
-    def Init(self, base_stockdata: BaseStockData, timemanager: BaseTimeManager):
+    # order_manager_class 为订单撮合方式，默认按1分钟数据撮合
+    def Init(self, base_stockdata: BaseStockData, timemanager: BaseTimeManager, order_manager_class: type = None):
+        if order_manager_class is None:
+            order_manager_class = BacktestOrderManager
         self.__base_stockdata = base_stockdata
-        self.__order_manager = BacktestOrderManager(self, self.__base_stockdata)
+        self.__order_manager = order_manager_class(self, self.__base_stockdata)
         self.__position_manager = BacktestPositionManager(self, self.__order_manager, self.__base_stockdata)
         self.__available_cash = 0
         self.__initial_available_cash = 0
@@ -446,6 +651,65 @@ class BacktestAccount(BaseAccount, OrderObserver, PositionObserver, TimeMethod):
         self.__available_cash = cash
         self.__initial_available_cash = cash
 
+    # 设置账户状态，用于分段回测时从上一段的期末状态继续
+    # positions: {证券代码: (持仓数量, 成本价)}
+    # 收益率以设置后的总资产为基准计算
+    def SeedState(self, cash: float, positions: dict[str, tuple[int, float]] = None, time: datetime = None):
+        if time is not None:
+            self.__time = time
+        self.__available_cash = cash
+        for stock_id, (amount, cost_price) in (positions or {}).items():
+            self.__position_manager.SetPosition(stock_id, amount, cost_price, self.__time)
+        self.__initial_available_cash = self.TotalValue()
+
+    # 导出账户状态：资金、订单、持仓和当前回测时间
+    def GetSnapshot(self) -> dict:
+        return {
+            'version': SNAPSHOT_VERSION,
+            'time': self.__time,
+            'available_cash': self.__available_cash,
+            'initial_available_cash': self.__initial_available_cash,
+            'frozen_cash': self.FrozenCash(),
+            'orders': self.__order_manager.GetSnapshot(),
+            'positions': self.__position_manager.GetSnapshot(),
+        }
+
+    # 从导出的状态恢复账户，冻结资金由订单恢复
+    def LoadSnapshot(self, snapshot: dict):
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version: {snapshot.get('version')}")
+        self.__time = snapshot['time']
+        self.__available_cash = snapshot['available_cash']
+        self.__initial_available_cash = snapshot['initial_available_cash']
+        self.__order_manager.LoadSnapshot(snapshot['orders'])
+        self.__position_manager.LoadSnapshot(snapshot['positions'], self.__time)
+
+    # 保存检查点，使用 pickle 序列化后 gzip 压缩
+    # 先写临时文件再替换，避免进程中途崩溃留下不完整的检查点
+    def SaveCheckpoint(self, path: str):
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, 'wb') as f:
+            pickle.dump(self.GetSnapshot(), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    # 读取检查点
+    @staticmethod
+    def ReadCheckpoint(path: str) -> dict:
+        with gzip.open(path, 'rb') as f:
+            return pickle.load(f)
+
+    # 从检查点恢复账户
+    def LoadCheckpoint(self, path: str):
+        self.LoadSnapshot(self.ReadCheckpoint(path))
+
+    # 获取账户使用的股票数据
+    def GetStockData(self) -> BaseStockData:
+        return self.__base_stockdata
+
+    # 添加订单观察者，用于在账户外部统计成交等信息
+    def AddOrderObserver(self, observer: OrderObserver):
+        self.__order_manager.AddOrderObserver(observer)
+
     # 更新登录状态
     def UpdateLogin(self):
         pass
@@ -458,10 +722,9 @@ class BacktestAccount(BaseAccount, OrderObserver, PositionObserver, TimeMethod):
     def AvailableCash(self):
         return self.__available_cash
 
-    # 获取账户持仓市值
+    # 获取账户持仓市值，同一回测时间内只在成交后重新估值
     def PositionMarketValue(self):
-        self.__position_manager.UpdatePosition(self.__time)
-        return sum([position.MarketValue() for position in self.Position().values()])
+        return self.__position_manager.UpdatePosition(self.__time)
 
     # 获取账户总资产
     def TotalValue(self):
@@ -475,13 +738,18 @@ class BacktestAccount(BaseAccount, OrderObserver, PositionObserver, TimeMethod):
     def FrozenCash(self):
         return self.__order_manager.GetFrozenCash()
 
+    # 获取当日未完成(等待提交或部分成交)的订单
+    def OpenOrders(self) -> list[BacktestOrder]:
+        return [order for order in self.__order_manager.GetOrderSet().values()
+                if order.GetStatus() in (OrderStatus.PENDING, OrderStatus.ACTIVE)]
+
     # 获取账户当日盈亏
     def TodayProfit(self):
         return 0
     
     # 获取账户持仓盈亏
     def PositionProfit(self):
-        return sum([position.Profit() for position in self.Position().values()])
+        return self.__position_manager.GetProfit()
 
     # 获取账户总收益率
     def TotalReturnRate(self):
@@ -541,11 +809,80 @@ class BacktestAccount(BaseAccount, OrderObserver, PositionObserver, TimeMethod):
             return self.OrderByTotalPercent(stock_id, percent, price)
         return self.OrderByTotalPercent(stock_id, percent - self.Position()[stock_id].MarketValue() / self.TotalValue(), price)
     
+    # 按目标组合批量调仓
+    # 用一次 TotalValue 和一次 GetPrices 计算全部调仓数量，整批检查权重、可卖数量和资金，
+    # 卖出资金不足以覆盖买入时按比例缩小买入数量
+    # 卖单立即提交，买单在可用资金足够时提交(通常在卖单成交后的下一分钟)，卖单全部结束后剩余买单按可用资金缩小后提交
+    # 订单按当前价限价提交，价格上涨时可能无法全部成交，未成交部分在下一个交易日过期撤销并记录警告日志
+    # 当天没有提交的买单在交易日结束时丢弃，同样记录警告日志
+    def RebalancePortfolio(self, target_weights) -> list[str]:
+        try:
+            stock_ids, weights = NormalizeTargetWeights(target_weights)
+        except ValueError as e:
+            logging.error(f"调仓失败：{e}")
+            return []
+        positions = self.Position()
+        prices = self.__base_stockdata.GetPrices(stock_ids, self.__time)
+        current = np.array([positions[stock_id].Amount() if stock_id in positions else 0 for stock_id in stock_ids], dtype=np.int64)
+        sellable = np.array([positions[stock_id].SellableAmount() if stock_id in positions else 0 for stock_id in stock_ids], dtype=np.int64)
+        deltas = ComputeRebalanceAmounts(weights, self.TotalValue(), prices, current)
+        for stock_id in np.array(stock_ids, dtype=object)[prices <= 0]:
+            logging.warning(f"调仓跳过 {stock_id}：没有价格数据")
+
+        sells = np.maximum(deltas, -sellable) * (deltas < 0)
+        buys = np.maximum(deltas, 0)
+        cash = self.AvailableCash() - float(np.dot(sells, prices))
+        buys = FitBuyAmounts(buys, prices, cash)
+
+        order_codes = []
+        self.__rebalance_sells = []
+        for index in np.flatnonzero(sells):
+            order_code = self.Order(stock_ids[index], int(sells[index]), float(prices[index]))
+            if order_code is not None:
+                order_codes.append(order_code)
+                self.__rebalance_sells.append(order_code)
+        self.__pending_buys = [(stock_ids[index], int(buys[index])) for index in np.flatnonzero(buys)]
+        order_codes.extend(self._SubmitPendingBuys())
+        return order_codes
+
+    # 提交可用资金足够的待提交买单，价格为当前价，返回提交的订单
+    def _SubmitPendingBuys(self) -> list[str]:
+        if not self.__pending_buys:
+            return []
+        sells_done = all(self.__order_manager.GetOrder(order_code) is None or
+                         self.__order_manager.GetOrder(order_code).GetStatus() not in (OrderStatus.PENDING, OrderStatus.ACTIVE)
+                         for order_code in self.__rebalance_sells)
+        prices = self.__base_stockdata.GetPrices([stock_id for stock_id, _ in self.__pending_buys], self.__time)
+        amounts = np.array([amount for _, amount in self.__pending_buys], dtype=np.int64)
+        if sells_done:
+            # 卖单已全部结束，剩余买单按可用资金缩小后一次提交
+            amounts = FitBuyAmounts(amounts, prices, self.AvailableCash())
+
+        order_codes = []
+        remaining = []
+        for (stock_id, _), amount, price in zip(self.__pending_buys, amounts.tolist(), prices.tolist()):
+            if amount <= 0 or price <= 0:
+                continue
+            if not sells_done and amount * price > self.AvailableCash():
+                remaining.append((stock_id, amount))
+                continue
+            order_code = self.Order(stock_id, int(amount), price)
+            if order_code is not None:
+                order_codes.append(order_code)
+        self.__pending_buys = remaining
+        if not remaining:
+            self.__rebalance_sells = []
+        return order_codes
+
     def OnOrderUpdate(self, order: BaseOrder, amount: int, price: float):
         if amount < 0:
             self.__available_cash -= amount * price
 
     def OnOrderCompleted(self, order: BaseOrder, amount: int, price: float):
+        self._ReleaseFrozenCash(order)
+
+    # 订单结束(全部成交或过期撤销)时退回剩余的冻结资金
+    def _ReleaseFrozenCash(self, order: BaseOrder):
         self.__available_cash += order._frozen_cash
         order._frozen_cash = 0
 
@@ -557,6 +894,16 @@ class BacktestAccount(BaseAccount, OrderObserver, PositionObserver, TimeMethod):
     def OnPositionUpdate(self, position: BasePosition, amount: int, price: float):
         pass
 
+    # 除 TradeInit 外都需要更新当前回测时间
+    def GetSubscriptions(self) -> dict[str, str]:
+        return {
+            EVENT_BEFORE_TRADE_DAY: FREQ_DAILY,
+            EVENT_ON_TRADE_DAY_START: FREQ_DAILY,
+            EVENT_ON_TRADE_DAY_END: FREQ_DAILY,
+            EVENT_AFTER_TRADE_DAY: FREQ_DAILY,
+            EVENT_AFTER_TRADE_MINUTE: FREQ_1M,
+        }
+
     # 交易开始时的回调函数
     def TradeInit(self, time: datetime):
         pass
@@ -564,20 +911,26 @@ class BacktestAccount(BaseAccount, OrderObserver, PositionObserver, TimeMethod):
     # 交易分钟结束时的回调函数
     def AfterTradeMinute(self, time: datetime):
         self.UpdateAccountInfo(time)
-        pass
+        self._SubmitPendingBuys()
 
     # 交易日结束时的回调函数
     def AfterTradeDay(self, time: datetime):
         self.UpdateAccountInfo(time)
-        pass
+        if self.__pending_buys:
+            logging.warning(f"批量调仓有 {len(self.__pending_buys)} 个买单当天未能提交，已丢弃: "
+                            + ", ".join(f"{stock_id} {amount}" for stock_id, amount in self.__pending_buys))
+            self.__pending_buys = []
+            self.__rebalance_sells = []
 
     # 交易日开始时(09:31:00)的回调函数
     def OnTradeDayStart(self, time: datetime):
         self.UpdateAccountInfo(time)
 
     # 交易日结束时(14:55:00)的回调函数
+    # 日线回测没有分钟回调，开盘成交的卖单释放资金后在这里提交买单，收盘时撮合
     def OnTradeDayEnd(self, time: datetime):
         self.UpdateAccountInfo(time)
+        self._SubmitPendingBuys()
 
     # 交易日开始前的回调函数
     def BeforeTradeDay(self, time: datetime):
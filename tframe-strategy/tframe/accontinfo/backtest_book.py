@@ -0,0 +1,158 @@
+import numpy as np
+from tframe.accontinfo.base_accontinfo import OrderStatus
+
+_INITIAL_CAPACITY = 64
+
+
+# 按列存储的表，每行为一个槽位，各列为 numpy 数组
+# 释放的槽位清零后放入空闲列表复用，容量不足时翻倍
+# 扩容会替换列数组，外部只保存槽位号，每次访问时通过 Column 取列
+# 每个槽位有一个代数，释放时加一，外部保存 (槽位, 代数) 时可以用 IsValid 判断槽位是否已被释放或复用
+class _ColumnTable:
+    def __init__(self, dtypes: dict[str, type], capacity: int = _INITIAL_CAPACITY):
+        capacity = max(capacity, 1)
+        self._columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in dtypes.items()}
+        self._used = np.zeros(capacity, dtype=bool)
+        self._generations = np.zeros(capacity, dtype=np.int64)
+        self._free: list[int] = []
+        self._size = 0          # 分配过的槽位数，[0, _size) 之外的槽位未使用
+
+    def _Grow(self):
+        capacity = len(self._used) * 2
+        for name, old in self._columns.items():
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            self._columns[name] = new
+        used = np.zeros(capacity, dtype=bool)
+        used[:self._size] = self._used[:self._size]
+        self._used = used
+        generations = np.zeros(capacity, dtype=np.int64)
+        generations[:self._size] = self._generations[:self._size]
+        self._generations = generations
+
+    # 分配一个槽位，各列为 0
+    def Allocate(self) -> int:
+        if self._free:
+            slot = self._free.pop()
+        else:
+            if self._size == len(self._used):
+                self._Grow()
+            slot = self._size
+            self._size += 1
+        self._used[slot] = True
+        return slot
+
+    # 释放槽位，各列清零，释放后求和时不需要再过滤
+    def Free(self, slot: int):
+        for column in self._columns.values():
+            column[slot] = 0
+        self._used[slot] = False
+        self._generations[slot] += 1
+        self._free.append(slot)
+
+    def GetGeneration(self, slot: int) -> int:
+        return int(self._generations[slot])
+
+    # 槽位在取得 generation 之后没有被释放过
+    def IsValid(self, slot: int, generation: int) -> bool:
+        return self._generations[slot] == generation
+
+    def Column(self, name: str) -> np.ndarray:
+        return self._columns[name]
+
+    # 使用中的槽位号
+    def GetUsedSlots(self) -> np.ndarray:
+        return np.flatnonzero(self._used[:self._size])
+
+
+# 持仓表，每只股票一个槽位
+# 持仓市值、持仓盈亏为整列的向量运算
+class PositionBook(_ColumnTable):
+    def __init__(self, capacity: int = _INITIAL_CAPACITY):
+        super().__init__({'amount': np.int64, 'cost_price': np.float64, 'current_price': np.float64}, capacity)
+        self.__slots: dict[str, int] = {}       # 证券代码 -> 槽位
+
+    def __contains__(self, stock_id: str) -> bool:
+        return stock_id in self.__slots
+
+    def __len__(self) -> int:
+        return len(self.__slots)
+
+    def GetSlot(self, stock_id: str) -> int:
+        return self.__slots[stock_id]
+
+    # 证券代码和对应的槽位，顺序一致
+    def GetStockIds(self) -> list[str]:
+        return list(self.__slots)
+
+    def GetSlots(self) -> np.ndarray:
+        return np.fromiter(self.__slots.values(), dtype=np.int64, count=len(self.__slots))
+
+    # 添加持仓，已存在时覆盖
+    def Add(self, stock_id: str, amount: int, cost_price: float, current_price: float) -> int:
+        slot = self.__slots.get(stock_id)
+        if slot is None:
+            slot = self.Allocate()
+            self.__slots[stock_id] = slot
+        self._columns['amount'][slot] = amount
+        self._columns['cost_price'][slot] = cost_price
+        self._columns['current_price'][slot] = current_price
+        return slot
+
+    def Remove(self, stock_id: str):
+        self.Free(self.__slots.pop(stock_id))
+
+    # 按成交更新持仓数量和成本价
+    def ApplyFill(self, stock_id: str, delta_amount: int, price: float, current_price: float):
+        slot = self.__slots[stock_id]
+        amount = int(self._columns['amount'][slot])
+        cost_price = float(self._columns['cost_price'][slot])
+        if amount + delta_amount == 0:
+            cost_price = 0
+        else:
+            cost_price = (cost_price * amount + delta_amount * price) / (amount + delta_amount)
+        self._columns['amount'][slot] = amount + delta_amount
+        self._columns['cost_price'][slot] = cost_price
+        self._columns['current_price'][slot] = current_price
+
+    # 批量设置当前价
+    def SetPrices(self, slots: np.ndarray, prices: np.ndarray):
+        self._columns['current_price'][slots] = prices
+
+    # 持仓数量为 0 的证券代码
+    def GetEmptyStockIds(self) -> list[str]:
+        amount = self._columns['amount']
+        return [stock_id for stock_id, slot in self.__slots.items() if amount[slot] == 0]
+
+    # 持仓总市值
+    def MarketValue(self) -> float:
+        n = self._size
+        return float(np.dot(self._columns['amount'][:n], self._columns['current_price'][:n]))
+
+    # 持仓总盈亏
+    def Profit(self) -> float:
+        n = self._size
+        columns = self._columns
+        return float(np.dot(columns['amount'][:n], columns['current_price'][:n] - columns['cost_price'][:n]))
+
+
+# 订单表，每个订单一个槽位
+# 只保存按列汇总需要的字段，status 为 OrderStatus 的值，live 表示订单在当日订单集合中
+class OrderBook(_ColumnTable):
+    def __init__(self, capacity: int = _INITIAL_CAPACITY):
+        super().__init__({
+            'frozen_cash': np.float64,
+            'status': np.int8,
+            'live': bool,
+        }, capacity)
+
+    # 当日订单的冻结资金合计
+    def GetFrozenCash(self) -> float:
+        n = self._size
+        return float(self._columns['frozen_cash'][:n][self._columns['live'][:n]].sum())
+
+    # 当日处于 status 之一的订单槽位
+    def GetSlotsByStatus(self, statuses: tuple[OrderStatus, ...]) -> np.ndarray:
+        n = self._size
+        mask = np.isin(self._columns['status'][:n], [status.value for status in statuses]) & self._columns['live'][:n]
+        return np.flatnonzero(mask)
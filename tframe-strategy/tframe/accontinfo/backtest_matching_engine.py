@@ -0,0 +1,70 @@
+from datetime import datetime
+from tframe.accontinfo.base_accontinfo import BaseOrder, OrderStatus
+from tframe.stockdata.base_stockdata import BaseStockData
+
+LOTS_TO_SHARES = 100        # 1分钟数据的成交量单位为手
+LIQUIDITY_RATIO = 0.5       # 每根 bar 成交量的 1/2 为可成交的量
+
+
+# 回测撮合引擎
+# 每分钟把活动订单按证券代码分组，每只股票只读取一次当前分钟的 bar，然后在一次遍历中撮合该股票的全部订单
+# 同一根 bar 上买、卖两个方向各有 成交量 * LIQUIDITY_RATIO 的可成交量，由同方向的订单按价格优先、时间优先依次分配：
+#   - 市价单优先，其次买单按限价从高到低、卖单按限价从低到高
+#   - 限价不满足当前成交价(收盘价)的订单本分钟不成交
+class BacktestMatchingEngine:
+    def __init__(self, stockdata: BaseStockData):
+        self.__stockdata = stockdata
+
+    # 买单排序键，市价单优先，限价高的优先，同价格先提交的优先
+    @staticmethod
+    def _BuyPriority(order: BaseOrder) -> tuple:
+        price = order.GetPrice()
+        return (price is not None, -(price or 0), order.GetCreateTime())
+
+    # 卖单排序键，市价单优先，限价低的优先，同价格先提交的优先
+    @staticmethod
+    def _SellPriority(order: BaseOrder) -> tuple:
+        price = order.GetPrice()
+        return (price is not None, price or 0, order.GetCreateTime())
+
+    # 在一个方向上按优先级分配可成交量，返回 [(订单, 成交数量, 成交价)]
+    @staticmethod
+    def _MatchSide(orders: list[BaseOrder], price: float, liquidity: int, is_buy: bool) -> list[tuple]:
+        fills = []
+        for order in orders:
+            if liquidity <= 0:
+                break
+            limit = order.GetPrice()
+            if limit is not None and (price > limit if is_buy else price < limit):
+                # 按优先级排序后，后面的限价单更不可能成交
+                break
+            remaining = abs(order.GetUnfilledAmount())
+            filled_amount = order.Fill(min(liquidity, remaining), price)
+            if filled_amount != 0:
+                liquidity -= abs(filled_amount)
+                fills.append((order, filled_amount, price))
+        return fills
+
+    # 撮合一只股票的订单
+    def _MatchSymbol(self, stock_id: str, orders: list[BaseOrder], time: datetime) -> list[tuple]:
+        bar_array = self.__stockdata[stock_id].Get1MinBars(time, time).get_bar_array()
+        if len(bar_array) == 0:     # 当前分钟没有成交
+            return []
+        price = float(bar_array['close'][-1])
+        liquidity = int(bar_array['volume'][-1] * LIQUIDITY_RATIO) * LOTS_TO_SHARES
+
+        buys = sorted((order for order in orders if order.GetAmount() > 0), key=self._BuyPriority)
+        sells = sorted((order for order in orders if order.GetAmount() < 0), key=self._SellPriority)
+        return self._MatchSide(buys, price, liquidity, True) + self._MatchSide(sells, price, liquidity, False)
+
+    # 撮合当前分钟的全部活动订单，返回 [(订单, 成交数量, 成交价)]，按股票分组、组内按优先级排列
+    def Match(self, orders: list[BaseOrder], time: datetime) -> list[tuple]:
+        books: dict[str, list[BaseOrder]] = {}
+        for order in orders:
+            if order.GetStatus() in (OrderStatus.PENDING, OrderStatus.ACTIVE):
+                books.setdefault(order.GetStockId(), []).append(order)
+
+        fills = []
+        for stock_id, symbol_orders in books.items():
+            fills.extend(self._MatchSymbol(stock_id, symbol_orders, time))
+        return fills
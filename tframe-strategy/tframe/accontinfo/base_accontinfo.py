@@ -1,7 +1,11 @@
 import logging
+import numpy as np
 from datetime import datetime
 from enum import Enum, auto
 
+LOT_SIZE = 100  # A股的最小交易单位
+
+
 class OrderStatus(Enum):
     PENDING = auto()    # 等待提交
     ACTIVE = auto()     # 活动中（未成交，部分成交）
@@ -85,6 +89,44 @@ class BaseOrder:
     def GetPrice(self):
         return self._price
         
+# 将目标权重转换为 (证券代码列表, 权重数组)，target_weights 为 {证券代码: 权重} 或以证券代码为索引的 pandas Series
+def NormalizeTargetWeights(target_weights) -> tuple[list[str], np.ndarray]:
+    items = list(target_weights.items())
+    stock_ids = [str(stock_id) for stock_id, _ in items]
+    weights = np.array([float(weight) for _, weight in items], dtype=np.float64)
+    if len(set(stock_ids)) != len(stock_ids):
+        raise ValueError("Duplicate stock ids in target weights")
+    if np.any(np.isnan(weights)) or np.any(weights < 0) or weights.sum() > 1 + 1e-9:
+        raise ValueError(f"Target weights must be non-negative and sum to at most 1, got sum {weights.sum()}")
+    return stock_ids, weights
+
+
+# 按目标权重计算每只股票的调仓数量，正数为买入，负数为卖出
+# 目标数量向下取整到 LOT_SIZE 的整数倍；目标为 0 时全部卖出(包括零股)，否则卖出数量也取整到 LOT_SIZE
+# 价格无效(<= 0 或 NaN)的股票不调仓
+def ComputeRebalanceAmounts(weights: np.ndarray, total_value: float, prices: np.ndarray,
+                            current_amounts: np.ndarray) -> np.ndarray:
+    prices = np.asarray(prices, dtype=np.float64)
+    current_amounts = np.asarray(current_amounts, dtype=np.int64)
+    valid = prices > 0
+    target = np.zeros(len(weights), dtype=np.int64)
+    target[valid] = np.floor(total_value * weights[valid] / (prices[valid] * LOT_SIZE)).astype(np.int64) * LOT_SIZE
+    deltas = target - current_amounts
+    partial_sell = (deltas < 0) & (target > 0)
+    deltas[partial_sell] = -((-deltas[partial_sell]) // LOT_SIZE * LOT_SIZE)
+    deltas[~valid] = 0
+    return deltas
+
+
+# 资金不足时按比例缩小买入数量，结果向下取整到 LOT_SIZE 的整数倍
+def FitBuyAmounts(buy_amounts: np.ndarray, prices: np.ndarray, cash: float) -> np.ndarray:
+    cost = float(np.dot(buy_amounts, prices))
+    if cost <= cash or cost == 0:
+        return buy_amounts
+    scale = max(cash, 0) / cost
+    return (np.floor(buy_amounts * scale / LOT_SIZE) * LOT_SIZE).astype(np.int64)
+
+
 # 账户信息基类
 class BaseAccount:
 
@@ -153,6 +195,13 @@ class BaseAccount:
     def RebalanceByTotalPercent(self, stock_id: str, percent: float, price: float = None) -> BaseOrder:
         raise NotImplementedError("RebalanceByTotalPercent is not implemented")  
 
+    # 按目标组合批量调仓，target_weights 为 {证券代码: 占总资产的比例} 或 pandas Series
+    # 所有调仓数量基于同一次估值计算，先卖后买，买入在卖出释放资金后提交
+    # 不在 target_weights 中的持仓保持不变，清仓需要将权重设为 0
+    # 返回已提交的订单
+    def RebalancePortfolio(self, target_weights) -> list:
+        raise NotImplementedError("RebalancePortfolio is not implemented")
+
 # 持仓基类
 class BasePosition:
     def __init__(self):
@@ -1,12 +1,22 @@
 import logging
 import json
+import numpy as np
 import tframe.common.eastmoney_common as common
 from lxml import etree
-from tframe.accontinfo.base_accontinfo import BaseAccount, BasePosition, BaseOrder, OrderStatus
+from tframe.accontinfo.base_accontinfo import BaseAccount, BasePosition, BaseOrder, OrderStatus, \
+    NormalizeTargetWeights, ComputeRebalanceAmounts, FitBuyAmounts
 from tframe.session.eastmoney_session import EastMoneySession
-from tframe.timemanager.base_timemanager import TimeMethod
+from tframe.timemanager.base_timemanager import TimeMethod, FREQ_1M, FREQ_DAILY, EVENT_BEFORE_TRADE_DAY, EVENT_AFTER_TRADE_MINUTE
 from datetime import datetime, timedelta
 
+# 将 tframe 的证券代码(如 000001.SZ)拆分为东财的证券代码和市场
+def _SplitStockId(stock_id: str) -> tuple[str, str]:
+    stock_code, _, suffix = stock_id.partition(".")
+    market = {"SH": "HA", "SZ": "SA"}.get(suffix.upper())
+    if not stock_code or market is None:
+        raise ValueError(f"stock_id[{stock_id}]格式错误")
+    return stock_code, market
+
 # 订单集合
 class EastMoneyOrderSet:
     __kOrderUrl = "https://jywg.eastmoneysec.com/Search/GetOrdersData"
@@ -90,9 +100,10 @@ class EastMoneyAccount(BaseAccount, TimeMethod):
     __validatekey: str # validatekey
 
     __order_set: EastMoneyOrderSet # 订单集合
+    __pending_buys: list # 批量调仓中等待资金的买单 [(证券代码, 数量, 估值价格)]
 
     def __init__(self):
-        pass
+        self.__pending_buys = []
 
     def Init(self, user, passwd):
         self.user = user
@@ -125,13 +136,21 @@ class EastMoneyAccount(BaseAccount, TimeMethod):
         self.__validatekey = doc.xpath('//*[@id="em_validatekey"]/@value')[0]
         logging.info(f"get eastmoney validatekey[{self.__validatekey}]")
 
-    # 交易日开始时的回调函数
+    # 只在交易日开始和每分钟结束时刷新账户信息
+    def GetSubscriptions(self) -> dict[str, str]:
+        return {EVENT_BEFORE_TRADE_DAY: FREQ_DAILY, EVENT_AFTER_TRADE_MINUTE: FREQ_1M}
+
+    # 交易日开始时的回调函数，前一天未提交的调仓买单不再提交
     def BeforeTradeDay(self, time: datetime):
         self.UpdateAccountInfo()
+        if self.__pending_buys:
+            logging.warning(f"批量调仓有 {len(self.__pending_buys)} 个买单未能提交，已丢弃")
+            self.__pending_buys = []
         
     # 交易分钟结束时的回调函数
     def AfterTradeMinute(self, time: datetime):
         self.UpdateAccountInfo()
+        self._SubmitPendingBuys()
 
     # 获取账户可用资金
     def AvailableCash(self):
@@ -170,15 +189,8 @@ class EastMoneyAccount(BaseAccount, TimeMethod):
     
     # 下单
     def Order(self, stock_id: str, amount: int, price: float = None) -> BaseOrder:
-        stock_code = stock_id[:-3]
-        
-        if stock_id[-2:].upper() == "SH":
-            market = "HA"
-        elif stock_id[-2:].upper() == "SZ":
-            market = "SA"
-        else:
-            raise ValueError(f"stock_id[{stock_id}]格式错误")
-        
+        stock_code, market = _SplitStockId(stock_id)
+
         params = {
             "stockCode": stock_code,
             "tradeType": "B" if amount > 0 else "S",
@@ -243,6 +255,61 @@ class EastMoneyAccount(BaseAccount, TimeMethod):
             return self.OrderByPercent(stock_id, percent, price)
         return self.OrderByPercent(stock_id, percent - self.Position()[stock_id].MarketValue() / self.TotalValue(), price)
 
+    # 按目标组合批量调仓
+    # 基于同一次账户信息计算全部调仓数量：持仓股票按持仓最新价估值，其他股票按卖一价估值
+    # 提交任何订单之前先整批检查权重和证券代码，有一项不合法则整批不下单
+    # 卖单立即提交，买单在可用资金足够时提交，其余买单在每分钟刷新账户信息后重试
+    def RebalancePortfolio(self, target_weights) -> list:
+        try:
+            stock_ids, weights = NormalizeTargetWeights(target_weights)
+            stock_codes = [_SplitStockId(stock_id)[0] for stock_id in stock_ids]
+        except ValueError as e:
+            logging.error(f"调仓失败：{e}")
+            return []
+        held = self.Position()      # 东财持仓的证券代码不带市场后缀
+        prices = np.zeros(len(stock_ids), dtype=np.float64)
+        current = np.zeros(len(stock_ids), dtype=np.int64)
+        sellable = np.zeros(len(stock_ids), dtype=np.int64)
+        for index, (stock_id, stock_code) in enumerate(zip(stock_ids, stock_codes)):
+            position = held.get(stock_code)
+            if position is not None:
+                prices[index] = float(position.CurrentPrice())
+                current[index] = int(float(position.StockAmount()))
+                sellable[index] = int(float(position.SellableAmount()))
+            else:
+                prices[index] = float(common.GetFiveQuote(stock_id)['fivequote']['sale1'])
+        deltas = ComputeRebalanceAmounts(weights, float(self.TotalValue()), prices, current)
+        for stock_id in np.array(stock_ids, dtype=object)[~(prices > 0)]:
+            logging.warning(f"调仓跳过 {stock_id}：没有价格数据")
+
+        sells = np.maximum(deltas, -sellable) * (deltas < 0)
+        buys = FitBuyAmounts(np.maximum(deltas, 0), prices, float(self.AvailableCash()) - float(np.dot(sells, prices)))
+
+        orders = []
+        for index in np.flatnonzero(sells):
+            order = self.Order(stock_ids[index], int(sells[index]))
+            if order is not None:
+                orders.append(order)
+        self.__pending_buys = [(stock_ids[index], int(buys[index]), float(prices[index])) for index in np.flatnonzero(buys)]
+        orders.extend(self._SubmitPendingBuys())
+        return orders
+
+    # 提交可用资金足够的待提交买单，返回提交的订单
+    def _SubmitPendingBuys(self) -> list:
+        orders = []
+        remaining = []
+        cash = float(self.AvailableCash())
+        for stock_id, amount, price in self.__pending_buys:
+            if amount * price > cash:
+                remaining.append((stock_id, amount, price))
+                continue
+            order = self.Order(stock_id, amount)
+            if order is not None:
+                orders.append(order)
+                cash -= amount * price
+        self.__pending_buys = remaining
+        return orders
+
 class EastMoneyPosition(BasePosition):
     def __init__(self, position_json: dict):
         self.position_json = position_json
@@ -0,0 +1,90 @@
+import glob
+import logging
+import os
+from datetime import datetime, timedelta
+from tframe.accontinfo.backtest_accountinfo import BacktestAccount
+from tframe.timemanager.base_timemanager import TimeMethod, EVENT_TRADE_INIT, EVENT_AFTER_TRADE_DAY, FREQ_DAILY
+
+_CHECKPOINT_PREFIX = "checkpoint_"
+_CHECKPOINT_SUFFIX = ".ckpt"
+
+
+# 获取目录下最新的检查点，没有时返回 None
+def GetLatestCheckpoint(checkpoint_dir: str) -> str:
+    paths = sorted(glob.glob(os.path.join(checkpoint_dir, f"{_CHECKPOINT_PREFIX}*{_CHECKPOINT_SUFFIX}")))
+    return paths[-1] if paths else None
+
+
+# 定期保存检查点，每 every_n_days 个交易日在交易日结束时保存一次
+# 文件名为 checkpoint_YYYYMMDD.ckpt，只保存账户状态，策略自身的状态需要策略自行处理
+class BacktestCheckpointer(TimeMethod):
+    def __init__(self, account: BacktestAccount, checkpoint_dir: str, every_n_days: int = 1):
+        self._account = account
+        self._checkpoint_dir = checkpoint_dir
+        self._every_n_days = every_n_days
+        self._day_count = 0
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    def GetSubscriptions(self) -> dict[str, str]:
+        return {EVENT_AFTER_TRADE_DAY: FREQ_DAILY}
+
+    def TradeInit(self, time: datetime):
+        pass
+
+    def BeforeTradeDay(self, time: datetime):
+        pass
+
+    def OnTradeDayStart(self, time: datetime):
+        pass
+
+    def OnTradeDayEnd(self, time: datetime):
+        pass
+
+    def AfterTradeDay(self, time: datetime):
+        self._day_count += 1
+        if self._day_count % self._every_n_days != 0:
+            return
+        path = os.path.join(self._checkpoint_dir, f"{_CHECKPOINT_PREFIX}{time.strftime('%Y%m%d')}{_CHECKPOINT_SUFFIX}")
+        self._account.SaveCheckpoint(path)
+        logging.info(f"保存检查点: {path}")
+
+    def AfterTradeMinute(self, time: datetime):
+        pass
+
+
+# 在策略 TradeInit 之后把账户恢复到检查点状态
+class _CheckpointLoader(TimeMethod):
+    def __init__(self, account: BacktestAccount, snapshot: dict):
+        self._account = account
+        self._snapshot = snapshot
+
+    def GetSubscriptions(self) -> dict[str, str]:
+        return {EVENT_TRADE_INIT: FREQ_DAILY}
+
+    def TradeInit(self, time: datetime):
+        self._account.LoadSnapshot(self._snapshot)
+
+    def BeforeTradeDay(self, time: datetime):
+        pass
+
+    def OnTradeDayStart(self, time: datetime):
+        pass
+
+    def OnTradeDayEnd(self, time: datetime):
+        pass
+
+    def AfterTradeDay(self, time: datetime):
+        pass
+
+    def AfterTradeMinute(self, time: datetime):
+        pass
+
+
+# 从检查点恢复回测，需要在策略注册到时间管理器之后调用
+# 回测从检查点所在交易日的下一个交易日继续；同一个检查点可以恢复到多个上下文中，用于分叉测试
+def ResumeFromCheckpoint(context, checkpoint_path: str):
+    snapshot = BacktestAccount.ReadCheckpoint(checkpoint_path)
+    resume_day = snapshot['time'].date() + timedelta(days=1)
+    context.timemanager.ResumeFrom(resume_day)
+    context.timemanager.AddTimeMethod(_CheckpointLoader(context.accontinfo, snapshot))
+    logging.info(f"从检查点 {checkpoint_path} 恢复，{resume_day} 开始继续回测")
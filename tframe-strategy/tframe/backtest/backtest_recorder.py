@@ -0,0 +1,238 @@
+import logging
+import os
+import numpy as np
+import pandas as pd
+from datetime import datetime, date
+from tframe.accontinfo.base_accontinfo import BaseOrder
+from tframe.accontinfo.backtest_accountinfo import BacktestAccount, OrderObserver
+from tframe.stockdata.base_stockdata import BaseStockData
+from tframe.timemanager.base_timemanager import TimeMethod, FREQ_1M, FREQ_DAILY, \
+    EVENT_BEFORE_TRADE_DAY, EVENT_AFTER_TRADE_DAY, EVENT_AFTER_TRADE_MINUTE
+
+TRADE_DAYS_PER_YEAR = 252
+# GetStats 返回的字段
+STATS_FIELDS = ['final_value', 'total_return', 'annual_return', 'sharpe', 'max_drawdown', 'turnover',
+                'fill_count', 'completed_order_count', 'benchmark_return', 'excess_return', 'information_ratio']
+_MINUTES_PER_DAY = 241      # 每个交易日最多的1分钟 bar 数
+
+
+# 按交易日历预分配的时间序列，记录总资产、现金(可用 + 冻结)和持仓市值，容量不足时翻倍
+class _ValueSeries:
+    def __init__(self, capacity: int, unit: str):
+        capacity = max(capacity, 1)
+        self._unit = unit
+        self._size = 0
+        self._times = np.empty(capacity, dtype=f'datetime64[{unit}]')
+        self._nav = np.empty(capacity, dtype=np.float64)
+        self._cash = np.empty(capacity, dtype=np.float64)
+        self._exposure = np.empty(capacity, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _Grow(self):
+        capacity = len(self._times) * 2
+        for name in ('_times', '_nav', '_cash', '_exposure'):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def Append(self, time: datetime, nav: float, cash: float, exposure: float):
+        if self._size == len(self._times):
+            self._Grow()
+        i = self._size
+        self._times[i] = np.datetime64(time, self._unit)
+        self._nav[i] = nav
+        self._cash[i] = cash
+        self._exposure[i] = exposure
+        self._size += 1
+
+    def Times(self) -> np.ndarray:
+        return self._times[:self._size]
+
+    def Nav(self) -> np.ndarray:
+        return self._nav[:self._size]
+
+    def ToDataFrame(self, index_name: str) -> pd.DataFrame:
+        n = self._size
+        nav = self._nav[:n]
+        exposure = self._exposure[:n]
+        df = pd.DataFrame({
+            'nav': nav,
+            'cash': self._cash[:n],
+            'exposure': exposure,
+            'exposure_ratio': np.divide(exposure, nav, out=np.zeros(n), where=nav != 0),
+        }, index=pd.DatetimeIndex(self._times[:n], name=index_name))
+        return df
+
+
+# 回测记录
+# 每个交易日结束时记录总资产、现金和持仓市值，record_minutes 为 True 时每分钟也记录一次，数组按交易日历预分配
+# 作为订单观察者把每笔成交追加到成交记录中
+# 回测结束后由 GetStats 用向量运算计算收益率、夏普比率、最大回撤、换手率和相对基准的超额收益，
+# 也可以通过 ExportParquet 导出给其他工具(需要安装 pyarrow)
+# 需要同时注册为时间方法和订单观察者，并放在策略之后，例如:
+#   recorder = BacktestRecorder(context.accontinfo, context.timemanager.GetTradeDays(),
+#                               context.strategyinfo.GetStrategyBenchmarkIndex())
+#   context.accontinfo.AddOrderObserver(recorder)
+#   context.timemanager.AddTimeMethod(recorder)
+class BacktestRecorder(TimeMethod, OrderObserver):
+    def __init__(self, account: BacktestAccount, trade_days: list[date], benchmark: str = None,
+                 stockdata: BaseStockData = None, record_minutes: bool = False):
+        self._account = account
+        self._benchmark = benchmark
+        self._stockdata = stockdata if stockdata is not None else account.GetStockData()
+        self._record_minutes = record_minutes
+        self._initial_value: float = None
+        self._daily = _ValueSeries(len(trade_days), 'D')
+        self._minutes = _ValueSeries(len(trade_days) * _MINUTES_PER_DAY if record_minutes else 1, 'm')
+        self._fills: list[tuple] = []       # (时间, 订单编号, 证券代码, 成交数量, 成交价)
+        self._completed_order_count = 0
+
+    def GetSubscriptions(self) -> dict[str, str]:
+        subscriptions = {EVENT_BEFORE_TRADE_DAY: FREQ_DAILY, EVENT_AFTER_TRADE_DAY: FREQ_DAILY}
+        if self._record_minutes:
+            subscriptions[EVENT_AFTER_TRADE_MINUTE] = FREQ_1M
+        return subscriptions
+
+    # 记录一次账户状态，TotalValue 在同一时间内只估值一次
+    def _Record(self, series: _ValueSeries, time: datetime):
+        nav = self._account.TotalValue()
+        exposure = self._account.PositionMarketValue()
+        series.Append(time, nav, nav - exposure, exposure)
+
+    def TradeInit(self, time: datetime):
+        pass
+
+    # 第一个交易日开始前记录初始总资产，此时策略和分段回测的起始状态都已设置
+    def BeforeTradeDay(self, time: datetime):
+        if self._initial_value is None:
+            self._initial_value = self._account.TotalValue()
+
+    def OnTradeDayStart(self, time: datetime):
+        pass
+
+    def OnTradeDayEnd(self, time: datetime):
+        pass
+
+    def AfterTradeDay(self, time: datetime):
+        self._Record(self._daily, time)
+
+    def AfterTradeMinute(self, time: datetime):
+        self._Record(self._minutes, time)
+
+    def OnOrderUpdate(self, order: BaseOrder, amount: int, price: float):
+        self._fills.append((order._last_update_time, order.GetOrderCode(), order.GetStockId(), amount, price))
+
+    def OnOrderCompleted(self, order: BaseOrder, amount: int, price: float):
+        self._completed_order_count += 1
+
+    def OnOrderCreate(self, order: BaseOrder, amount: int, price: float):
+        pass
+
+    # 初始总资产，尚未开始回测时为当前总资产
+    def GetInitialValue(self) -> float:
+        if self._initial_value is None:
+            return self._account.TotalValue()
+        return self._initial_value
+
+    # 每个交易日结束时的总资产，索引为日期
+    def GetDailyValues(self) -> pd.Series:
+        return pd.Series(self._daily.Nav().copy(), index=self._daily.Times().astype(object), dtype=np.float64)
+
+    # 每日记录 [nav, cash, exposure, exposure_ratio]
+    def GetDailyDataFrame(self) -> pd.DataFrame:
+        return self._daily.ToDataFrame('date')
+
+    # 每分钟记录，record_minutes 为 False 时为空
+    def GetMinuteDataFrame(self) -> pd.DataFrame:
+        return self._minutes.ToDataFrame('timestamp')
+
+    # 成交记录
+    def GetFillsDataFrame(self) -> pd.DataFrame:
+        df = pd.DataFrame(self._fills, columns=['timestamp', 'order_code', 'stock_id', 'amount', 'price'])
+        df['value'] = df['amount'] * df['price']
+        return df
+
+    # 基准指数在记录日期上的收盘价和第一天的前收盘价，没有数据时返回 None
+    def _GetBenchmarkCloses(self, dates: np.ndarray) -> tuple:
+        if not self._benchmark or self._stockdata is None or len(dates) == 0:
+            return None
+        start = pd.Timestamp(dates[0]).to_pydatetime()
+        end = pd.Timestamp(dates[-1]).to_pydatetime()
+        try:
+            values, times, fields = self._stockdata.GetBars([self._benchmark], start, end, freq="1d", as_array=True)
+        except NotImplementedError:
+            logging.warning(f"数据源不支持批量获取日线，无法计算基准 {self._benchmark} 的收益")
+            return None
+        if len(times) == 0:
+            logging.warning(f"没有基准 {self._benchmark} 在 {start.date()} - {end.date()} 的日线数据")
+            return None
+        index = pd.to_datetime(pd.Index(times).astype(str))
+        closes = pd.Series(values[:, 0, fields.index('close')], index=index).reindex(pd.DatetimeIndex(dates)).ffill()
+        pre_close = values[0, 0, fields.index('pre_close')]
+        if closes.isna().any() or index[0] != pd.Timestamp(dates[0]) or not pre_close > 0:
+            logging.warning(f"基准 {self._benchmark} 的日线数据不完整")
+            return None
+        return closes.to_numpy(), float(pre_close)
+
+    # 汇总统计结果，收益率按交易日计算，夏普比率和信息比率按 TRADE_DAYS_PER_YEAR 年化，无风险利率为 0
+    # 换手率为单边成交额 / 平均总资产
+    def GetStats(self) -> dict:
+        nav = self._daily.Nav()
+        initial_value = self.GetInitialValue()
+        stats = {
+            'final_value': float(nav[-1]) if len(nav) else float(self._account.TotalValue()),
+            'total_return': 0.0,
+            'annual_return': 0.0,
+            'sharpe': np.nan,
+            'max_drawdown': 0.0,
+            'turnover': 0.0,
+            'fill_count': len(self._fills),
+            'completed_order_count': self._completed_order_count,
+            'benchmark_return': np.nan,
+            'excess_return': np.nan,
+            'information_ratio': np.nan,
+        }
+        if len(nav) == 0 or initial_value <= 0:
+            return stats
+
+        previous = np.concatenate(([initial_value], nav[:-1]))
+        returns = nav / previous - 1
+        total_return = nav[-1] / initial_value - 1
+        peak = np.maximum.accumulate(np.concatenate(([initial_value], nav)))
+        stats['total_return'] = float(total_return)
+        stats['annual_return'] = float((1 + total_return) ** (TRADE_DAYS_PER_YEAR / len(nav)) - 1)
+        stats['max_drawdown'] = float(np.max((peak[1:] - nav) / peak[1:]))
+        if len(returns) > 1 and np.std(returns, ddof=1) > 0:
+            stats['sharpe'] = float(np.mean(returns) / np.std(returns, ddof=1) * np.sqrt(TRADE_DAYS_PER_YEAR))
+        if self._fills:
+            traded = np.abs(np.array([amount * price for _, _, _, amount, price in self._fills], dtype=np.float64))
+            stats['turnover'] = float(traded.sum() / 2 / np.mean(nav))
+
+        benchmark = self._GetBenchmarkCloses(self._daily.Times())
+        if benchmark is not None:
+            closes, pre_close = benchmark
+            benchmark_returns = closes / np.concatenate(([pre_close], closes[:-1])) - 1
+            excess = returns - benchmark_returns
+            stats['benchmark_return'] = float(closes[-1] / pre_close - 1)
+            stats['excess_return'] = float(total_return - stats['benchmark_return'])
+            if len(excess) > 1 and np.std(excess, ddof=1) > 0:
+                stats['information_ratio'] = float(np.mean(excess) / np.std(excess, ddof=1) * np.sqrt(TRADE_DAYS_PER_YEAR))
+        return stats
+
+    # 导出为 parquet 文件: daily.parquet、fills.parquet，记录了分钟数据时还有 minute.parquet
+    # 需要安装 pyarrow，未安装时记录警告并返回 False
+    def ExportParquet(self, directory: str) -> bool:
+        try:
+            import pyarrow
+        except ImportError:
+            logging.warning(f"未安装 pyarrow，无法导出回测结果到 {directory}")
+            return False
+        os.makedirs(directory, exist_ok=True)
+        self.GetDailyDataFrame().to_parquet(os.path.join(directory, "daily.parquet"))
+        self.GetFillsDataFrame().to_parquet(os.path.join(directory, "fills.parquet"), index=False)
+        if self._record_minutes:
+            self.GetMinuteDataFrame().to_parquet(os.path.join(directory, "minute.parquet"))
+        return True
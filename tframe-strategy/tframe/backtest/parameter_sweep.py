@@ -0,0 +1,81 @@
+import copy
+import itertools
+import logging
+import multiprocessing
+import traceback
+import pandas as pd
+from tframe.backtest.backtest_recorder import BacktestRecorder, STATS_FIELDS
+from tframe.base_strategy import BaseStrategy, StrategyTrigger
+from tframe.strategyinfo.base_strategyinfo import BaseStrategyInfo
+from tframe.tframe_factory import TContextFactory
+
+
+# 创建回测上下文并挂载策略和回测记录，返回 (context, recorder)
+def SetupBacktest(strategy_class: type, params: dict, strategyinfo: BaseStrategyInfo, config_text: str = "backtest") -> tuple:
+    context = TContextFactory.CreateTContext(config_text, strategyinfo)
+    strategy: BaseStrategy = strategy_class()
+    strategy.SetParams(params)
+
+    trigger = StrategyTrigger()
+    trigger.SetStrategy(strategy, context)
+    context.timemanager.AddTimeMethod(trigger)
+
+    recorder = BacktestRecorder(context.accontinfo, context.timemanager.GetTradeDays(),
+                                strategyinfo.GetStrategyBenchmarkIndex())
+    context.accontinfo.AddOrderObserver(recorder)
+    context.timemanager.AddTimeMethod(recorder)
+    return context, recorder
+
+
+# 在当前进程中运行一次回测，返回统计结果
+def RunBacktest(strategy_class: type, params: dict, strategyinfo: BaseStrategyInfo, config_text: str = "backtest") -> dict:
+    context, recorder = SetupBacktest(strategy_class, params, strategyinfo, config_text)
+    context.timemanager.TimeLoop()
+    return recorder.GetStats()
+
+
+# 子进程入口
+def _RunSweepTask(task: tuple) -> dict:
+    strategy_class, params, strategyinfo, config_text = task
+    result = dict(params)
+    try:
+        result.update(RunBacktest(strategy_class, params, strategyinfo, config_text))
+        result['error'] = None
+    except Exception as e:
+        logging.error(f"参数 {params} 回测出错: {e}, {traceback.format_exc()}")
+        result['error'] = str(e)
+    return result
+
+
+# 并行参数寻优
+# 每组参数在独立的子进程中运行，子进程使用 spawn 方式启动，并且每个子进程只运行一个任务，
+# 保证类属性、单例等进程内状态不会在不同参数组之间共享
+# strategy_class 必须可以被 pickle(定义在模块顶层)
+class ParameterSweepRunner:
+    def __init__(self, strategy_class: type, param_grid: dict[str, list], strategyinfo: BaseStrategyInfo,
+                 config_text: str = "backtest", processes: int = None):
+        self._strategy_class = strategy_class
+        self._param_grid = param_grid
+        self._strategyinfo = strategyinfo
+        self._config_text = config_text
+        self._processes = processes
+
+    # 展开参数网格
+    def GetParamCombinations(self) -> list[dict]:
+        names = list(self._param_grid.keys())
+        return [dict(zip(names, values)) for values in itertools.product(*self._param_grid.values())]
+
+    # 运行寻优，返回每组参数的统计结果表
+    def Run(self) -> pd.DataFrame:
+        combinations = self.GetParamCombinations()
+        tasks = [(self._strategy_class, params, copy.deepcopy(self._strategyinfo), self._config_text)
+                 for params in combinations]
+        processes = self._processes or multiprocessing.cpu_count()
+        processes = max(1, min(processes, len(tasks)))
+        logging.info(f"开始参数寻优: {len(tasks)} 组参数, {processes} 个进程")
+
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(processes=processes, maxtasksperchild=1) as pool:
+            results = pool.map(_RunSweepTask, tasks, chunksize=1)
+
+        return pd.DataFrame(results, columns=list(self._param_grid.keys()) + STATS_FIELDS + ['error'])
@@ -0,0 +1,160 @@
+import logging
+import numpy as np
+import pandas as pd
+import mysql.connector
+from dataclasses import dataclass
+from datetime import datetime
+from tframe.accontinfo.backtest_accountinfo import LOT_SIZE
+from tframe.common.config_reader import ConfigReader
+
+_PRICE_FIELDS = ('open', 'high', 'low', 'close', 'pre_close')
+
+
+# 从 stock_1d 加载价格面板，行为日期，列为股票代码，停牌日为 NaN
+def LoadPricePanel(stock_ids: list[str], start_time: datetime, end_time: datetime, field: str = 'close') -> pd.DataFrame:
+    if field not in _PRICE_FIELDS:
+        raise ValueError(f"Unknown price field: {field}")
+    db_config = ConfigReader().get_db_config()
+    db_config['database'] = 'tframe_stock_1d'
+    conn = mysql.connector.connect(**db_config)
+    cursor = conn.cursor()
+    placeholders = ", ".join(["%s"] * len(stock_ids))
+    query = f"""
+        SELECT date, code, {field} + 0E0 FROM stock_1d
+        WHERE code IN ({placeholders}) AND date >= %s AND date <= %s
+    """
+    cursor.execute(query, (*stock_ids, start_time.strftime("%Y%m%d"), end_time.strftime("%Y%m%d")))
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+
+    df = pd.DataFrame(rows, columns=['date', 'code', field])
+    df[field] = df[field].astype(np.float64)
+    panel = df.pivot(index='date', columns='code', values=field)
+    return panel.reindex(columns=stock_ids).sort_index()
+
+
+# 向量化回测结果
+@dataclass
+class VectorizedBacktestResult:
+    dates: np.ndarray           # (T,) 日期
+    stock_ids: list[str]        # (N,) 股票代码
+    nav: np.ndarray             # (T,) 调仓后的总资产
+    cash: np.ndarray            # (T,) 调仓后的可用资金
+    holdings: np.ndarray        # (T, N) 调仓后的持仓数量
+    fills: np.ndarray           # (T, N) 当日成交数量，正数买入，负数卖出
+    turnover: np.ndarray        # (T,) 当日成交金额 / 调仓前总资产
+
+    # 净值、现金、换手率
+    def ToDataFrame(self) -> pd.DataFrame:
+        return pd.DataFrame({'nav': self.nav, 'cash': self.cash, 'turnover': self.turnover}, index=self.dates)
+
+    # 持仓数量
+    def HoldingsDataFrame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.holdings, index=self.dates, columns=self.stock_ids)
+
+    # 成交数量
+    def FillsDataFrame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.fills, index=self.dates, columns=self.stock_ids)
+
+
+# 向量化信号矩阵回测器
+# 输入目标权重矩阵(日期 x 股票)和同形状的价格面板，每个日期按当日价格调仓到目标权重
+# 规则与 BacktestAccount 一致：
+#   - 成交数量向下取整到 LOT_SIZE 的整数倍
+#   - 不允许卖空，负权重按 0 处理
+#   - 先卖后买，买入金额超过可用资金时按比例缩减买单
+#   - 停牌(价格为 NaN)的股票当日不交易，按最近一次价格估值
+# 权重需要由调用方自行滞后，回测器不做任何前视偏差处理
+class VectorizedBacktester:
+    def __init__(self, initial_cash: float = 1000000):
+        self._initial_cash = float(initial_cash)
+
+    # 从 stock_1d 加载价格后回测，weights 需为 DataFrame
+    def RunFromDatabase(self, weights: pd.DataFrame, price_field: str = 'close') -> VectorizedBacktestResult:
+        stock_ids = list(weights.columns)
+        start_time = pd.Timestamp(weights.index.min()).to_pydatetime()
+        end_time = pd.Timestamp(weights.index.max()).to_pydatetime()
+        prices = LoadPricePanel(stock_ids, start_time, end_time, price_field)
+        return self.Run(weights, prices)
+
+    # 回测
+    # weights/prices 为 DataFrame 时按 prices 的行列对齐 weights，缺失权重视为 0
+    # 为 ndarray 时两者形状必须相同，可以通过 dates/stock_ids 指定行列标签
+    def Run(self, weights, prices, dates=None, stock_ids: list[str] = None) -> VectorizedBacktestResult:
+        if isinstance(prices, pd.DataFrame):
+            if isinstance(weights, pd.DataFrame):
+                weights = weights.reindex(index=prices.index, columns=prices.columns)
+            dates = prices.index.values
+            stock_ids = list(prices.columns)
+            prices = prices.to_numpy(dtype=np.float64)
+        if isinstance(weights, pd.DataFrame):
+            weights = weights.to_numpy(dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.shape != prices.shape:
+            raise ValueError(f"weights shape {weights.shape} does not match prices shape {prices.shape}")
+
+        n_dates, n_stocks = prices.shape
+        if dates is None:
+            dates = np.arange(n_dates)
+        if stock_ids is None:
+            stock_ids = list(range(n_stocks))
+
+        weights = np.clip(np.nan_to_num(weights, nan=0.0), 0.0, None)
+        tradable = ~np.isnan(prices)
+        # 估值价格：停牌时沿用最近一次价格，从未有价格时为 0
+        valuation_prices = pd.DataFrame(prices).ffill().fillna(0.0).to_numpy()
+
+        nav = np.empty(n_dates, dtype=np.float64)
+        cash_curve = np.empty(n_dates, dtype=np.float64)
+        turnover = np.zeros(n_dates, dtype=np.float64)
+        holdings_curve = np.empty((n_dates, n_stocks), dtype=np.int64)
+        fills = np.zeros((n_dates, n_stocks), dtype=np.int64)
+
+        cash = self._initial_cash
+        holdings = np.zeros(n_stocks, dtype=np.int64)
+        for t in range(n_dates):
+            price = prices[t]
+            valuation_price = valuation_prices[t]
+            can_trade = tradable[t]
+            nav_before = cash + holdings @ valuation_price
+
+            # 目标持仓，向下取整到整手；不可交易的股票保持原持仓
+            trade_price = np.where(can_trade, price, 1.0)
+            target = np.floor(weights[t] * nav_before / (trade_price * LOT_SIZE)).astype(np.int64) * LOT_SIZE
+            target = np.where(can_trade, target, holdings)
+            delta = target - holdings
+
+            # 先卖
+            sells = np.minimum(delta, 0)
+            cash -= sells @ trade_price
+
+            # 再买，资金不足时按比例缩减
+            buys = np.maximum(delta, 0)
+            buy_cost = buys @ trade_price
+            if buy_cost > cash:
+                scale = max(cash, 0.0) / buy_cost
+                buys = np.floor(buys * scale / LOT_SIZE).astype(np.int64) * LOT_SIZE
+                buy_cost = buys @ trade_price
+            cash -= buy_cost
+
+            delta = sells + buys
+            holdings = holdings + delta
+            fills[t] = delta
+            holdings_curve[t] = holdings
+            cash_curve[t] = cash
+            nav[t] = cash + holdings @ valuation_price
+            if nav_before > 0:
+                turnover[t] = (np.abs(delta) @ trade_price) / nav_before
+
+        logging.info(f"向量化回测完成: {n_dates} 个交易日, {n_stocks} 只股票, 期末总资产 {nav[-1] if n_dates else self._initial_cash:.2f}")
+        return VectorizedBacktestResult(
+            dates=np.asarray(dates),
+            stock_ids=stock_ids,
+            nav=nav,
+            cash=cash_curve,
+            holdings=holdings_curve,
+            fills=fills,
+            turnover=turnover,
+        )
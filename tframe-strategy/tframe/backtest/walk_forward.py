@@ -0,0 +1,176 @@
+import copy
+import logging
+import multiprocessing
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from datetime import datetime, date, time
+from tframe.backtest.parameter_sweep import SetupBacktest
+from tframe.strategyinfo.base_strategyinfo import BaseStrategyInfo
+from tframe.timemanager.backtest_timemanager import BacktestTimeManager
+from tframe.timemanager.base_timemanager import TimeMethod, EVENT_TRADE_INIT, EVENT_BEFORE_TRADE_DAY, FREQ_DAILY
+
+
+# 分段回测的起始状态
+@dataclass
+class SegmentSeed:
+    cash: float                                                                 # 可用资金
+    positions: dict[str, tuple[int, float]] = field(default_factory=dict)       # {证券代码: (持仓数量, 成本价)}
+    # 待提交订单 (证券代码, 数量, 限价)，在第一个交易日开始时提交
+    # 期末状态不填充这一项：订单只在当天有效，分段结束时未完成的订单和连续回测一样在下一个交易日过期撤销
+    orders: list[tuple[str, int, float]] = field(default_factory=list)
+
+
+# 单段回测结果
+@dataclass
+class SegmentResult:
+    start_day: date
+    end_day: date
+    seed: SegmentSeed
+    start_value: float                  # 设置起始状态后的总资产
+    daily_values: pd.Series             # 每个交易日结束时的总资产
+    end_state: SegmentSeed              # 期末状态，可作为下一段的起始状态
+    stats: dict
+
+    # 期末是否空仓
+    def IsFlat(self) -> bool:
+        return not any(amount != 0 for amount, _ in self.end_state.positions.values())
+
+
+# 分段回测汇总结果
+@dataclass
+class WalkForwardResult:
+    segments: list[SegmentResult]
+    equity_curve: pd.Series             # 拼接后的总资产曲线
+    exact: bool                         # 所有分段边界都空仓时拼接结果与连续回测一致(不考虑整手取整)
+
+
+# 在策略 TradeInit 之后设置账户起始状态，并在第一个交易日开始时提交待提交订单
+# 需要在策略之后注册到时间管理器
+class _SegmentSeedApplier(TimeMethod):
+    def __init__(self, context, seed: SegmentSeed, start_time: datetime):
+        self._context = context
+        self._seed = seed
+        self._start_time = start_time
+        self._orders_submitted = False
+        self.start_value = seed.cash
+
+    def GetSubscriptions(self) -> dict[str, str]:
+        return {EVENT_TRADE_INIT: FREQ_DAILY, EVENT_BEFORE_TRADE_DAY: FREQ_DAILY}
+
+    def TradeInit(self, time: datetime):
+        self._context.accontinfo.SeedState(self._seed.cash, self._seed.positions, self._start_time)
+        self.start_value = self._context.accontinfo.TotalValue()
+
+    def BeforeTradeDay(self, time: datetime):
+        if self._orders_submitted:
+            return
+        self._orders_submitted = True
+        for stock_id, amount, price in self._seed.orders:
+            self._context.accontinfo.Order(stock_id, amount, price)
+
+    def OnTradeDayStart(self, time: datetime):
+        pass
+
+    def OnTradeDayEnd(self, time: datetime):
+        pass
+
+    def AfterTradeDay(self, time: datetime):
+        pass
+
+    def AfterTradeMinute(self, time: datetime):
+        pass
+
+
+# 子进程入口，运行一段回测
+def _RunSegmentTask(task: tuple) -> SegmentResult:
+    strategy_class, params, strategyinfo, config_text, start_day, end_day, seed = task
+    strategyinfo.SetStrategyStartTime(datetime.combine(start_day, time(0, 0)))
+    strategyinfo.SetStrategyEndTime(datetime.combine(end_day, time(0, 0)))
+
+    context, recorder = SetupBacktest(strategy_class, params, strategyinfo, config_text)
+    seed_applier = _SegmentSeedApplier(context, seed, datetime.combine(start_day, time(9, 0)))
+    context.timemanager.AddTimeMethod(seed_applier)
+    context.timemanager.TimeLoop()
+
+    account = context.accontinfo
+    # 当日未成交订单会在下一个交易日过期，不带入下一段，冻结资金计入期末现金
+    open_orders = account.OpenOrders()
+    if open_orders:
+        logging.warning(f"分段 {start_day} - {end_day} 期末有 {len(open_orders)} 个未完成订单，按过期撤销处理: "
+                        + ", ".join(f"{order.GetStockId()} {order.GetUnfilledAmount()}" for order in open_orders))
+    end_state = SegmentSeed(
+        cash=account.AvailableCash() + account.FrozenCash(),
+        positions={stock_id: (position.Amount(), position.CostPrice())
+                   for stock_id, position in account.Position().items() if position.Amount() != 0},
+    )
+    return SegmentResult(
+        start_day=start_day,
+        end_day=end_day,
+        seed=seed,
+        start_value=seed_applier.start_value,
+        daily_values=recorder.GetDailyValues(),
+        end_state=end_state,
+        stats=recorder.GetStats(),
+    )
+
+
+# 分段并行回测
+# 将回测区间按交易日切分为 segments 段，在多个子进程中同时运行，再把各段的日收益率拼接成一条总资产曲线
+# 默认每段都以 initial_cash 空仓开始，适用于每天收盘前清仓的策略，此时拼接结果与连续回测一致；
+# 期末持仓不为空的分段会在日志中给出警告，也可以通过 seeds 为每段指定起始状态(例如来自检查点)
+class WalkForwardRunner:
+    def __init__(self, strategy_class: type, strategyinfo: BaseStrategyInfo, segments: int,
+                 initial_cash: float = 1000000, params: dict = None, config_text: str = "backtest",
+                 processes: int = None, seeds: list[SegmentSeed] = None):
+        if seeds is not None and len(seeds) != segments:
+            raise ValueError(f"seeds count {len(seeds)} does not match segments {segments}")
+        self._strategy_class = strategy_class
+        self._strategyinfo = strategyinfo
+        self._segments = segments
+        self._initial_cash = float(initial_cash)
+        self._params = params or {}
+        self._config_text = config_text
+        self._processes = processes
+        self._seeds = seeds
+
+    # 按交易日切分回测区间，返回 [(开始日期, 结束日期)]
+    def SplitTradeDays(self) -> list[tuple[date, date]]:
+        trade_days = BacktestTimeManager(self._strategyinfo.GetStrategyStartTime(),
+                                         self._strategyinfo.GetStrategyEndTime()).GetTradeDays()
+        chunks = np.array_split(np.arange(len(trade_days)), min(self._segments, len(trade_days)))
+        return [(trade_days[chunk[0]], trade_days[chunk[-1]]) for chunk in chunks if len(chunk) > 0]
+
+    # 把各段的日收益率拼接为一条总资产曲线
+    def _Stitch(self, segments: list[SegmentResult]) -> pd.Series:
+        returns = []
+        for segment in segments:
+            values = segment.daily_values
+            if values.empty:
+                continue
+            previous = np.concatenate(([segment.start_value], values.to_numpy()[:-1]))
+            returns.append(pd.Series(values.to_numpy() / previous, index=values.index))
+        if not returns:
+            return pd.Series(dtype=np.float64)
+        return self._initial_cash * pd.concat(returns).cumprod()
+
+    # 运行分段回测
+    def Run(self) -> WalkForwardResult:
+        ranges = self.SplitTradeDays()
+        seeds = self._seeds or [SegmentSeed(cash=self._initial_cash) for _ in ranges]
+        tasks = [(self._strategy_class, self._params, copy.deepcopy(self._strategyinfo), self._config_text,
+                  start_day, end_day, seed)
+                 for (start_day, end_day), seed in zip(ranges, seeds)]
+        processes = max(1, min(self._processes or multiprocessing.cpu_count(), len(tasks)))
+        logging.info(f"开始分段回测: {len(tasks)} 段, {processes} 个进程")
+
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(processes=processes, maxtasksperchild=1) as pool:
+            segments = pool.map(_RunSegmentTask, tasks, chunksize=1)
+
+        exact = True
+        for segment in segments[:-1]:
+            if not segment.IsFlat():
+                exact = False
+                logging.warning(f"分段 {segment.start_day} - {segment.end_day} 期末持仓不为空，拼接后的总资产曲线只是近似结果")
+        return WalkForwardResult(segments=segments, equity_curve=self._Stitch(segments), exact=exact)
@@ -1,10 +1,21 @@
 import sys
 import logging
-from tframe.timemanager.base_timemanager import TimeMethod
+from tframe.timemanager.base_timemanager import TimeMethod, ALL_EVENTS, FREQ_1M
 from tframe.tframe import TContext
 from datetime import datetime
 
 class BaseStrategy():
+    # 订阅的事件及频率，返回 {事件名: 频率}，未订阅的回调不会被调用
+    # 例如只在日级别交易的策略可以返回 {"BeforeTradeDay": "1d", "OnTradeDayEnd": "1d"}
+    # 需要 5 分钟级别回调的策略可以返回 {"AfterTradeMinute": "5m"}
+    def GetSubscriptions(self) -> dict[str, str]:
+        return dict.fromkeys(ALL_EVENTS, FREQ_1M)
+
+    # 设置策略参数，参数以属性形式保存在策略实例上，供参数寻优使用
+    def SetParams(self, params: dict):
+        for name, value in params.items():
+            setattr(self, name, value)
+
     # 策略初始化函数，全局只执行一次
     def TradeInit(self, time: datetime, context: TContext):
         pass
@@ -43,6 +54,10 @@ class StrategyTrigger(TimeMethod):
         self.strategy = strategy
         self.context = context
 
+    # 订阅信息由策略决定
+    def GetSubscriptions(self) -> dict[str, str]:
+        return self.strategy.GetSubscriptions()
+
     # 策略初始化函数，全局只执行一次
     def TradeInit(self, time: datetime):
         self.strategy.TradeInit(time, self.context)
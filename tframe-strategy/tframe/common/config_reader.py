@@ -30,6 +30,14 @@ class ConfigReader:
             'database': self._config['db_conn']['database']
         }
     
+    def get_db_pool_config(self) -> dict:
+        """获取数据库连接池配置，未配置 [db_pool] 时使用默认值"""
+        return {
+            'pool_size': self._config.getint('db_pool', 'pool_size', fallback=4),
+            'health_check_interval': self._config.getfloat('db_pool', 'health_check_interval', fallback=30),
+            'acquire_timeout': self._config.getfloat('db_pool', 'acquire_timeout', fallback=60),
+        }
+
     def get_db_root_config(self) -> dict:
         """获取数据库配置"""
         return {
@@ -0,0 +1,109 @@
+import logging
+import queue
+import threading
+import time
+import mysql.connector
+from contextlib import contextmanager
+
+
+# 有上限的 MySQL 连接池
+# 连接按需创建，最多 pool_size 个，全部被占用时 Acquire 会阻塞等待
+# 连接空闲超过 health_check_interval 秒后，再次取出前先 ping 检查，失效时重新创建
+# 连接开启 autocommit，避免长连接停留在旧的一致性读快照上，看不到其他连接新写入的数据
+# Cursor 等待空闲连接最多 acquire_timeout 秒，超时抛出 TimeoutError，为 None 时一直等待
+class MySQLConnectionPool:
+    def __init__(self, db_config: dict, pool_size: int = 4, health_check_interval: float = 30,
+                 acquire_timeout: float = None):
+        if pool_size <= 0:
+            raise ValueError(f"pool_size must be positive: {pool_size}")
+        self._db_config = dict(db_config)
+        self._pool_size = pool_size
+        self._health_check_interval = health_check_interval
+        self._acquire_timeout = acquire_timeout
+        self._idle: queue.LifoQueue = queue.LifoQueue()     # (连接, 放回时间)
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._closed = False
+
+    def _Connect(self):
+        conn = mysql.connector.connect(**self._db_config)
+        conn.autocommit = True
+        return conn
+
+    # 检查空闲连接是否可用，不可用时关闭并返回 False
+    def _CheckHealth(self, conn, released_at: float) -> bool:
+        if time.monotonic() - released_at < self._health_check_interval:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except mysql.connector.Error as e:
+            logging.warning(f"数据库连接 {self._db_config.get('database')} 已失效，重新连接: {e}")
+            self._CloseQuietly(conn)
+            return False
+
+    @staticmethod
+    def _CloseQuietly(conn):
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+
+    # 获取连接，timeout 为 None 时一直等待
+    def Acquire(self, timeout: float = None):
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No free connection in pool after {timeout} seconds")
+        try:
+            while True:
+                try:
+                    conn, released_at = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._Connect()
+                if self._CheckHealth(conn, released_at):
+                    return conn
+        except BaseException:
+            self._slots.release()
+            raise
+
+    # 归还连接，broken 为 True 时直接关闭
+    def Release(self, conn, broken: bool = False):
+        if broken or self._closed:
+            self._CloseQuietly(conn)
+        else:
+            self._idle.put((conn, time.monotonic()))
+        self._slots.release()
+
+    def GetPoolSize(self) -> int:
+        return self._pool_size
+
+    # 获取游标，退出时关闭游标并归还连接；执行出错时连接不再复用
+    # timeout 为 None 时使用 acquire_timeout
+    @contextmanager
+    def Cursor(self, timeout: float = None):
+        conn = self.Acquire(self._acquire_timeout if timeout is None else timeout)
+        broken = False
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            yield cursor
+        except mysql.connector.Error:
+            broken = True
+            raise
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except mysql.connector.Error:
+                    broken = True
+            self.Release(conn, broken)
+
+    # 关闭所有空闲连接，正在使用的连接在归还时关闭
+    def Close(self):
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._CloseQuietly(conn)
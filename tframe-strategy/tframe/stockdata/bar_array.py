@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+
+# 列式 bar 容器
+# 每列是一个 numpy 数组(价格 float64、成交量 int64、时间 datetime64)，按时间升序排列
+# 切片返回的是原数组上的视图，不复制数据；只有调用 to_dataframe 时才构建 DataFrame
+class BarArray:
+    def __init__(self, columns: dict[str, np.ndarray], time_column: str = 'timestamp'):
+        if time_column not in columns:
+            raise ValueError(f"Missing time column: {time_column}")
+        times = columns[time_column]
+        if not np.issubdtype(times.dtype, np.datetime64):
+            raise ValueError(f"Time column {time_column} must be datetime64, got {times.dtype}")
+        self._columns = columns
+        self._time_column = time_column
+        self._times = times
+
+    @staticmethod
+    def from_dataframe(df: pd.DataFrame, time_column: str = 'timestamp') -> 'BarArray':
+        """从 DataFrame 构建，数值列转换为 float64，按时间升序排序"""
+        times = pd.to_datetime(df[time_column]).to_numpy(dtype='datetime64[ns]')
+        order = np.argsort(times, kind='stable')
+        columns = {time_column: times[order]}
+        for name in df.columns:
+            if name == time_column:
+                continue
+            values = df[name].to_numpy()
+            if values.dtype == object:
+                try:
+                    values = values.astype(np.float64)
+                except (TypeError, ValueError):
+                    pass
+            columns[name] = values[order]
+        return BarArray(columns, time_column)
+
+    @staticmethod
+    def concatenate(arrays: list['BarArray']) -> 'BarArray':
+        """按顺序拼接多个列相同的 BarArray，调用方保证拼接后仍按时间升序"""
+        if len(arrays) == 1:
+            return arrays[0]
+        first = arrays[0]
+        return BarArray({name: np.concatenate([array[name] for array in arrays]) for name in first.columns},
+                        first.time_column)
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """获取列，返回视图"""
+        return self._columns[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._columns
+
+    @property
+    def columns(self) -> list[str]:
+        return list(self._columns.keys())
+
+    @property
+    def time_column(self) -> str:
+        return self._time_column
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self._columns.values())
+
+    def times(self) -> np.ndarray:
+        """时间列"""
+        return self._times
+
+    def slice(self, lo: int, hi: int) -> 'BarArray':
+        """取第 [lo, hi) 行，返回视图"""
+        return BarArray({name: column[lo:hi] for name, column in self._columns.items()}, self._time_column)
+
+    def bounds(self, start_time: datetime = None, end_time: datetime = None) -> tuple[int, int]:
+        """[start_time, end_time] 对应的行号范围 [lo, hi)，None 表示不限"""
+        lo = 0 if start_time is None else int(np.searchsorted(self._times, np.datetime64(start_time), side='left'))
+        hi = len(self._times) if end_time is None else int(np.searchsorted(self._times, np.datetime64(end_time), side='right'))
+        return lo, max(lo, hi)
+
+    def range(self, start_time: datetime = None, end_time: datetime = None) -> 'BarArray':
+        """获取 [start_time, end_time] 的数据"""
+        return self.slice(*self.bounds(start_time, end_time))
+
+    def last_n(self, end_time: datetime = None, bar_count: int = 1000) -> 'BarArray':
+        """获取不晚于 end_time 的最后 bar_count 条数据"""
+        lo, hi = self.bounds(None, end_time)
+        return self.slice(max(lo, hi - bar_count), hi)
+
+    def first_n(self, start_time: datetime = None, bar_count: int = 1000) -> 'BarArray':
+        """获取不早于 start_time 的前 bar_count 条数据"""
+        lo, hi = self.bounds(start_time, None)
+        return self.slice(lo, min(hi, lo + bar_count))
+
+    def index_of(self, time: datetime) -> int:
+        """指定时间所在的行号，不存在时返回 -1"""
+        target = np.datetime64(time)
+        index = int(np.searchsorted(self._times, target, side='left'))
+        if index < len(self._times) and self._times[index] == target:
+            return index
+        return -1
+
+    def row(self, index: int) -> dict:
+        """获取一行数据，数值为 python 标量，时间为 pd.Timestamp"""
+        ret = {}
+        for name, column in self._columns.items():
+            value = column[index]
+            if np.issubdtype(column.dtype, np.datetime64):
+                ret[name] = pd.Timestamp(value)
+            elif isinstance(value, np.generic):
+                ret[name] = value.item()
+            else:
+                ret[name] = value
+        return ret
+
+    def to_dataframe(self, descending: bool = False) -> pd.DataFrame:
+        """
+        转换为 DataFrame
+        Args:
+            descending: 是否按时间降序，数据源返回的 DataFrame 均为降序
+        1分钟数据(时间列为 timestamp 且没有 date 列)会补上 date、time 两列，与数据库查询结果的格式一致
+        """
+        step = -1 if descending else 1
+        if self._time_column != 'timestamp' or 'date' in self._columns:
+            return pd.DataFrame({name: column[::step] for name, column in self._columns.items()})
+
+        timestamps = pd.DatetimeIndex(self._times[::step])
+        data = {'date': timestamps.date, 'time': timestamps - timestamps.normalize()}
+        for name, column in self._columns.items():
+            if name != self._time_column:
+                data[name] = column[::step]
+        data[self._time_column] = timestamps
+        return pd.DataFrame(data)
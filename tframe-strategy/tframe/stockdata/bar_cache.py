@@ -0,0 +1,85 @@
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+
+
+# 按内存预算淘汰的 LRU 缓存
+# 键通常为 (证券代码, 交易日)，值由调用方决定，写入时需要给出值占用的字节数
+# 总字节数超过 max_bytes 时从最久未使用的条目开始淘汰，单个条目超过预算时不缓存
+# 读写都加锁，可以在预取线程和回测线程之间共用
+class BarCache:
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES):
+        if max_bytes <= 0:
+            raise ValueError(f"max_bytes must be positive: {max_bytes}")
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()      # 键 -> (值, 字节数)
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    # 读取缓存，未命中返回 None
+    def Get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    # 是否已缓存，不计入命中统计
+    def Contains(self, key) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    # 写入缓存
+    def Put(self, key, value, nbytes: int):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if nbytes > self._max_bytes:
+                return
+            self._entries[key] = (value, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self._max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._bytes -= evicted_bytes
+                self._evictions += 1
+
+    # 删除缓存，key 为 None 时清空
+    def Invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    # 当前占用字节数
+    def GetBytes(self) -> int:
+        return self._bytes
+
+    # 内存预算
+    def GetMaxBytes(self) -> int:
+        return self._max_bytes
+
+    # 命中统计
+    def GetStats(self) -> dict:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / total if total else 0.0,
+                'evictions': self._evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self._max_bytes,
+            }
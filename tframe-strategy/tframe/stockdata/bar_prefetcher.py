@@ -0,0 +1,134 @@
+import bisect
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from datetime import datetime, date
+from tframe.stockdata.local_stockdata import LocalStockData
+from tframe.stockdata.daily_stockdata import DailyStockData
+from tframe.timemanager.base_timemanager import TimeMethod, EVENT_TRADE_INIT, EVENT_BEFORE_TRADE_DAY, FREQ_1M, FREQ_DAILY
+
+_DEFAULT_BUDGET_RATIO = 0.5     # 默认内存预算为缓存上限的一半，给当前交易日的数据留出空间
+
+
+# 回测数据预取
+# 在回测线程模拟交易日 D 时，由后台线程把股票池在 D+1 ... D+days_ahead 的1分钟数据加载到 LocalStockData 的缓存中
+# 传入 daily_stockdata 时同时把 DailyStockData 已加载的日线范围延伸到 D+days_ahead，日线回测可以设置 prefetch_1m=False
+# 缓存占用超过 memory_budget 字节后不再提交新的1分钟预取任务，避免把当天正在使用的数据挤出缓存
+# 预取线程与回测线程共用连接池，线程数最多为 pool_size - 1，保证回测线程总有一个连接可用
+# 调用 SetUniverse 更换股票池时取消尚未开始的预取任务
+# 需要在时间管理器中注册，回测结束后调用 Close 释放线程，例如:
+#   prefetcher = BarPrefetcher(stockdata, context.timemanager.GetTradeDays(), universe, days_ahead=2)
+#   context.timemanager.AddTimeMethod(prefetcher)
+class BarPrefetcher(TimeMethod):
+    def __init__(self, stockdata: LocalStockData, trade_days: list[date], universe: list[str] = None,
+                 days_ahead: int = 1, max_workers: int = None, memory_budget: int = None,
+                 daily_stockdata: DailyStockData = None, prefetch_1m: bool = True):
+        if days_ahead <= 0:
+            raise ValueError(f"days_ahead must be positive: {days_ahead}")
+        pool_size = stockdata.GetPoolSize()
+        if pool_size < 2:
+            raise ValueError(f"BarPrefetcher needs a pool_size of at least 2, got {pool_size}")
+        if max_workers is None or max_workers > pool_size - 1:
+            max_workers = pool_size - 1
+        self._stockdata = stockdata
+        self._daily_stockdata = daily_stockdata
+        self._prefetch_1m = prefetch_1m
+        self._trade_days = sorted(trade_days)
+        self._universe = list(universe or [])
+        self._days_ahead = days_ahead
+        cache = stockdata.GetBarCache()
+        self._memory_budget = memory_budget if memory_budget is not None else int(cache.GetMaxBytes() * _DEFAULT_BUDGET_RATIO)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bar_prefetcher")
+        self._pending: dict[tuple[str, str, date], Future] = {}     # (频率, 证券代码, 交易日) -> 任务
+        self._lock = threading.Lock()
+        self._generation = 0            # 每次更换股票池加一，旧股票池的任务开始执行时直接返回
+        self._skipped = 0               # 因超出内存预算未提交的任务数
+
+    def GetSubscriptions(self) -> dict[str, str]:
+        return {EVENT_TRADE_INIT: FREQ_DAILY, EVENT_BEFORE_TRADE_DAY: FREQ_DAILY}
+
+    # 更换股票池，取消尚未开始的预取任务
+    def SetUniverse(self, universe: list[str]):
+        with self._lock:
+            self._generation += 1
+            self._universe = list(universe)
+            for future in self._pending.values():
+                future.cancel()
+            self._pending = {}
+
+    # 在后台线程中加载一只股票一天的数据
+    def _Prefetch(self, freq: str, stock_id: str, trade_day: date, generation: int):
+        try:
+            if generation != self._generation:
+                return
+            if freq == FREQ_DAILY:
+                self._daily_stockdata[stock_id].PrefetchDay(trade_day)
+                return
+            if self._stockdata.GetBarCache().GetBytes() >= self._memory_budget:
+                return
+            self._stockdata[stock_id].PrefetchDay(trade_day)
+        except Exception as e:
+            logging.warning(f"预取 {stock_id} {trade_day} 的{freq}数据失败: {e}")
+        finally:
+            with self._lock:
+                if generation == self._generation:
+                    self._pending.pop((freq, stock_id, trade_day), None)
+
+    # 提交 trade_day 之后(包含 include_current 时包含当天) days_ahead 个交易日的预取任务
+    def _Schedule(self, trade_day: date, include_current: bool):
+        if include_current:
+            start = bisect.bisect_left(self._trade_days, trade_day)
+        else:
+            start = bisect.bisect_right(self._trade_days, trade_day)
+        days = self._trade_days[start:start + self._days_ahead]
+        cache = self._stockdata.GetBarCache()
+        with self._lock:
+            generation = self._generation
+            # 日线按块加载，只需要延伸到最后一天
+            if self._daily_stockdata is not None and days:
+                for stock_id in self._universe:
+                    key = (FREQ_DAILY, stock_id, days[-1])
+                    if key not in self._pending:
+                        self._pending[key] = self._executor.submit(self._Prefetch, *key, generation)
+            if not self._prefetch_1m:
+                return
+            for day in days:
+                for stock_id in self._universe:
+                    if (FREQ_1M, stock_id, day) in self._pending or cache.Contains((stock_id, day)):
+                        continue
+                    if cache.GetBytes() >= self._memory_budget:
+                        self._skipped += 1
+                        continue
+                    key = (FREQ_1M, stock_id, day)
+                    self._pending[key] = self._executor.submit(self._Prefetch, *key, generation)
+
+    # 预取统计
+    def GetStats(self) -> dict:
+        with self._lock:
+            return {'pending': len(self._pending), 'skipped': self._skipped, 'memory_budget': self._memory_budget}
+
+    # 取消未开始的任务并关闭线程池
+    def Close(self):
+        with self._lock:
+            for future in self._pending.values():
+                future.cancel()
+            self._pending = {}
+        self._executor.shutdown(wait=True)
+
+    def TradeInit(self, time: datetime):
+        self._Schedule(time.date(), include_current=True)
+
+    def BeforeTradeDay(self, time: datetime):
+        self._Schedule(time.date(), include_current=False)
+
+    def OnTradeDayStart(self, time: datetime):
+        pass
+
+    def OnTradeDayEnd(self, time: datetime):
+        pass
+
+    def AfterTradeDay(self, time: datetime):
+        pass
+
+    def AfterTradeMinute(self, time: datetime):
+        pass
@@ -0,0 +1,236 @@
+import numpy as np
+from datetime import datetime, date, time
+from pytz import timezone
+from tframe.stockdata.base_stockdata import BaseStockData
+from tframe.stockdata.base_stockbars import StockBars
+from tframe.stockdata.bar_array import BarArray
+from tframe.timemanager.base_timemanager import TimeMethod, EVENT_AFTER_TRADE_MINUTE, FREQ_1M
+
+FREQ_WEEKLY = "1w"
+FREQ_MONTHLY = "1mo"
+
+_MORNING_OPEN = 9 * 60 + 30         # 上午开盘(分钟)
+_MORNING_CLOSE = 11 * 60 + 30       # 上午收盘
+_AFTERNOON_OPEN = 13 * 60           # 下午开盘
+_SESSION_MINUTES = 240              # 全天交易分钟数
+_DAY_CLOSE = time(15, 0)
+_INITIAL_CAPACITY = 256
+
+
+# 1分钟 bar 在当天交易时段中的序号，09:31 为 1，11:30 为 120，13:01 为 121，15:00 为 240
+# 午休期间和开盘前、收盘后的 bar 归入相邻的时段
+def _SessionIndex(minute_of_day: int) -> int:
+    if minute_of_day <= _MORNING_CLOSE:
+        index = minute_of_day - _MORNING_OPEN
+    elif minute_of_day <= _AFTERNOON_OPEN:
+        index = _MORNING_CLOSE - _MORNING_OPEN
+    else:
+        index = _MORNING_CLOSE - _MORNING_OPEN + minute_of_day - _AFTERNOON_OPEN
+    return min(max(index, 1), _SESSION_MINUTES)
+
+
+# 时段序号对应的时间
+def _SessionTime(index: int) -> time:
+    if index <= _MORNING_CLOSE - _MORNING_OPEN:
+        minute_of_day = _MORNING_OPEN + index
+    else:
+        minute_of_day = _AFTERNOON_OPEN + index - (_MORNING_CLOSE - _MORNING_OPEN)
+    return time(minute_of_day // 60, minute_of_day % 60)
+
+
+# 解析重采样频率，分钟级返回间隔分钟数，周线、月线返回频率本身
+def _ParseResampleFrequency(freq: str):
+    freq = freq.strip().lower()
+    if freq in (FREQ_WEEKLY, "weekly"):
+        return FREQ_WEEKLY
+    if freq in (FREQ_MONTHLY, "monthly"):
+        return FREQ_MONTHLY
+    for suffix in ("min", "m"):
+        if freq.endswith(suffix) and freq[:-len(suffix)].isdigit():
+            interval = int(freq[:-len(suffix)])
+            if interval > 1 and _SESSION_MINUTES % interval == 0:
+                return interval
+    raise ValueError(f"Unsupported resample frequency: {freq}")
+
+
+# 单只股票单个周期的重采样结果，按时间升序，容量不足时翻倍
+# 最后一根 bar 在周期结束前会随新的1分钟 bar 更新
+class _ResampledSeries:
+    def __init__(self, period):
+        self._period = period
+        self._size = 0
+        self._last_key = None
+        self._times = np.empty(_INITIAL_CAPACITY, dtype='datetime64[m]')
+        self._open = np.empty(_INITIAL_CAPACITY, dtype=np.float64)
+        self._high = np.empty(_INITIAL_CAPACITY, dtype=np.float64)
+        self._low = np.empty(_INITIAL_CAPACITY, dtype=np.float64)
+        self._close = np.empty(_INITIAL_CAPACITY, dtype=np.float64)
+        self._volume = np.empty(_INITIAL_CAPACITY, dtype=np.int64)
+        self._amount = np.empty(_INITIAL_CAPACITY, dtype=np.float64)
+
+    # 1分钟 bar 所属周期的键和周期的时间标签(周期结束时间)
+    def _Bucket(self, bar_time: datetime) -> tuple:
+        if self._period == FREQ_WEEKLY:
+            return bar_time.isocalendar()[:2], datetime.combine(bar_time.date(), _DAY_CLOSE)
+        if self._period == FREQ_MONTHLY:
+            return (bar_time.year, bar_time.month), datetime.combine(bar_time.date(), _DAY_CLOSE)
+        bucket = -(-_SessionIndex(bar_time.hour * 60 + bar_time.minute) // self._period)
+        return (bar_time.date(), bucket), datetime.combine(bar_time.date(), _SessionTime(bucket * self._period))
+
+    def _Grow(self):
+        capacity = len(self._times) * 2
+        for name in ('_times', '_open', '_high', '_low', '_close', '_volume', '_amount'):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    # 合并一根1分钟 bar
+    def Update(self, bar_time: datetime, open_: float, high: float, low: float, close: float, volume: int, amount: float):
+        key, label = self._Bucket(bar_time)
+        if key == self._last_key:
+            i = self._size - 1
+            if high > self._high[i]:
+                self._high[i] = high
+            if low < self._low[i]:
+                self._low[i] = low
+            self._close[i] = close
+            self._volume[i] += volume
+            self._amount[i] += amount
+            # 周线、月线以周期内最后一个交易日为标签
+            self._times[i] = np.datetime64(label, 'm')
+            return
+        if self._size == len(self._times):
+            self._Grow()
+        i = self._size
+        self._times[i] = np.datetime64(label, 'm')
+        self._open[i] = open_
+        self._high[i] = high
+        self._low[i] = low
+        self._close[i] = close
+        self._volume[i] = volume
+        self._amount[i] = amount
+        self._size += 1
+        self._last_key = key
+
+    # copy 为 False 时返回内部数组的视图：之后的 Update 会原地修改最后一根 bar，扩容后视图不再反映新的 bar
+    def ToBarArray(self, copy: bool = False) -> BarArray:
+        n = self._size
+        columns = {
+            'timestamp': self._times[:n],
+            'open': self._open[:n],
+            'high': self._high[:n],
+            'low': self._low[:n],
+            'close': self._close[:n],
+            'volume': self._volume[:n],
+            'amount': self._amount[:n],
+        }
+        if copy:
+            columns = {name: column.copy() for name, column in columns.items()}
+        return BarArray(columns)
+
+
+# 多周期 bar 重采样
+# 每来一根1分钟 bar，对订阅的每个周期只做一次 O(1) 的合并，不需要每次重新对整个窗口做 resample
+# 分钟周期按 A 股交易时段切分，上午 09:30-11:30、下午 13:00-15:00，周期不跨午休，
+# 例如 60m 的 bar 结束于 10:30、11:30、14:00、15:00，时间标签为周期结束时间
+# 回测时注册到时间管理器，每只股票每个交易日通过 Get1MinDayBars 取一次当天的1分钟数据(LocalStockData 从 bar 缓存读取)，
+# 之后每分钟只把游标推进到当前时间，把新到的 bar 依次合并，不再逐分钟查询；
+# 当天的数据还在实时更新，实盘时每分钟读取最新一根1分钟 bar；其他数据来源可以直接调用 Update
+class BarResampler(TimeMethod):
+    def __init__(self, stockdata: BaseStockData = None, universe: list[str] = None, freqs: list[str] = None):
+        self._stockdata = stockdata
+        self._universe = list(universe or [])
+        self._periods = {freq: _ParseResampleFrequency(freq) for freq in (freqs or ["5m", "15m", "30m", "60m"])}
+        self._series: dict[str, dict[str, _ResampledSeries]] = {}     # 证券代码 -> {周期: 结果}
+        self._last_update: dict[str, datetime] = {}                     # 证券代码 -> 最后一根1分钟 bar 的时间
+        self._day_bars: dict[str, tuple[date, BarArray, int]] = {}      # 证券代码 -> (交易日, 当天1分钟数据, 已合并条数)
+
+    def GetSubscriptions(self) -> dict[str, str]:
+        return {EVENT_AFTER_TRADE_MINUTE: FREQ_1M}
+
+    # 设置股票池，已有的重采样结果保留
+    def SetUniverse(self, universe: list[str]):
+        self._universe = list(universe)
+
+    def _GetSeries(self, stock_id: str) -> dict[str, _ResampledSeries]:
+        series = self._series.get(stock_id)
+        if series is None:
+            series = {freq: _ResampledSeries(period) for freq, period in self._periods.items()}
+            self._series[stock_id] = series
+        return series
+
+    # 合并一根1分钟 bar，时间不晚于已合并的最后一根 bar 时忽略
+    def Update(self, stock_id: str, bar_time: datetime, open_: float, high: float, low: float, close: float,
+               volume: int, amount: float):
+        last = self._last_update.get(stock_id)
+        if last is not None and bar_time <= last:
+            return
+        self._last_update[stock_id] = bar_time
+        for series in self._GetSeries(stock_id).values():
+            series.Update(bar_time, open_, high, low, close, volume, amount)
+
+    # 用历史1分钟数据初始化，例如回测开始前的预热区间
+    def Warmup(self, stock_id: str, start_time: datetime, end_time: datetime):
+        bar_array = self._stockdata[stock_id].Get1MinBars(start_time, end_time).get_bar_array()
+        self._UpdateRange(stock_id, bar_array, 0, len(bar_array))
+
+    # 获取重采样后的 bar，返回的 StockBars 与1分钟数据的接口一致，最后一根 bar 可能尚未走完
+    # 默认返回内部数组的视图，只在当前回调中有效；需要跨分钟保存时传 copy=True
+    def GetBars(self, stock_id: str, freq: str, copy: bool = False) -> StockBars:
+        if freq not in self._periods:
+            raise ValueError(f"Frequency {freq} is not subscribed, available: {list(self._periods)}")
+        ret = StockBars()
+        ret.set_bar_array(self._GetSeries(stock_id)[freq].ToBarArray(copy))
+        return ret
+
+    def TradeInit(self, time: datetime):
+        pass
+
+    def BeforeTradeDay(self, time: datetime):
+        pass
+
+    def OnTradeDayStart(self, time: datetime):
+        pass
+
+    def OnTradeDayEnd(self, time: datetime):
+        pass
+
+    def AfterTradeDay(self, time: datetime):
+        pass
+
+    # 合并 bar_array 中 [lo, hi) 的 bar
+    def _UpdateRange(self, stock_id: str, bar_array: BarArray, lo: int, hi: int):
+        times = bar_array.times()[lo:hi].astype('datetime64[m]').astype(datetime)
+        columns = [bar_array[name][lo:hi].tolist() for name in ('open', 'high', 'low', 'close', 'volume', 'amount')]
+        for bar_time, open_, high, low, close, volume, amount in zip(times, *columns):
+            self.Update(stock_id, bar_time, open_, high, low, close, int(volume), amount)
+
+    # 实盘时读取最新一根1分钟 bar
+    def _UpdateLive(self, stock_id: str, time: datetime):
+        bar_array = self._stockdata[stock_id].Get1MinBarsByCount(time, 1).get_bar_array()
+        if len(bar_array) == 0 or bar_array.times()[-1].astype('datetime64[m]') != np.datetime64(time, 'm'):
+            return
+        self._UpdateRange(stock_id, bar_array, len(bar_array) - 1, len(bar_array))
+
+    # 把当天1分钟数据的游标推进到 time，合并新到的 bar
+    def _UpdateFromDayBars(self, stock_id: str, time: datetime):
+        trade_day = time.date()
+        state = self._day_bars.get(stock_id)
+        if state is None or state[0] != trade_day:
+            state = (trade_day, self._stockdata[stock_id].Get1MinDayBars(trade_day), 0)
+        _, bar_array, cursor = state
+        hi = bar_array.bounds(None, time)[1]
+        if hi > cursor:
+            self._UpdateRange(stock_id, bar_array, cursor, hi)
+        self._day_bars[stock_id] = (trade_day, bar_array, max(hi, cursor))
+
+    def AfterTradeMinute(self, time: datetime):
+        if self._stockdata is None:
+            return
+        if time.date() == datetime.now(timezone('Asia/Shanghai')).date():
+            for stock_id in self._universe:
+                self._UpdateLive(stock_id, time)
+            return
+        for stock_id in self._universe:
+            self._UpdateFromDayBars(stock_id, time)
@@ -1,10 +1,17 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from mysql.connector.connection import MySQLConnection as Connection
+from tframe.stockdata.bar_array import BarArray
 
 # 股票Bar数据基类
+# 数据可以是 DataFrame，也可以是按时间升序的 BarArray
+# 使用 BarArray 时各种查询都在数组上完成，只有调用 get_dataframe 时才构建 DataFrame(按时间降序，与数据库查询结果一致)
+# range、last_n、first_n、get_bars 返回 StockBars 视图，BarArray 数据的视图是数组切片，不复制数据也不构建 DataFrame
 class StockBars:
-    __data: pd.DataFrame
+    __data: pd.DataFrame = None
+    __bar_array: BarArray = None
+    __time_index: tuple = None      # 按时间升序的时间戳索引，见 _get_time_index
     def __init__(self):
         pass
         
@@ -15,65 +22,144 @@ class StockBars:
             copy: 是否返回副本。如果为False，返回原始数据的引用，
                   但请注意这可能会破坏数据封装性
         """
+        if self.__data is None and self.__bar_array is not None:
+            self.__data = self.__bar_array.to_dataframe(descending=True)
         return self.__data.copy() if copy else self.__data
 
     def set_dataframe(self, df: pd.DataFrame):
         """设置DataFrame"""
         self.__data = df
+        self.__bar_array = None
+        self.__time_index = None
 
-    def get_bars(self, start_time: datetime = None, end_time: datetime = None) -> pd.DataFrame:
-        """获取指定时间范围的数据"""
-        if start_time is None and end_time is None:
-            return self.__data
-        
-        mask = pd.Series(True, index=self.__data.index)
-        if start_time is not None:
-            mask &= (self.__data.index.get_level_values('timestamp') >= start_time)
-        if end_time is not None:
-            mask &= (self.__data.index.get_level_values('timestamp') <= end_time)
-        return self.__data[mask]
-
-    def get_bars(self, bar_count: int = 1000, end_time: datetime = None) -> pd.DataFrame:
+    def set_bar_array(self, bar_array: BarArray):
+        """设置 BarArray"""
+        self.__bar_array = bar_array
+        self.__data = None
+        self.__time_index = None
+
+    def get_bar_array(self) -> BarArray:
+        """获取 BarArray，数据为 DataFrame 时首次调用会转换一次"""
+        if self.__bar_array is None:
+            column = 'timestamp' if 'timestamp' in self.__data.columns else 'date'
+            self.__bar_array = BarArray.from_dataframe(self.__data, column)
+        return self.__bar_array
+
+    def _get_time_index(self) -> tuple[np.ndarray, str, np.ndarray]:
         """
-            获取指定数量或时间范围的数据
-            如果end_time为None，则从最新数据开始向前获取bar_count条数据
+        获取按时间升序排列的 int64 时间戳(纳秒)，首次访问时构建
+        Returns:
+            (timestamps, order, positions)
+            order 为 'asc'/'desc' 时数据本身有序，第 i 个时间戳对应第 i 行或倒数第 i+1 行；
+            否则为 None，positions[i] 为第 i 个时间戳对应的行号
         """
-        if end_time is None:
-            return self.__data.iloc[-bar_count:]
+        if self.__time_index is None:
+            column = 'timestamp' if 'timestamp' in self.__data.columns else 'date'
+            values = pd.to_datetime(self.__data[column]).to_numpy(dtype='datetime64[ns]').view(np.int64)
+            if len(values) < 2 or np.all(values[1:] >= values[:-1]):
+                self.__time_index = (values, 'asc', None)
+            elif np.all(values[1:] <= values[:-1]):
+                self.__time_index = (values[::-1], 'desc', None)
+            else:
+                positions = np.argsort(values, kind='stable')
+                self.__time_index = (values[positions], None, positions)
+        return self.__time_index
+
+    def _take(self, lo: int, hi: int) -> 'StockBars':
+        """第 [lo, hi) 个时间戳对应数据的视图，BarArray 数据为数组切片"""
+        ret = StockBars()
+        if self.__bar_array is not None:
+            ret.set_bar_array(self.__bar_array.slice(lo, hi))
         else:
-            # 从endtime往前获取bar_count条数据
-            return self.__data.loc[self.__data.index.get_level_values('timestamp') <= end_time].iloc[-bar_count:]
-        
-    def get_bars(self, bar_count: int = 1000, start_time: datetime = None) -> pd.DataFrame:
+            # 与数据源返回的 DataFrame 一致，按时间降序
+            ret.set_dataframe(self._take_dataframe(lo, hi).iloc[::-1])
+        return ret
+
+    def _take_dataframe(self, lo: int, hi: int) -> pd.DataFrame:
+        """DataFrame 数据按时间升序取出第 [lo, hi) 个时间戳对应的行，数据本身有序时为切片"""
+        timestamps, order, positions = self._get_time_index()
+        if order == 'asc':
+            return self.__data.iloc[lo:hi]
+        if order == 'desc':
+            n = len(timestamps)
+            return self.__data.iloc[n - hi:n - lo].iloc[::-1]
+        return self.__data.iloc[positions[lo:hi]]
+
+    @staticmethod
+    def _to_ns(time) -> int:
+        return pd.Timestamp(time).value
+
+    def _bounds(self, start_time: datetime = None, end_time: datetime = None) -> tuple[int, int]:
+        """[start_time, end_time] 在升序时间戳中的位置 [lo, hi)，None 表示不限"""
+        if self.__bar_array is not None:
+            return self.__bar_array.bounds(start_time, end_time)
+        timestamps = self._get_time_index()[0]
+        lo = 0 if start_time is None else int(np.searchsorted(timestamps, self._to_ns(start_time), side='left'))
+        hi = len(timestamps) if end_time is None else int(np.searchsorted(timestamps, self._to_ns(end_time), side='right'))
+        return lo, max(lo, hi)
+
+    def range(self, start_time: datetime = None, end_time: datetime = None) -> 'StockBars':
+        """获取 [start_time, end_time] 的数据，None 表示不限"""
+        return self._take(*self._bounds(start_time, end_time))
+
+    def last_n(self, end_time: datetime = None, bar_count: int = 1000) -> 'StockBars':
+        """获取不晚于 end_time 的最后 bar_count 条数据，end_time 为 None 时取最新数据"""
+        lo, hi = self._bounds(None, end_time)
+        return self._take(max(lo, hi - bar_count), hi)
+
+    def first_n(self, start_time: datetime = None, bar_count: int = 1000) -> 'StockBars':
+        """获取不早于 start_time 的前 bar_count 条数据，start_time 为 None 时从最老数据开始"""
+        lo, hi = self._bounds(start_time, None)
+        return self._take(lo, min(hi, lo + bar_count))
+
+    def at(self, time: datetime) -> dict:
+        """获取指定时间的数据，不存在时返回 None"""
+        if self.__bar_array is not None:
+            index = self.__bar_array.index_of(time)
+            return self.__bar_array.row(index) if index >= 0 else None
+        timestamps = self._get_time_index()[0]
+        ns = self._to_ns(time)
+        index = int(np.searchsorted(timestamps, ns, side='left'))
+        if index >= len(timestamps) or timestamps[index] != ns:
+            return None
+        return self._take_dataframe(index, index + 1).iloc[0].to_dict()
+
+    def get_bars(self, start_time: datetime = None, end_time: datetime = None, bar_count: int = None) -> 'StockBars':
         """
-            获取指定数量或时间范围的数据
-            如果start_time为None，则从最老数据开始向后获取bar_count条数据
+        获取指定时间范围或数量的数据
+        Args:
+            start_time/end_time: 时间范围，None 表示不限
+            bar_count: 只给出 start_time 时从 start_time 往后取 bar_count 条，
+                       否则从 end_time(或最新数据)往前取 bar_count 条
         """
-        if start_time is None:
-            return self.__data.iloc[:bar_count]
-        else:
-            # 从start_time往后获取bar_count条数据
-            return self.__data.loc[self.__data.index.get_level_values('timestamp') >= start_time].iloc[:bar_count]
-        
-        
+        lo, hi = self._bounds(start_time, end_time)
+        if bar_count is not None:
+            if start_time is not None and end_time is None:
+                hi = min(hi, lo + bar_count)
+            else:
+                lo = max(lo, hi - bar_count)
+        return self._take(lo, hi)
+
     # 常用数据访问方法
     def get_latest_bar(self) -> dict:
         """获取最新的一条数据"""
-        if len(self.__data) == 0:
+        if len(self) == 0:
             return None
-        return self.__data.iloc[-1].to_dict()
+        if self.__bar_array is not None:
+            return self.__bar_array.row(len(self.__bar_array) - 1)
+        n = len(self)
+        return self._take_dataframe(n - 1, n).iloc[0].to_dict()
 
     def get_bar_at(self, time: datetime) -> dict:
         """获取指定时间的数据"""
-        try:
-            return self.__data.loc[time].to_dict()
-        except KeyError:
-            return None
+        return self.at(time)
 
     def __len__(self) -> int:
         """返回数据行数"""
+        if self.__bar_array is not None:
+            return len(self.__bar_array)
         return len(self.__data)
 
     def __getitem__(self, key):
         """支持切片操作"""
-        return self.__data[key]
\ No newline at end of file
+        return self.get_dataframe()[key]
\ No newline at end of file
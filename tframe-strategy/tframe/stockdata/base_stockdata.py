@@ -1,6 +1,8 @@
 import logging
-from datetime import datetime
+import numpy as np
+from datetime import datetime, date, time, timedelta
 from tframe.stockdata.base_stockbars import StockBars
+from tframe.stockdata.bar_array import BarArray
 
 # 单个股票数据获取基类
 class BaseSingleStockData:
@@ -35,6 +37,12 @@ class BaseSingleStockData:
     def GetCurrentPrice(self, time: datetime = None) -> float:
         raise NotImplementedError("GetCurrentPrice is not implemented")
 
+    # 获取某个交易日的全部1分钟数据，按时间升序
+    # 默认通过 Get1MinBars 获取，数据源可以重载为从缓存读取
+    def Get1MinDayBars(self, trade_day: date) -> BarArray:
+        day_start = datetime.combine(trade_day, time(0, 0))
+        return self.Get1MinBars(day_start, day_start + timedelta(days=1) - timedelta(seconds=1)).get_bar_array()
+
 
 # 股票数据获取基类
 # 重载[]运算符，实现股票数据索引
@@ -46,3 +54,14 @@ class BaseStockData:
     # 重载[]运算符，实现股票数据索引
     def __getitem__(self, key) -> BaseSingleStockData:
         raise NotImplementedError("__getitem__ is not implemented")
+
+    # 批量获取多只股票的数据
+    # freq 为 "1d" 或 "1m"，返回以 (时间, 证券代码) 为索引的 DataFrame，
+    # as_array 为 True 时返回 (values, times, fields)，values 形状为 (时间, 证券代码, 字段)，缺失为 NaN
+    def GetBars(self, symbols: list[str], start_time: datetime, end_time: datetime, freq: str = "1d", as_array: bool = False):
+        raise NotImplementedError("GetBars is not implemented")
+
+    # 批量获取多只股票在 time 的价格，返回与 stock_ids 顺序一致的 float64 数组
+    # 默认逐只调用 GetCurrentPrice，数据源可以重载为批量查询
+    def GetPrices(self, stock_ids: list[str], time: datetime = None) -> np.ndarray:
+        return np.array([self[stock_id].GetCurrentPrice(time) for stock_id in stock_ids], dtype=np.float64)
@@ -0,0 +1,143 @@
+import logging
+import os
+import numpy as np
+from datetime import datetime, timedelta
+from tframe.stockdata.base_stockdata import BaseStockData, BaseSingleStockData
+from tframe.stockdata.base_stockbars import StockBars
+from tframe.stockdata.bar_array import BarArray
+
+# 列式存储格式：<root>/<证券代码>/<列名>.npy，每列一个 npy 文件，按时间升序排列
+# timestamp 为 1970-01-01 00:00:00 起的分钟数(int64)，与 TIMESTAMPDIFF(MINUTE, ...) 的结果一致
+# 由 tools/data/export_stock_1m_columnar.py 从 tframe_stock_1m 导出
+COLUMNAR_COLUMNS = {
+    'timestamp': np.int64,
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'volume': np.int64,
+    'amount': np.float64,
+}
+_EPOCH = datetime(1970, 1, 1)
+_ONE_MINUTE = timedelta(minutes=1)
+
+
+# 将时间转换为分钟偏移，ceil 为 True 时向上取整
+def _ToMinute(time: datetime, ceil: bool = False) -> int:
+    delta = time - _EPOCH
+    if ceil:
+        return -((-delta) // _ONE_MINUTE)
+    return delta // _ONE_MINUTE
+
+
+# 列式存储的单个股票数据
+# 各列通过 mmap 打开，按时间区间切片得到的是文件上的视图，不复制数据，
+# 多个回测进程读取同一份文件时共用操作系统的页缓存
+# 日线数据不在列式存储中，需要时委托给 daily_stockdata
+class ColumnarSingleStockData(BaseSingleStockData):
+    def __init__(self, stock_id: str, root: str, daily_stockdata: BaseStockData = None):
+        self.stock_id = stock_id
+        self.__root = root
+        self.__daily_stockdata = daily_stockdata
+        self.__columns: dict[str, np.ndarray] = None
+
+    # 打开各列，文件不存在时为空数组
+    def _GetColumns(self) -> dict[str, np.ndarray]:
+        if self.__columns is None:
+            directory = os.path.join(self.__root, self.stock_id)
+            columns = {}
+            for name, dtype in COLUMNAR_COLUMNS.items():
+                path = os.path.join(directory, f"{name}.npy")
+                if os.path.exists(path):
+                    columns[name] = np.load(path, mmap_mode='r')
+                else:
+                    columns[name] = np.empty(0, dtype=dtype)
+            if len(columns['timestamp']) == 0:
+                logging.warning(f"No columnar data found for {self.stock_id} in {directory}")
+            self.__columns = columns
+        return self.__columns
+
+    # 获取 [start_time, end_time] 区间各列的视图，按时间升序
+    def GetColumns(self, start_time: datetime, end_time: datetime) -> dict[str, np.ndarray]:
+        columns = self._GetColumns()
+        timestamps = columns['timestamp']
+        lo = int(np.searchsorted(timestamps, _ToMinute(start_time, ceil=True), side='left'))
+        hi = int(np.searchsorted(timestamps, _ToMinute(end_time), side='right'))
+        return {name: column[lo:hi] for name, column in columns.items()}
+
+    # 获取截至 end_time 的最后 bar_count 条数据各列的视图，按时间升序
+    def GetColumnsByCount(self, end_time: datetime, bar_count: int) -> dict[str, np.ndarray]:
+        columns = self._GetColumns()
+        hi = int(np.searchsorted(columns['timestamp'], _ToMinute(end_time), side='right'))
+        lo = max(0, hi - bar_count)
+        return {name: column[lo:hi] for name, column in columns.items()}
+
+    # 将列包装为 StockBars，不复制数据
+    @staticmethod
+    def _ToStockBars(columns: dict[str, np.ndarray]) -> StockBars:
+        columns = dict(columns)
+        columns['timestamp'] = columns['timestamp'].view('datetime64[m]')
+        ret = StockBars()
+        ret.set_bar_array(BarArray(columns))
+        return ret
+
+    # 获取1分钟级别数据
+    def Get1MinBars(self, start_time: datetime = None, end_time: datetime = None) -> StockBars:
+        if start_time is None or end_time is None:
+            raise ValueError("start_time and end_time must be provided")
+        return self._ToStockBars(self.GetColumns(start_time, end_time))
+
+    def Get1MinBarsByCount(self, end_time: datetime = None, bar_count: int = None) -> StockBars:
+        if end_time is None:
+            end_time = datetime.now()
+        if bar_count is None:
+            bar_count = 241 # 默认获取241条(1天)数据
+        return self._ToStockBars(self.GetColumnsByCount(end_time, bar_count))
+
+    def _GetDailyStockData(self) -> BaseSingleStockData:
+        if self.__daily_stockdata is None:
+            raise ValueError("Columnar store has no daily bars, pass daily_stockdata to ColumnarStockData")
+        return self.__daily_stockdata[self.stock_id]
+
+    # 获取1天级别数据
+    def Get1DayBars(self, start_time: datetime = None, end_time: datetime = None, bar_count: int = None) -> StockBars:
+        return self._GetDailyStockData().Get1DayBars(start_time, end_time, bar_count)
+
+    # 获取1天级别数据
+    def Get1DayBarsByCount(self, end_time: datetime = None, bar_count: int = None) -> StockBars:
+        return self._GetDailyStockData().Get1DayBarsByCount(end_time, bar_count)
+
+    # 获取当前价格，为不晚于 time 的最后一根 bar 的收盘价
+    def GetCurrentPrice(self, time: datetime = None) -> float:
+        if time is None:
+            time = datetime.now()
+        columns = self._GetColumns()
+        hi = int(np.searchsorted(columns['timestamp'], _ToMinute(time), side='right'))
+        if hi == 0:
+            logging.warning(f"No data found for {self.stock_id} at {time}")
+            return 0
+        return float(columns['close'][hi - 1])
+
+
+# 列式存储的股票数据
+# 用法: TContextFactory.CreateTContext("backtest", strategyinfo, stockdata=ColumnarStockData(root, LocalStockData()))
+class ColumnarStockData(BaseStockData):
+    def __init__(self, root: str, daily_stockdata: BaseStockData = None):
+        self.__root = root
+        self.__daily_stockdata = daily_stockdata
+        self.__single_stockdata: dict[str, ColumnarSingleStockData] = {}
+
+    def __getitem__(self, key) -> ColumnarSingleStockData:
+        single_stockdata = self.__single_stockdata.get(key)
+        if single_stockdata is None:
+            single_stockdata = ColumnarSingleStockData(key, self.__root, self.__daily_stockdata)
+            self.__single_stockdata[key] = single_stockdata
+        return single_stockdata
+
+    # 列式存储中已导出的证券代码，不包括导出过程中的 .tmp、.old 目录
+    def GetStockIds(self) -> list[str]:
+        if not os.path.isdir(self.__root):
+            return []
+        return sorted(name for name in os.listdir(self.__root)
+                      if not name.endswith(('.tmp', '.old'))
+                      and os.path.exists(os.path.join(self.__root, name, 'timestamp.npy')))
@@ -0,0 +1,115 @@
+import logging
+import threading
+import pandas as pd
+from datetime import datetime, date, time, timedelta
+from tframe.stockdata.base_stockdata import BaseStockData, BaseSingleStockData
+from tframe.stockdata.base_stockbars import StockBars
+
+_LOAD_DAYS = 120                    # 缓存未命中时一次加载的自然日天数
+_SESSION_OPEN = time(9, 30)         # 开盘之前使用前收盘价
+_SESSION_CLOSE = time(15, 0)        # 收盘之后才使用收盘价，OnTradeDayEnd(14:55) 时收盘价还未知
+
+
+# 日线回测使用的单个股票数据
+# 日线数据按块加载后缓存在内存中，当前价格由日线推算，不访问1分钟数据
+# BarPrefetcher 可以在后台线程中调用 PrefetchDay 提前加载，加载过程加锁
+class DailySingleStockData(BaseSingleStockData):
+    def __init__(self, stock_id: str, stockdata: BaseStockData):
+        self.stock_id = stock_id
+        self.__stockdata = stockdata
+        self.__bars: dict[date, dict] = {}      # 日期 -> 日线数据
+        self.__loaded_start: date = None        # 已加载的日期范围
+        self.__loaded_end: date = None
+        self.__lock = threading.Lock()
+
+    # 加载 [start, end] 的日线数据
+    def __Load(self, start: date, end: date):
+        df = self.__stockdata[self.stock_id].Get1DayBars(
+            start_time=datetime.combine(start, time(0, 0)),
+            end_time=datetime.combine(end, time(0, 0))).get_dataframe()
+        for row in df.itertuples(index=False):
+            if pd.isna(row.open) or pd.isna(row.close):
+                continue
+            self.__bars[row.date] = {
+                'open': float(row.open),
+                'high': float(row.high),
+                'low': float(row.low),
+                'close': float(row.close),
+                'pre_close': float(row.open) if pd.isna(row.pre_close) else float(row.pre_close),
+                'volume': int(row.volume),
+            }
+
+    # 获取指定交易日的日线数据，停牌或没有数据时返回 None
+    # 回测按时间顺序推进，向后访问时从已加载范围的末尾继续加载，保证已加载范围连续
+    def GetDailyBar(self, day: date) -> dict:
+        with self.__lock:
+            if self.__loaded_start is None or day < self.__loaded_start:
+                self.__bars = {}
+                self.__loaded_start = day
+                self.__loaded_end = day + timedelta(days=_LOAD_DAYS - 1)
+                self.__Load(self.__loaded_start, self.__loaded_end)
+            elif day > self.__loaded_end:
+                start = self.__loaded_end + timedelta(days=1)
+                self.__loaded_end = day + timedelta(days=_LOAD_DAYS - 1)
+                self.__Load(start, self.__loaded_end)
+            return self.__bars.get(day)
+
+    # 把已加载范围向后延伸到包含 day，还没有加载过或 day 已在范围内时直接返回
+    # 还没有加载过时由回测线程第一次访问决定起始日期，避免预取的日期晚于回测当前日期导致重新加载
+    def PrefetchDay(self, day: date):
+        with self.__lock:
+            if self.__loaded_start is None or day <= self.__loaded_end:
+                return
+            start = self.__loaded_end + timedelta(days=1)
+            self.__loaded_end = day + timedelta(days=_LOAD_DAYS - 1)
+            self.__Load(start, self.__loaded_end)
+
+    # 获取1分钟级别数据
+    def Get1MinBars(self, start_time: datetime = None, end_time: datetime = None) -> StockBars:
+        return self.__stockdata[self.stock_id].Get1MinBars(start_time, end_time)
+
+    # 获取1天级别数据
+    def Get1DayBars(self, start_time: datetime = None, end_time: datetime = None, bar_count: int = None) -> StockBars:
+        return self.__stockdata[self.stock_id].Get1DayBars(start_time, end_time, bar_count)
+
+    # 获取1天级别数据
+    def Get1DayBarsByCount(self, end_time: datetime = None, bar_count: int = None) -> StockBars:
+        return self.__stockdata[self.stock_id].Get1DayBarsByCount(end_time, bar_count)
+
+    # 获取当前价格
+    # 开盘前为前收盘价，开盘后到收盘前(包括 OnTradeDayEnd)为开盘价，15:00 收盘之后(AfterTradeDay)为收盘价
+    # 日线数据没有盘中价格，收盘前使用开盘价避免策略在 OnTradeDayEnd 看到当天的收盘价
+    # 停牌时使用最近一个交易日的收盘价
+    def GetCurrentPrice(self, time: datetime = None) -> float:
+        if time is None:
+            time = datetime.now()
+        bar = self.GetDailyBar(time.date())
+        if bar is None:
+            df = self.Get1DayBarsByCount(time - timedelta(days=1), 1).get_dataframe()
+            if df.empty:
+                logging.warning(f"No daily data found for {self.stock_id} at {time}")
+                return 0
+            return float(df.iloc[0]['close'])
+        if time.time() < _SESSION_OPEN:
+            return bar['pre_close']
+        if time.time() < _SESSION_CLOSE:
+            return bar['open']
+        return bar['close']
+
+
+# 日线回测使用的股票数据，包装一个已有的数据源
+class DailyStockData(BaseStockData):
+    def __init__(self, stockdata: BaseStockData):
+        self.__stockdata = stockdata
+        self.__single_stockdata: dict[str, DailySingleStockData] = {}
+
+    def __getitem__(self, key) -> DailySingleStockData:
+        single_stockdata = self.__single_stockdata.get(key)
+        if single_stockdata is None:
+            single_stockdata = DailySingleStockData(key, self.__stockdata)
+            self.__single_stockdata[key] = single_stockdata
+        return single_stockdata
+
+    # 批量获取多只股票的数据
+    def GetBars(self, symbols: list[str], start_time: datetime, end_time: datetime, freq: str = "1d", as_array: bool = False):
+        return self.__stockdata.GetBars(symbols, start_time, end_time, freq, as_array)
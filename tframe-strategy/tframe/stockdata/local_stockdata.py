@@ -1,36 +1,141 @@
+import numpy as np
 import pandas as pd
 import logging
 from tframe.stockdata.base_stockdata import BaseStockData, BaseSingleStockData
 from tframe.stockdata.base_stockbars import StockBars
+from tframe.stockdata.bar_cache import BarCache, DEFAULT_CACHE_BYTES
+from tframe.stockdata.bar_array import BarArray
+from tframe.stockdata.price_adjuster import PriceAdjuster
+from tframe.stockdata.trade_calendar import TradeCalendar
 from tframe.common.config_reader import ConfigReader
+from tframe.common.db_pool import MySQLConnectionPool
 from tframe.common.crawler_jrj_1m import fetch_jrj_1m_data, save_to_db
-import mysql.connector
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta, time as dt_time
 from pytz import timezone
 
+_1D_PANEL_FIELDS = ['open', 'high', 'low', 'close', 'pre_close', 'volume', 'amount', 'adj_factor']
+_1M_PANEL_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'amount']
+_UNION_BATCH_SIZE = 50          # GetBars 获取1分钟数据时每条 UNION ALL 查询包含的股票数
+_MAX_CACHED_SPAN_DAYS = 7       # Get1MinBars 跨度不超过该天数时按交易日从缓存读取，否则直接查询数据库
+
+# 1分钟数据的查询列，在 sql 中完成类型转换：时间戳转为分钟数，DECIMAL 转为 double，
+# 避免 mysql.connector 返回 Decimal 对象
+_1M_SELECT = """
+    TIMESTAMPDIFF(MINUTE, '1970-01-01 00:00:00', timestamp),
+    open + 0E0, high + 0E0, low + 0E0, close + 0E0, COALESCE(volume, 0), amount + 0E0
+"""
+_1M_SELECT_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'amount']
+
+# 日线数据的查询列，数值列转换为 double
+_1D_COLUMNS = ['date', 'code'] + _1D_PANEL_FIELDS
+_1D_SELECT = "date, code, " + ", ".join(f"{field} + 0E0" for field in _1D_PANEL_FIELDS)
+
+
+# 将 _1M_SELECT 的查询结果解码为 BarArray，descending 表示查询结果按时间降序
+def _Decode1MinRows(rows: list, descending: bool = False) -> BarArray:
+    values = np.array(rows, dtype=np.float64).reshape(-1, 1 + len(_1M_SELECT_FIELDS))
+    if descending:
+        values = values[::-1]
+    columns = np.ascontiguousarray(values.T)
+    ret = {'timestamp': columns[0].astype(np.int64).astype('datetime64[m]')}
+    for index, name in enumerate(_1M_SELECT_FIELDS, start=1):
+        ret[name] = columns[index].astype(np.int64) if name == 'volume' else columns[index]
+    return BarArray(ret)
+
+
+def _ToStockBars(bar_array: BarArray) -> StockBars:
+    ret = StockBars()
+    ret.set_bar_array(bar_array)
+    return ret
+
+
 # 本地股票数据获取类，读取本地 sql 数据库
+# 1分钟数据解码为 float64/int64 的 BarArray，返回的 StockBars 只在调用 get_dataframe 时才构建 DataFrame
+# 历史1分钟数据按交易日整天加载到 bar_cache 中，之后同一天的区间、条数、价格查询都在内存中完成
+# 当天的数据还在实时更新，不经过缓存
 class LocalSingleStockData(BaseSingleStockData):
-    def __init__(self, stock_id: str):
-        self.config = ConfigReader()
-
-        # 获取1分钟级别数据
-        self.db_config_1m = self.config.get_db_config()
-        self.db_config_1m['database'] = 'tframe_stock_1m'
+    def __init__(self, stock_id: str, pool_1m: MySQLConnectionPool = None, pool_1d: MySQLConnectionPool = None,
+                 bar_cache: BarCache = None, trade_calendar: TradeCalendar = None):
         self.stock_id = stock_id
-        self.conn_1m = mysql.connector.connect(**self.db_config_1m)
-        self.cursor_1m = self.conn_1m.cursor()
+        self.bar_cache = bar_cache if bar_cache is not None else BarCache()
+
+        # 1分钟级别和1天级别数据的连接池，通常由 LocalStockData 创建并在所有股票间共用
+        # 单独创建时使用各自只有一个连接的连接池，这些连接池归本对象所有，由 Close 或对象销毁时关闭
+        self.__owned_pools: list[MySQLConnectionPool] = []
+        if pool_1m is None or pool_1d is None:
+            default_1m, default_1d = LocalStockData.CreatePools(pool_size=1)
+            if pool_1m is None:
+                pool_1m = default_1m
+                self.__owned_pools.append(default_1m)
+            else:
+                default_1m.Close()
+            if pool_1d is None:
+                pool_1d = default_1d
+                self.__owned_pools.append(default_1d)
+            else:
+                default_1d.Close()
+        self.pool_1m = pool_1m
+        self.pool_1d = pool_1d
+        # 交易日历，按交易日从缓存拼接区间时跳过周末和节假日
+        self.trade_calendar = trade_calendar if trade_calendar is not None else TradeCalendar(pool_1d)
+
+        # 最近一次历史数据查询的结果，多个策略共用同一个数据源时，同一分钟内的重复查询直接返回
+        self.__last_price_query: tuple = None       # (time, price)
+        self.__last_1min_query: tuple = None        # (start_time, end_time, StockBars)
 
-        # 获取1天级别数据
-        self.db_config_1d = self.config.get_db_config()
-        self.db_config_1d['database'] = 'tframe_stock_1d'
-        self.conn_1d = mysql.connector.connect(**self.db_config_1d)
-        self.cursor_1d = self.conn_1d.cursor()
+    # 关闭自己创建的连接池，共用的连接池由 LocalStockData.Close 关闭
+    def Close(self):
+        for pool in self.__owned_pools:
+            pool.Close()
+        self.__owned_pools = []
 
     def __del__(self):
-        self.cursor_1m.close()
-        self.conn_1m.close()
-        self.cursor_1d.close()
-        self.conn_1d.close()
+        if getattr(self, '_LocalSingleStockData__owned_pools', None):
+            self.Close()
+
+    # 获取某个交易日的全部1分钟数据，优先从缓存读取
+    def _GetDayBars(self, trade_day: date) -> BarArray:
+        key = (self.stock_id, trade_day)
+        bar_array = self.bar_cache.Get(key)
+        if bar_array is not None:
+            return bar_array
+
+        day_start = datetime.combine(trade_day, dt_time(0, 0))
+        query = f"""
+            SELECT {_1M_SELECT}
+            FROM `{self.stock_id}`
+            WHERE timestamp >= %s AND timestamp < %s
+            ORDER BY timestamp ASC
+        """
+        with self.pool_1m.Cursor() as cursor:
+            cursor.execute(query, (day_start, day_start + timedelta(days=1)))
+            data = cursor.fetchall()
+
+        bar_array = _Decode1MinRows(data)
+        self.bar_cache.Put(key, bar_array, bar_array.nbytes)
+        return bar_array
+
+    # 获取某个交易日的全部1分钟数据，历史数据从缓存读取，当天的数据还在实时更新，不经过缓存
+    def Get1MinDayBars(self, trade_day: date) -> BarArray:
+        if trade_day == datetime.now(timezone('Asia/Shanghai')).date():
+            return super().Get1MinDayBars(trade_day)
+        return self._GetDayBars(trade_day)
+
+    # 预取某个交易日的1分钟数据到缓存，已缓存时直接返回，供后台预取线程调用
+    def PrefetchDay(self, trade_day: date):
+        if not self.bar_cache.Contains((self.stock_id, trade_day)):
+            self._GetDayBars(trade_day)
+
+    # 从缓存中按交易日拼接 [start_time, end_time] 区间的数据，只读取交易日历中的交易日
+    def _GetCachedRange(self, start_time: datetime, end_time: datetime) -> BarArray:
+        pieces = []
+        for trade_day in self.trade_calendar.GetTradeDays(start_time.date(), end_time.date()):
+            piece = self._GetDayBars(trade_day).range(start_time, end_time)
+            if len(piece) > 0:
+                pieces.append(piece)
+        if not pieces:
+            return _Decode1MinRows([])
+        return BarArray.concatenate(pieces)
 
     def Get1MinBarsByCount(self, end_time: datetime = None, bar_count: int = None) -> StockBars:
         if end_time is None:
@@ -45,23 +150,24 @@ class LocalSingleStockData(BaseSingleStockData):
             if df is not None:
                 # 保存到数据库
                 save_to_db(df, self.stock_id)
+        else:
+            # 当天已有足够的数据时直接从缓存返回，否则(例如开盘前或条数跨天)查询数据库
+            day_bars = self._GetDayBars(end_time.date())
+            lo, hi = day_bars.bounds(None, end_time)
+            if hi - lo >= bar_count:
+                return _ToStockBars(day_bars.slice(hi - bar_count, hi))
 
         # 查询数据库
         query = f"""
-            SELECT date, time, open, high, low, close, volume, amount, timestamp 
+            SELECT {_1M_SELECT}
             FROM `{self.stock_id}`
             WHERE timestamp <= %s
             ORDER BY timestamp DESC LIMIT %s
         """
-        self.cursor_1m.execute(query, (end_time, bar_count))
-        data = self.cursor_1m.fetchall()
-
-        # 创建DataFrame，确保列名与查询结果匹配
-        df = pd.DataFrame(data, columns=['date', 'time', 'open', 'high', 'low', 'close', 'volume', 'amount', 'timestamp'])
-
-        ret = StockBars()
-        ret.set_dataframe(df)
-        return ret
+        with self.pool_1m.Cursor() as cursor:
+            cursor.execute(query, (end_time, bar_count))
+            data = cursor.fetchall()
+        return _ToStockBars(_Decode1MinRows(data, descending=True))
 
     # 获取1分钟级别数据
     def Get1MinBars(self, start_time: datetime = None, end_time: datetime = None) -> StockBars:
@@ -72,28 +178,34 @@ class LocalSingleStockData(BaseSingleStockData):
 
         # 获取东八区当前日期，如果end_time是当前日期，则获取最新数据
         cn_tz = timezone('Asia/Shanghai')
-        if end_time.date() == datetime.now(cn_tz).date():
+        is_today = end_time.date() == datetime.now(cn_tz).date()
+        if is_today:
             # 获取数据
             df = fetch_jrj_1m_data(self.stock_id, end_time.strftime("%Y%m%d"))
             if df is not None:
                 # 保存到数据库
                 save_to_db(df, self.stock_id)
+        elif self.__last_1min_query is not None and self.__last_1min_query[:2] == (start_time, end_time):
+            return self.__last_1min_query[2]
+        elif start_time <= end_time and (end_time.date() - start_time.date()).days <= _MAX_CACHED_SPAN_DAYS:
+            ret = _ToStockBars(self._GetCachedRange(start_time, end_time))
+            self.__last_1min_query = (start_time, end_time, ret)
+            return ret
 
         # 查询数据库
         query = f"""
-            SELECT date, time, open, high, low, close, volume, amount, timestamp 
+            SELECT {_1M_SELECT}
             FROM `{self.stock_id}`
             WHERE timestamp >= %s AND timestamp <= %s
-            ORDER BY timestamp DESC
+            ORDER BY timestamp ASC
         """
-        self.cursor_1m.execute(query, (start_time, end_time))
-        data = self.cursor_1m.fetchall()
+        with self.pool_1m.Cursor() as cursor:
+            cursor.execute(query, (start_time, end_time))
+            data = cursor.fetchall()
 
-        # 创建DataFrame，确保列名与查询结果匹配
-        df = pd.DataFrame(data, columns=['date', 'time', 'open', 'high', 'low', 'close', 'volume', 'amount', 'timestamp'])
-
-        ret = StockBars()
-        ret.set_dataframe(df)
+        ret = _ToStockBars(_Decode1MinRows(data))
+        if not is_today:
+            self.__last_1min_query = (start_time, end_time, ret)
         return ret
     
     def Get1DayBarsByCount(self, end_time: datetime = None, bar_count: int = None) -> StockBars:
@@ -113,19 +225,20 @@ class LocalSingleStockData(BaseSingleStockData):
                 SELECT 
                     date,
                     code,
-                    open,
-                    high,
-                    low,
-                    close,
-                    pre_close,
-                    volume,
-                    amount
+                    open + 0E0,
+                    high + 0E0,
+                    low + 0E0,
+                    close + 0E0,
+                    pre_close + 0E0,
+                    volume + 0E0,
+                    amount + 0E0
                 FROM stock_realtime_list 
                 WHERE code = %s AND date = %s 
                 ORDER BY date DESC LIMIT %s
             """
-            self.cursor_1d.execute(query, (self.stock_id, end_time.strftime("%Y%m%d"), bar_count))
-            row = self.cursor_1d.fetchone()
+            with self.pool_1d.Cursor() as cursor:
+                cursor.execute(query, (self.stock_id, end_time.strftime("%Y%m%d"), bar_count))
+                row = cursor.fetchone()
 
             if row:
                 # 将查询结果换为DataFrame
@@ -145,12 +258,14 @@ class LocalSingleStockData(BaseSingleStockData):
             query_end_time = end_time - timedelta(days=1)
 
         # 获取历史数据
-        query = """
-            SELECT * FROM stock_1d WHERE code = %s AND date <= %s ORDER BY date DESC LIMIT %s
+        query = f"""
+            SELECT {_1D_SELECT} FROM stock_1d WHERE code = %s AND date <= %s ORDER BY date DESC LIMIT %s
         """
-        self.cursor_1d.execute(query, (self.stock_id, query_end_time.strftime("%Y%m%d"), bar_count))
-        data = self.cursor_1d.fetchall()
-        df = pd.concat([df, pd.DataFrame(data, columns=['date', 'code', 'open', 'high', 'low', 'close', 'pre_close', 'volume', 'amount', 'adj_factor'])])
+        with self.pool_1d.Cursor() as cursor:
+            cursor.execute(query, (self.stock_id, query_end_time.strftime("%Y%m%d"), bar_count))
+            data = cursor.fetchall()
+        df = pd.concat([df, pd.DataFrame(data, columns=_1D_COLUMNS)])
+        df[_1D_PANEL_FIELDS] = df[_1D_PANEL_FIELDS].astype(np.float64)
         # 只取前bar_count条数据
         df = df.head(bar_count)
         # 重置索引，确保索引是唯一的
@@ -200,19 +315,20 @@ class LocalSingleStockData(BaseSingleStockData):
                 SELECT 
                     date,
                     code,
-                    open,
-                    high,
-                    low,
-                    close,
-                    pre_close,
-                    volume,
-                    amount
+                    open + 0E0,
+                    high + 0E0,
+                    low + 0E0,
+                    close + 0E0,
+                    pre_close + 0E0,
+                    volume + 0E0,
+                    amount + 0E0
                 FROM stock_realtime_list 
                 WHERE code = %s AND date = %s 
                 ORDER BY date DESC 
             """
-            self.cursor_1d.execute(query, (self.stock_id, end_time.strftime("%Y%m%d")))
-            row = self.cursor_1d.fetchone()
+            with self.pool_1d.Cursor() as cursor:
+                cursor.execute(query, (self.stock_id, end_time.strftime("%Y%m%d")))
+                row = cursor.fetchone()
 
             if row:
                 # 将查询结果换为DataFrame
@@ -232,12 +348,14 @@ class LocalSingleStockData(BaseSingleStockData):
             query_end_time = end_time - timedelta(days=1)
 
         # 获取历史数据
-        query = """
-            SELECT * FROM stock_1d WHERE code = %s AND date >= %s AND date <= %s ORDER BY date DESC
+        query = f"""
+            SELECT {_1D_SELECT} FROM stock_1d WHERE code = %s AND date >= %s AND date <= %s ORDER BY date DESC
         """
-        self.cursor_1d.execute(query, (self.stock_id, start_time.strftime("%Y%m%d"), query_end_time.strftime("%Y%m%d")))
-        data = self.cursor_1d.fetchall()
-        df = pd.concat([df, pd.DataFrame(data, columns=['date', 'code', 'open', 'high', 'low', 'close', 'pre_close', 'volume', 'amount', 'adj_factor'])])
+        with self.pool_1d.Cursor() as cursor:
+            cursor.execute(query, (self.stock_id, start_time.strftime("%Y%m%d"), query_end_time.strftime("%Y%m%d")))
+            data = cursor.fetchall()
+        df = pd.concat([df, pd.DataFrame(data, columns=_1D_COLUMNS)])
+        df[_1D_PANEL_FIELDS] = df[_1D_PANEL_FIELDS].astype(np.float64)
 
         # 重置索引，确保索引是唯一的
         df = df.reset_index(drop=True)
@@ -249,17 +367,191 @@ class LocalSingleStockData(BaseSingleStockData):
     def GetCurrentPrice(self, time: datetime = None) -> float:
         if time is None:
             time = datetime.now()
+        if self.__last_price_query is not None and self.__last_price_query[0] == time:
+            return self.__last_price_query[1]
         # 获取最新1分钟数据
-        df = self.Get1MinBarsByCount(time, 1).get_dataframe()
-        if df.empty:
+        bar = self.Get1MinBarsByCount(time, 1).get_latest_bar()
+        if bar is None:
             logging.warning(f"No data found for {self.stock_id} at {time}")
             return 0
-        return float(df.iloc[-1]['close'])
+        price = bar['close']
+        # 当天的数据还在实时更新，不缓存
+        if time.date() != datetime.now(timezone('Asia/Shanghai')).date():
+            self.__last_price_query = (time, price)
+        return price
 
 # 本地股票数据获取类，读取本地 sql 数据库
+# 每只股票的数据对象只创建一次，同一个 LocalStockData 可以被多个账户共用
+# 所有股票共用两个有上限的连接池(1分钟、1天)，连接数不随股票数量增长
+# pool_size 为 None 时使用配置文件 [db_pool] 中的设置
+# 所有股票共用一个按内存预算淘汰的1分钟数据缓存，cache_bytes 为其字节数上限
 class LocalStockData(BaseStockData):
-    def __init__(self):
-        pass
-    
+    def __init__(self, pool_size: int = None, health_check_interval: float = None, cache_bytes: int = DEFAULT_CACHE_BYTES):
+        self.__pool_1m, self.__pool_1d = LocalStockData.CreatePools(pool_size, health_check_interval)
+        self.__bar_cache = BarCache(cache_bytes)
+        self.__trade_calendar = TradeCalendar(self.__pool_1d)
+        self.__price_adjuster: PriceAdjuster = None
+        self.__single_stockdata: dict[str, LocalSingleStockData] = {}
+
+    # 每个连接池的连接数上限
+    def GetPoolSize(self) -> int:
+        return min(self.__pool_1m.GetPoolSize(), self.__pool_1d.GetPoolSize())
+
+    # 获取1分钟数据缓存，可以通过 GetStats() 查看命中情况
+    def GetBarCache(self) -> BarCache:
+        return self.__bar_cache
+
+    # 获取复权价格计算，例如 GetPriceAdjuster().AdjustBars(stock_id, bars, ADJUST_QFQ, anchor_date=time.date())
+    def GetPriceAdjuster(self) -> PriceAdjuster:
+        if self.__price_adjuster is None:
+            self.__price_adjuster = PriceAdjuster(self.__pool_1d)
+        return self.__price_adjuster
+
+    # 创建 1分钟、1天 数据库的连接池
+    @staticmethod
+    def CreatePools(pool_size: int = None, health_check_interval: float = None) -> tuple[MySQLConnectionPool, MySQLConnectionPool]:
+        config = ConfigReader()
+        pool_config = config.get_db_pool_config()
+        if pool_size is None:
+            pool_size = pool_config['pool_size']
+        if health_check_interval is None:
+            health_check_interval = pool_config['health_check_interval']
+        acquire_timeout = pool_config['acquire_timeout']
+
+        db_config_1m = config.get_db_config()
+        db_config_1m['database'] = 'tframe_stock_1m'
+        db_config_1d = config.get_db_config()
+        db_config_1d['database'] = 'tframe_stock_1d'
+        return (MySQLConnectionPool(db_config_1m, pool_size, health_check_interval, acquire_timeout),
+                MySQLConnectionPool(db_config_1d, pool_size, health_check_interval, acquire_timeout))
+
     def __getitem__(self, key) -> LocalSingleStockData:
-        return LocalSingleStockData(key)
\ No newline at end of file
+        single_stockdata = self.__single_stockdata.get(key)
+        if single_stockdata is None:
+            single_stockdata = LocalSingleStockData(key, self.__pool_1m, self.__pool_1d, self.__bar_cache,
+                                                    self.__trade_calendar)
+            self.__single_stockdata[key] = single_stockdata
+        return single_stockdata
+
+    # 关闭连接池
+    def Close(self):
+        self.__pool_1m.Close()
+        self.__pool_1d.Close()
+
+    # 批量获取多只股票的数据
+    # 日线数据用一次 WHERE code IN (...) 查询，1分钟数据按 _UNION_BATCH_SIZE 只一批用 UNION ALL 查询
+    # 返回以 (date, code) 或 (timestamp, code) 为索引、按时间升序的 DataFrame，价格为 float
+    # as_array 为 True 时返回 (values, times, fields)，values 形状为 (时间, 证券代码, 字段)，证券代码顺序与 symbols 一致
+    def GetBars(self, symbols: list[str], start_time: datetime, end_time: datetime, freq: str = "1d", as_array: bool = False):
+        if freq == "1d":
+            df = self._GetDailyPanel(symbols, start_time, end_time)
+            fields = _1D_PANEL_FIELDS
+        elif freq == "1m":
+            df = self._GetMinutePanel(symbols, start_time, end_time)
+            fields = _1M_PANEL_FIELDS
+        else:
+            raise ValueError(f"Unsupported frequency for GetBars: {freq}")
+        if not as_array:
+            return df
+
+        times = df.index.get_level_values(0).unique().sort_values()
+        full_index = pd.MultiIndex.from_product([times, symbols], names=df.index.names)
+        values = df.reindex(full_index)[fields].to_numpy(dtype=np.float64)
+        return values.reshape(len(times), len(symbols), len(fields)), times.to_numpy(), list(fields)
+
+    # 批量获取多只股票在 time 的价格，为不晚于 time 的最后一根1分钟 bar 的收盘价，没有数据时为 0
+    # 当天数据已在缓存中的股票直接在内存中查找，其余股票按 _UNION_BATCH_SIZE 只一批用 UNION ALL 查询
+    # 当天的数据还在实时更新，逐只调用 GetCurrentPrice
+    def GetPrices(self, stock_ids: list[str], time: datetime = None) -> np.ndarray:
+        if time is None:
+            time = datetime.now()
+        prices = np.zeros(len(stock_ids), dtype=np.float64)
+        if time.date() == datetime.now(timezone('Asia/Shanghai')).date():
+            for index, stock_id in enumerate(stock_ids):
+                prices[index] = self[stock_id].GetCurrentPrice(time)
+            return prices
+
+        missing: dict[str, list[int]] = {}
+        for index, stock_id in enumerate(stock_ids):
+            day_bars = self.__bar_cache.Get((stock_id, time.date()))
+            if day_bars is not None:
+                lo, hi = day_bars.bounds(None, time)
+                if hi > lo:
+                    prices[index] = day_bars['close'][hi - 1]
+                    continue
+            missing.setdefault(stock_id, []).append(index)
+        if not missing:
+            return prices
+
+        found = set()
+        tables = self._GetExistingTables(list(missing))
+        for batch_start in range(0, len(tables), _UNION_BATCH_SIZE):
+            batch = tables[batch_start:batch_start + _UNION_BATCH_SIZE]
+            query = " UNION ALL ".join(
+                f"(SELECT %s, close + 0E0 FROM `{table}` WHERE timestamp <= %s ORDER BY timestamp DESC LIMIT 1)"
+                for table in batch)
+            params = []
+            for table in batch:
+                params.extend((table, time))
+            with self.__pool_1m.Cursor() as cursor:
+                cursor.execute(query, tuple(params))
+                rows = cursor.fetchall()
+            for stock_id, close in rows:
+                found.add(stock_id)
+                prices[missing[stock_id]] = close
+        not_found = [stock_id for stock_id in missing if stock_id not in found]
+        if not_found:
+            logging.warning(f"No data found for {len(not_found)} symbols at {time}: {not_found[:10]}")
+        return prices
+
+    def _GetDailyPanel(self, symbols: list[str], start_time: datetime, end_time: datetime) -> pd.DataFrame:
+        data = []
+        if symbols:
+            placeholders = ", ".join(["%s"] * len(symbols))
+            query = f"""
+                SELECT {_1D_SELECT} FROM stock_1d
+                WHERE code IN ({placeholders}) AND date >= %s AND date <= %s
+            """
+            with self.__pool_1d.Cursor() as cursor:
+                cursor.execute(query, (*symbols, start_time.strftime("%Y%m%d"), end_time.strftime("%Y%m%d")))
+                data = cursor.fetchall()
+        df = pd.DataFrame(data, columns=_1D_COLUMNS)
+        df[_1D_PANEL_FIELDS] = df[_1D_PANEL_FIELDS].astype(np.float64)
+        return df.set_index(['date', 'code']).sort_index()
+
+    # 过滤掉1分钟数据库中不存在的股票表
+    def _GetExistingTables(self, symbols: list[str]) -> list[str]:
+        if not symbols:
+            return []
+        placeholders = ", ".join(["%s"] * len(symbols))
+        query = f"""
+            SELECT table_name FROM information_schema.tables
+            WHERE table_schema = DATABASE() AND table_name IN ({placeholders})
+        """
+        with self.__pool_1m.Cursor() as cursor:
+            cursor.execute(query, tuple(symbols))
+            existing = {row[0] for row in cursor.fetchall()}
+        missing = [symbol for symbol in symbols if symbol not in existing]
+        if missing:
+            logging.warning(f"No 1m table for {len(missing)} symbols: {missing[:10]}")
+        return [symbol for symbol in symbols if symbol in existing]
+
+    def _GetMinutePanel(self, symbols: list[str], start_time: datetime, end_time: datetime) -> pd.DataFrame:
+        data = []
+        tables = self._GetExistingTables(symbols)
+        for batch_start in range(0, len(tables), _UNION_BATCH_SIZE):
+            batch = tables[batch_start:batch_start + _UNION_BATCH_SIZE]
+            query = " UNION ALL ".join(
+                f"(SELECT timestamp, %s, {', '.join(field + ' + 0E0' for field in _1M_PANEL_FIELDS)} FROM `{table}` "
+                f"WHERE timestamp >= %s AND timestamp <= %s)"
+                for table in batch)
+            params = []
+            for table in batch:
+                params.extend((table, start_time, end_time))
+            with self.__pool_1m.Cursor() as cursor:
+                cursor.execute(query, tuple(params))
+                data.extend(cursor.fetchall())
+        df = pd.DataFrame(data, columns=['timestamp', 'code'] + _1M_PANEL_FIELDS)
+        df[_1M_PANEL_FIELDS] = df[_1M_PANEL_FIELDS].astype(np.float64)
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        return df.set_index(['timestamp', 'code']).sort_index()
@@ -0,0 +1,122 @@
+import logging
+import threading
+import time as _time
+import numpy as np
+from datetime import date
+from tframe.common.db_pool import MySQLConnectionPool
+from tframe.stockdata.base_stockbars import StockBars
+from tframe.stockdata.bar_array import BarArray
+
+ADJUST_QFQ = "qfq"      # 前复权
+ADJUST_HFQ = "hfq"      # 后复权
+
+_PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'pre_close')
+_VERSION_CHECK_INTERVAL = 60    # 检查 stock_1d 是否有更新的最小间隔(秒)
+
+
+# 复权价格计算
+# 复权因子来自 stock_1d.adj_factor(tushare 口径)，每只股票的因子序列查询一次后缓存
+#   后复权价格 = 价格 * 当日因子
+#   前复权价格 = 价格 * 当日因子 / 基准日因子
+# 前复权的基准日默认为因子序列的最后一天，回测中应传入当前时间作为基准日，避免用到未来的除权信息
+# 每隔 _VERSION_CHECK_INTERVAL 秒检查一次 information_schema 中 stock_1d 的 UPDATE_TIME，变化时清空缓存；
+# 服务重启后 UPDATE_TIME 可能为 NULL，导入复权因子后也可以直接调用 Invalidate
+class PriceAdjuster:
+    def __init__(self, pool_1d: MySQLConnectionPool):
+        self._pool_1d = pool_1d
+        self._factors: dict[str, tuple[np.ndarray, np.ndarray]] = {}    # 证券代码 -> (日期, 因子)，按日期升序
+        self._version = None
+        self._last_version_check = None
+        self._lock = threading.Lock()
+
+    # 清空缓存，stock_id 为 None 时清空全部
+    def Invalidate(self, stock_id: str = None):
+        with self._lock:
+            if stock_id is None:
+                self._factors = {}
+            else:
+                self._factors.pop(stock_id, None)
+
+    # stock_1d 有更新时清空缓存
+    def _CheckVersion(self):
+        now = _time.monotonic()
+        if self._last_version_check is not None and now - self._last_version_check < _VERSION_CHECK_INTERVAL:
+            return
+        self._last_version_check = now
+        query = """
+            SELECT UPDATE_TIME FROM information_schema.tables
+            WHERE table_schema = DATABASE() AND table_name = 'stock_1d'
+        """
+        with self._pool_1d.Cursor() as cursor:
+            cursor.execute(query)
+            row = cursor.fetchone()
+        version = row[0] if row else None
+        if version is not None and version != self._version:
+            if self._version is not None:
+                logging.info(f"stock_1d 已更新({version})，清空复权因子缓存")
+                self.Invalidate()
+            self._version = version
+
+    # 获取复权因子序列 (日期, 因子)，日期为 datetime64[D]，按升序排列
+    def GetFactors(self, stock_id: str) -> tuple[np.ndarray, np.ndarray]:
+        self._CheckVersion()
+        with self._lock:
+            entry = self._factors.get(stock_id)
+        if entry is not None:
+            return entry
+
+        query = """
+            SELECT date, adj_factor + 0E0 FROM stock_1d
+            WHERE code = %s AND adj_factor IS NOT NULL
+            ORDER BY date ASC
+        """
+        with self._pool_1d.Cursor() as cursor:
+            cursor.execute(query, (stock_id,))
+            rows = cursor.fetchall()
+        dates = np.array([row[0] for row in rows], dtype='datetime64[D]')
+        factors = np.array([row[1] for row in rows], dtype=np.float64)
+        entry = (dates, factors)
+        with self._lock:
+            self._factors[stock_id] = entry
+        return entry
+
+    # 获取每个时间对应的复权因子，早于第一条因子记录时使用第一条，没有因子记录时为 1
+    def GetFactorsAt(self, stock_id: str, times: np.ndarray) -> np.ndarray:
+        dates, factors = self.GetFactors(stock_id)
+        if len(factors) == 0:
+            return np.ones(len(times), dtype=np.float64)
+        index = np.searchsorted(dates, np.asarray(times).astype('datetime64[D]'), side='right') - 1
+        return factors[np.maximum(index, 0)]
+
+    # 计算复权价格的乘数
+    def GetMultipliers(self, stock_id: str, times: np.ndarray, mode: str, anchor_date: date = None) -> np.ndarray:
+        multipliers = self.GetFactorsAt(stock_id, times)
+        if mode == ADJUST_HFQ:
+            return multipliers
+        if mode != ADJUST_QFQ:
+            raise ValueError(f"Unknown adjust mode: {mode}")
+        dates, factors = self.GetFactors(stock_id)
+        if len(factors) == 0:
+            return multipliers
+        if anchor_date is None:
+            anchor = factors[-1]
+        else:
+            anchor = self.GetFactorsAt(stock_id, np.array([np.datetime64(anchor_date, 'D')]))[0]
+        return multipliers / anchor
+
+    # 返回复权后的 BarArray，价格列为新数组，其他列与原数据共用
+    def AdjustBarArray(self, stock_id: str, bar_array: BarArray, mode: str, anchor_date: date = None) -> BarArray:
+        multipliers = self.GetMultipliers(stock_id, bar_array.times(), mode, anchor_date)
+        columns = {}
+        for name in bar_array.columns:
+            column = bar_array[name]
+            if name in _PRICE_COLUMNS:
+                column = column.astype(np.float64) * multipliers
+            columns[name] = column
+        return BarArray(columns, bar_array.time_column)
+
+    # 返回复权后的 StockBars，日线和1分钟数据都适用
+    def AdjustBars(self, stock_id: str, bars: StockBars, mode: str, anchor_date: date = None) -> StockBars:
+        ret = StockBars()
+        ret.set_bar_array(self.AdjustBarArray(stock_id, bars.get_bar_array(), mode, anchor_date))
+        return ret
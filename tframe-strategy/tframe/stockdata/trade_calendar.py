@@ -0,0 +1,46 @@
+import bisect
+import threading
+from datetime import date
+from tframe.common.db_pool import MySQLConnectionPool
+
+
+# 交易日历，stock_1d 中有数据的日期即为交易日，按自然年加载后缓存
+# 当年的日历还在增长，查询超过已加载的最后一个交易日时每天最多重新加载一次
+# 读写加锁，可以在预取线程和回测线程之间共用
+class TradeCalendar:
+    def __init__(self, pool_1d: MySQLConnectionPool):
+        self._pool = pool_1d
+        self._years: dict[int, list[date]] = {}     # 年 -> 交易日(升序)
+        self._loaded_on: dict[int, date] = {}       # 年 -> 加载日期
+        self._lock = threading.Lock()
+
+    def _LoadYear(self, year: int) -> list[date]:
+        query = """
+            SELECT date FROM stock_1d FORCE INDEX (idx_date)
+            WHERE date >= %s AND date <= %s
+            GROUP BY date ORDER BY date
+        """
+        with self._pool.Cursor() as cursor:
+            cursor.execute(query, (f"{year}0101", f"{year}1231"))
+            return [row[0] for row in cursor.fetchall()]
+
+    # 获取某一年的交易日，end 超过已加载的最后一个交易日时，当天没有重新加载过则重新加载
+    def _GetYear(self, year: int, end: date) -> list[date]:
+        with self._lock:
+            days = self._years.get(year)
+            today = date.today()
+            stale = (days is not None and year >= today.year and (not days or end > days[-1])
+                     and self._loaded_on[year] != today)
+            if days is None or stale:
+                days = self._LoadYear(year)
+                self._years[year] = days
+                self._loaded_on[year] = today
+            return days
+
+    # [start, end] 内的交易日，升序
+    def GetTradeDays(self, start: date, end: date) -> list[date]:
+        trade_days = []
+        for year in range(start.year, end.year + 1):
+            days = self._GetYear(year, end)
+            trade_days.extend(days[bisect.bisect_left(days, start):bisect.bisect_right(days, end)])
+        return trade_days
@@ -11,6 +11,8 @@ class BacktestingStrategyInfo(base_strategyinfo.BaseStrategyInfo):
     __strategy_name: str = None
     # 策略基准指数
     __strategy_benchmark_index: str = None
+    # 策略股票池，设置后回测按股票池内的 bar 驱动
+    __strategy_universe: list[str] = None
 
 
     def __init__(self):
@@ -34,6 +36,11 @@ class BacktestingStrategyInfo(base_strategyinfo.BaseStrategyInfo):
     def SetStrategyBenchmarkIndex(self, index: str):
         self.__strategy_benchmark_index = index
 
+    # 设置策略股票池
+    # 仅供回测使用
+    def SetStrategyUniverse(self, universe: list[str]):
+        self.__strategy_universe = list(universe) if universe else None
+
     # 获取策略开始时间
     def GetStrategyStartTime(self):
         return self.__strategy_start_time
@@ -44,4 +51,12 @@ class BacktestingStrategyInfo(base_strategyinfo.BaseStrategyInfo):
 
     # 获取策略名称
     def GetStrategyName(self):
-        return self.__strategy_name
\ No newline at end of file
+        return self.__strategy_name
+
+    # 获取策略基准指数
+    def GetStrategyBenchmarkIndex(self):
+        return self.__strategy_benchmark_index
+
+    # 获取策略股票池
+    def GetStrategyUniverse(self):
+        return self.__strategy_universe
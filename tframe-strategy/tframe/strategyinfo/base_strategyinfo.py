@@ -34,4 +34,17 @@ class BaseStrategyInfo:
 
     # 获取策略名称
     def GetStrategyName(self):
-        raise NotImplementedError("GetStrategyName is not implemented") 
\ No newline at end of file
+        raise NotImplementedError("GetStrategyName is not implemented") 
+
+    # 获取策略基准指数
+    def GetStrategyBenchmarkIndex(self):
+        raise NotImplementedError("GetStrategyBenchmarkIndex is not implemented")
+
+    # 设置策略股票池，回测时开启 bar 驱动模式
+    # 仅供回测使用
+    def SetStrategyUniverse(self, universe: list[str]):
+        raise NotImplementedError("SetStrategyUniverse is not implemented")
+
+    # 获取策略股票池，没有设置时返回 None
+    def GetStrategyUniverse(self):
+        raise NotImplementedError("GetStrategyUniverse is not implemented")
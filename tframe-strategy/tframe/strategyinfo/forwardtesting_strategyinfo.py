@@ -29,3 +29,11 @@ class ForwardTestingStrategyInfo(base_strategyinfo.BaseStrategyInfo):
     # 获取策略名称
     def GetStrategyName(self):
         return self.__strategy_name
+
+    # 获取策略基准指数
+    def GetStrategyBenchmarkIndex(self):
+        return self.__strategy_benchmark_index
+
+    # 实盘不使用股票池驱动
+    def GetStrategyUniverse(self):
+        return None
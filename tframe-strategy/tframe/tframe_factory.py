@@ -1,34 +1,56 @@
 import tframe.tframe as tframe
 from tframe.accontinfo.eastmoney_accontinfo import EastMoneyAccount
 from tframe.strategyinfo.base_strategyinfo import BaseStrategyInfo
+from tframe.timemanager.base_timemanager import BaseTimeManager
 from tframe.timemanager.backtest_timemanager import BacktestTimeManager
+from tframe.timemanager.backtest_daily_timemanager import BacktestDailyTimeManager
 from tframe.timemanager.eastmoney_timemanager import EastMoneyTimeManager
-from tframe.accontinfo.backtest_accountinfo import BacktestAccount
+from tframe.accontinfo.backtest_accountinfo import BacktestAccount, BacktestDailyOrderManager
+from tframe.stockdata.base_stockdata import BaseStockData
 from tframe.stockdata.local_stockdata import LocalStockData
+from tframe.stockdata.daily_stockdata import DailyStockData
 class TContextFactory:
 
     @staticmethod
-    def CreateTContext(config_text: str, strategyinfo: BaseStrategyInfo) -> tframe.TContext:
+    def CreateTContext(config_text: str, strategyinfo: BaseStrategyInfo,
+                       timemanager: BaseTimeManager = None, stockdata: BaseStockData = None) -> tframe.TContext:
         """
         根据配置文本创建TContext
-        :param config_text: 配置文本，如 "base_backtest"
-        :param user: 用户名（如果需要）
-        :param passwd: 密码（如果需要）
+        :param config_text: 配置文本，如 "backtest"、"backtest_daily"
+        :param strategyinfo: 策略信息
+        :param timemanager: 回测时共用的时间管理器，为 None 时新建
+        :param stockdata: 回测时共用的股票数据，为 None 时新建
         :return: TContext实例
         """
         if config_text == "backtest":
             # 创建accontinfo实例
             accontinfo = BacktestAccount()
             
-            # 创建timemanager实例
-            timemanager = BacktestTimeManager(strategyinfo.GetStrategyStartTime(), strategyinfo.GetStrategyEndTime())
+            # 创建timemanager实例，策略设置了股票池时按股票池内的 bar 驱动
+            if timemanager is None:
+                timemanager = BacktestTimeManager(strategyinfo.GetStrategyStartTime(), strategyinfo.GetStrategyEndTime(),
+                                                  strategyinfo.GetStrategyUniverse())
             
             # 创建localstockdata实例
-            local_stockdata = LocalStockData()
+            local_stockdata = stockdata if stockdata is not None else LocalStockData()
 
             # 初始化accontinfo
             accontinfo.Init(local_stockdata, timemanager)
             context = tframe.TContext(accontinfo, strategyinfo, timemanager)
+        elif config_text == "backtest_daily":
+            # 日线回测，按 stock_1d 撮合订单，不触发 AfterTradeMinute
+            accontinfo = BacktestAccount()
+
+            # 创建timemanager实例
+            if timemanager is None:
+                timemanager = BacktestDailyTimeManager(strategyinfo.GetStrategyStartTime(), strategyinfo.GetStrategyEndTime())
+
+            # 创建日线数据实例
+            daily_stockdata = stockdata if stockdata is not None else DailyStockData(LocalStockData())
+
+            # 初始化accontinfo
+            accontinfo.Init(daily_stockdata, timemanager, BacktestDailyOrderManager)
+            context = tframe.TContext(accontinfo, strategyinfo, timemanager)
         elif config_text == "eastmoney_forward":
             # 创建accontinfo实例
             accontinfo = EastMoneyAccount()
@@ -43,3 +65,36 @@ class TContextFactory:
         
         return context
 
+    @staticmethod
+    def CreateTContexts(config_text: str, strategyinfos: list[BaseStrategyInfo]) -> list[tframe.TContext]:
+        """
+        创建多个共用同一个时间管理器和股票数据的回测TContext
+        每个TContext有独立的账户，所有策略在一次 TimeLoop 中运行，股票数据只加载一次
+        :param config_text: 配置文本，只支持 "backtest"、"backtest_daily"
+        :param strategyinfos: 策略信息列表，回测区间必须相同
+        :return: TContext实例列表，调用任意一个的 timemanager.TimeLoop() 即可运行全部策略
+        """
+        if not strategyinfos:
+            return []
+        start_time = strategyinfos[0].GetStrategyStartTime()
+        end_time = strategyinfos[0].GetStrategyEndTime()
+        for strategyinfo in strategyinfos:
+            if strategyinfo.GetStrategyStartTime() != start_time or strategyinfo.GetStrategyEndTime() != end_time:
+                raise ValueError("All strategies sharing one time loop must have the same start and end time")
+
+        if config_text == "backtest":
+            # 所有策略都设置了股票池时按股票池的并集驱动，否则逐分钟驱动
+            universes = [strategyinfo.GetStrategyUniverse() for strategyinfo in strategyinfos]
+            universe = None
+            if all(universes):
+                universe = list(dict.fromkeys(stock_id for stock_ids in universes for stock_id in stock_ids))
+            timemanager = BacktestTimeManager(start_time, end_time, universe)
+            stockdata = LocalStockData()
+        elif config_text == "backtest_daily":
+            timemanager = BacktestDailyTimeManager(start_time, end_time)
+            stockdata = DailyStockData(LocalStockData())
+        else:
+            raise ValueError(f"Unsupported config for shared contexts: {config_text}")
+
+        return [TContextFactory.CreateTContext(config_text, strategyinfo, timemanager, stockdata)
+                for strategyinfo in strategyinfos]
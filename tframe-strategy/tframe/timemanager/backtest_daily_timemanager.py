@@ -0,0 +1,21 @@
+from datetime import datetime, time
+from tframe.timemanager.backtest_timemanager import BacktestTimeManager
+
+
+# 日线回测时间管理器
+# 每个交易日只触发 BeforeTradeDay、OnTradeDayStart、OnTradeDayEnd 和 AfterTradeDay，从不触发 AfterTradeMinute
+class BacktestDailyTimeManager(BacktestTimeManager):
+
+    # 时间循环
+    def TimeLoop(self):
+        self.InitMethod(self._start_date)
+        for trade_day in self._GetLoopTradeDays():  # trade_day 是 datetime.date 对象
+            schedule = self.GetSessionSchedule(trade_day)
+            day_start = datetime.combine(trade_day, time(0, 0))
+            self.BeforeTradeDay(datetime.combine(trade_day, time(9, 0)))
+            self.OnTradeDayStart(day_start + schedule.GetTradeDayStartDelta())
+            self.OnTradeDayEnd(day_start + schedule.GetTradeDayEndDelta())
+            self.AfterTradeDay(datetime.combine(trade_day, time(16, 0)))
+
+        if self._profiler is not None:
+            self._profiler.Report()
@@ -1,26 +1,42 @@
 import logging
 import mysql.connector
+import numpy as np
 import traceback
-from tframe.timemanager.base_timemanager import BaseTimeManager, TimeMethod
+from tframe.timemanager.base_timemanager import BaseTimeManager, \
+    EVENT_TRADE_INIT, EVENT_BEFORE_TRADE_DAY, EVENT_ON_TRADE_DAY_START, EVENT_ON_TRADE_DAY_END, EVENT_AFTER_TRADE_DAY
+from tframe.timemanager.session_schedule import SessionSchedule, EVENT_TRADE_DAY_START, EVENT_TRADE_DAY_END
 from tframe.common.config_reader import ConfigReader
-from datetime import datetime, timedelta, time
+from datetime import datetime, date, timedelta, time
 DB_HOST = ConfigReader().get_db_root_config()['host']
 DB_PORT = ConfigReader().get_db_root_config()['port']
 DB_USER = ConfigReader().get_db_root_config()['user']
 DB_PASSWORD = ConfigReader().get_db_root_config()['password']
 
+_EPOCH = datetime(1970, 1, 1)        # 时间索引的起点，索引值为距该时间的分钟数(本地时间)
+_MINUTES_PER_DAY = 24 * 60
+_INDEX_BATCH_SIZE = 50          # 加载时间索引时每条 UNION 查询包含的股票数
+
 
 # 时间管理器
 class BacktestTimeManager(BaseTimeManager):
-    _time_methods: list[TimeMethod] = []
-    def __init__(self, start_date: datetime, end_date: datetime):
+    def __init__(self, start_date: datetime, end_date: datetime, universe: list[str] = None):
+        super().__init__()
         self._start_date = start_date
         self._end_date = end_date
         # 获取交易日历
         self._trade_days = self._get_trade_days()
+        # bar 驱动模式下的时间索引，None 表示按交易时段逐分钟驱动
+        self._bar_index: np.ndarray = None
+        # 交易时段分钟表，只构建一次，所有交易日共用；特殊交易日(如半日市)单独设置
+        self._session_schedule = SessionSchedule()
+        self._trade_day_schedules: dict[date, SessionSchedule] = {}
+        # 从检查点恢复时，从该交易日开始循环
+        self._resume_day: date = None
+        if universe:
+            self.SetUniverse(universe)
 
     # 获取交易日历
-    def _get_trade_days(self) -> list[datetime.date]:
+    def _get_trade_days(self) -> list[date]:
         conn = mysql.connector.connect(
             host=DB_HOST,
             port=DB_PORT,
@@ -49,108 +65,188 @@ class BacktestTimeManager(BaseTimeManager):
         
         return trade_days
 
-    # 添加时间方法
-    def AddTimeMethod(self, method: TimeMethod):
-        self._time_methods.append(method)
+    # 获取回测区间内的交易日
+    def GetTradeDays(self) -> list[date]:
+        return self._trade_days
+
+    # 从指定交易日恢复回测，TimeLoop 仍会先调用 TradeInit，再跳过该日期之前的交易日
+    def ResumeFrom(self, trade_day: date):
+        self._resume_day = trade_day
+
+    # 获取本次 TimeLoop 需要遍历的交易日
+    def _GetLoopTradeDays(self) -> list[date]:
+        if self._resume_day is None:
+            return self._trade_days
+        return [trade_day for trade_day in self._trade_days if trade_day >= self._resume_day]
+
+    # 获取股票池内所有已加载 bar 的时间戳，合并去重后作为时间索引
+    # 先用一次 information_schema 查询过滤掉不存在的表，再按 _INDEX_BATCH_SIZE 只一批用 UNION 查询，由数据库去重
+    # 返回 int64 数组，值为距 1970-01-01 00:00 的分钟数(本地时间)，升序
+    def _load_bar_index(self, universe: list[str]) -> np.ndarray:
+        conn = mysql.connector.connect(
+            host=DB_HOST,
+            port=DB_PORT,
+            user=DB_USER,
+            password=DB_PASSWORD,
+            database="tframe_stock_1m"
+        )
+        cursor = conn.cursor()
+        start_time = datetime.combine(self._start_date.date(), time(0, 0))
+        end_time = datetime.combine(self._end_date.date(), time(0, 0)) + timedelta(days=1)
+        indexes = []
+        try:
+            tables = []
+            if universe:
+                placeholders = ", ".join(["%s"] * len(universe))
+                cursor.execute(f"""
+                    SELECT table_name FROM information_schema.tables
+                    WHERE table_schema = DATABASE() AND table_name IN ({placeholders})
+                """, tuple(universe))
+                existing = {row[0] for row in cursor.fetchall()}
+                tables = [stock_id for stock_id in universe if stock_id in existing]
+                if len(tables) < len(universe):
+                    logging.warning(f"{len(universe) - len(tables)} 只股票没有1分钟数据表，不计入时间索引")
+
+            for batch_start in range(0, len(tables), _INDEX_BATCH_SIZE):
+                batch = tables[batch_start:batch_start + _INDEX_BATCH_SIZE]
+                query = " UNION ".join(
+                    f"(SELECT TIMESTAMPDIFF(MINUTE, '1970-01-01 00:00:00', timestamp) FROM `{table}` "
+                    f"WHERE timestamp >= %s AND timestamp < %s)"
+                    for table in batch)
+                cursor.execute(query, (start_time, end_time) * len(batch))
+                rows = cursor.fetchall()
+                indexes.append(np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)))
+        finally:
+            cursor.close()
+            conn.close()
+
+        if not indexes:
+            return np.empty(0, dtype=np.int64)
+        # 不同批次之间可能重复，np.unique 返回排序后的去重结果
+        return np.unique(np.concatenate(indexes))
+
+    # 设置股票池，开启 bar 驱动模式
+    # 开启后 TimeLoop 只在股票池内至少一只股票有 bar 的分钟调用 AfterTradeMinute
+    def SetUniverse(self, universe: list[str]):
+        self._bar_index = self._load_bar_index(universe)
+        logging.info(f"bar 驱动模式：股票池 {len(universe)} 只，时间索引 {len(self._bar_index)} 条")
 
     # 初始化方法
     def InitMethod(self, time: datetime):
-        start_timestamp = datetime.now().timestamp()
-        logging.info(f"开始初始化方法 - {time}")
         try:
-            for method in self._time_methods:
-                method.TradeInit(time)
-            logging.info(f"初始化方法完成，耗时: {datetime.now().timestamp() - start_timestamp:.2f}秒")
+            self._Dispatch(EVENT_TRADE_INIT, time)
         except Exception as e:
             logging.error(f"初始化方法出错: {e}, {traceback.format_exc()}")
 
     # 交易日开始时的回调函数
     def BeforeTradeDay(self, time: datetime):
-        start_timestamp = datetime.now().timestamp()
-        logging.info(f"开始执行 BeforeTradeDay 回调函数 - {time}")
         try:
-            for method in self._time_methods:
-                method.BeforeTradeDay(time)
-            logging.info(f"BeforeTradeDay 回调函数执行完成，耗时: {datetime.now().timestamp() - start_timestamp:.2f}秒")
+            self._Dispatch(EVENT_BEFORE_TRADE_DAY, time)
         except Exception as e:
             logging.error(f"BeforeTradeDay 回调函数执行出错: {e}, {traceback.format_exc()}")
 
     # 交易日开始时(09:31:00)的回调函数
     def OnTradeDayStart(self, time: datetime):
-        start_timestamp = datetime.now().timestamp()
-        logging.info(f"开始执行 OnTradeDayStart 回调函数 - {time}")
         try:
-            for method in self._time_methods:
-                method.OnTradeDayStart(time)
-            logging.info(f"OnTradeDayStart 回调函数执行完成，耗时: {datetime.now().timestamp() - start_timestamp:.2f}秒")
+            self._Dispatch(EVENT_ON_TRADE_DAY_START, time)
         except Exception as e:
             logging.error(f"OnTradeDayStart 回调函数执行出错: {e}, {traceback.format_exc()}")
 
     # 交易日结束时(14:55:00)的回调函数
     def OnTradeDayEnd(self, time: datetime):
-        start_timestamp = datetime.now().timestamp()
-        logging.info(f"开始执行 OnTradeDayEnd 回调函数 - {time}")
         try:
-            for method in self._time_methods:
-                method.OnTradeDayEnd(time)
-            logging.info(f"OnTradeDayEnd 回调函数执行完成，耗时: {datetime.now().timestamp() - start_timestamp:.2f}秒")
+            self._Dispatch(EVENT_ON_TRADE_DAY_END, time)
         except Exception as e:
             logging.error(f"OnTradeDayEnd 回调函数执行出错: {e}, {traceback.format_exc()}")
 
     # 交易日结束时的回调函数
     def AfterTradeDay(self, time: datetime):
-        start_timestamp = datetime.now().timestamp()
-        logging.info(f"开始执行 AfterTradeDay 回调函数 - {time}")
         try:
-            for method in self._time_methods:
-                method.AfterTradeDay(time)
-            logging.info(f"AfterTradeDay 回调函数执行完成，耗时: {datetime.now().timestamp() - start_timestamp:.2f}秒")
+            self._Dispatch(EVENT_AFTER_TRADE_DAY, time)
         except Exception as e:
             logging.error(f"AfterTradeDay 回调函数执行出错: {e}, {traceback.format_exc()}")
 
     # 交易分钟结束时的回调函数
     def AfterTradeMinute(self, time: datetime):
-        start_timestamp = datetime.now().timestamp()
-        logging.info(f"开始执行 AfterTradeMinute 回调函数 - {time}")
         try:
-            for method in self._time_methods:
-                method.AfterTradeMinute(time)
-            logging.info(f"AfterTradeMinute 回调函数执行完成，耗时: {datetime.now().timestamp() - start_timestamp:.2f}秒")
+            self._DispatchMinute(time)
         except Exception as e:
             logging.error(f"AfterTradeMinute 回调函数执行出错: {e}, {traceback.format_exc()}")
 
+    # 设置默认交易时段分钟表
+    def SetSessionSchedule(self, schedule: SessionSchedule):
+        self._session_schedule = schedule
+
+    # 为特定交易日设置交易时段分钟表，例如半日市
+    def SetTradeDaySchedule(self, trade_day: date, schedule: SessionSchedule):
+        self._trade_day_schedules[trade_day] = schedule
+
+    # 获取交易日对应的交易时段分钟表
+    def GetSessionSchedule(self, trade_day: date = None) -> SessionSchedule:
+        if trade_day is not None and trade_day in self._trade_day_schedules:
+            return self._trade_day_schedules[trade_day]
+        return self._session_schedule
+
+    # 按交易时段分钟表驱动的单日循环
+    def _schedule_driven_trade_day(self, trade_day: date):
+        schedule = self.GetSessionSchedule(trade_day)
+        day_start = datetime.combine(trade_day, time(0, 0))
+        for delta, flag in schedule.GetTicks():
+            if flag:
+                if flag & EVENT_TRADE_DAY_START:
+                    self.OnTradeDayStart(day_start + schedule.GetTradeDayStartDelta())
+                if flag & EVENT_TRADE_DAY_END:
+                    self.OnTradeDayEnd(day_start + schedule.GetTradeDayEndDelta())
+            self.AfterTradeMinute(day_start + delta)
+
+        flag = schedule.GetTrailingFlag()
+        if flag & EVENT_TRADE_DAY_START:
+            self.OnTradeDayStart(day_start + schedule.GetTradeDayStartDelta())
+        if flag & EVENT_TRADE_DAY_END:
+            self.OnTradeDayEnd(day_start + schedule.GetTradeDayEndDelta())
+
+    # bar 驱动的单日循环，只遍历时间索引中属于该交易日的分钟
+    # OnTradeDayStart/OnTradeDayEnd 在第一根不早于其触发时间的 bar 之前触发，
+    # 如果当天没有这样的 bar，则在当天 bar 遍历完后按原定时间补发
+    def _bar_driven_trade_day(self, trade_day: date):
+        schedule = self.GetSessionSchedule(trade_day)
+        start_minute = schedule.GetTradeDayStartMinute()
+        end_minute = schedule.GetTradeDayEndMinute()
+        day_start = datetime.combine(trade_day, time(0, 0))
+        day_offset = (day_start - _EPOCH).days * _MINUTES_PER_DAY
+        lo = np.searchsorted(self._bar_index, day_offset, side='left')
+        hi = np.searchsorted(self._bar_index, day_offset + _MINUTES_PER_DAY, side='left')
+
+        started = False
+        ended = False
+        for minute in (self._bar_index[lo:hi] - day_offset).tolist():
+            if not started and minute >= start_minute:
+                self.OnTradeDayStart(day_start + schedule.GetTradeDayStartDelta())
+                started = True
+            if not ended and minute >= end_minute:
+                self.OnTradeDayEnd(day_start + schedule.GetTradeDayEndDelta())
+                ended = True
+            self.AfterTradeMinute(day_start + timedelta(minutes=minute))
+
+        if not started:
+            self.OnTradeDayStart(day_start + schedule.GetTradeDayStartDelta())
+        if not ended:
+            self.OnTradeDayEnd(day_start + schedule.GetTradeDayEndDelta())
+
     # 时间循环
     def TimeLoop(self):
         self.InitMethod(self._start_date)
-        for trade_day in self._trade_days:  # trade_day 是 datetime.date 对象
-            # 使用 datetime.combine 直接创建 datetime 对象
-            trade_day_time = datetime.combine(trade_day, time(9, 0))
-            
+        if self._bar_index is not None:
+            run_trade_day = self._bar_driven_trade_day
+        else:
+            run_trade_day = self._schedule_driven_trade_day
+
+        for trade_day in self._GetLoopTradeDays():  # trade_day 是 datetime.date 对象
             # 交易日开始
-            self.BeforeTradeDay(trade_day_time)
-            
-            # 上午交易时段 9:30-11:30
-            morning_start = datetime.combine(trade_day, time(9, 30))
-            morning_end = datetime.combine(trade_day, time(11, 30))
-            current_time = morning_start
-            while current_time <= morning_end:
-                self.AfterTradeMinute(current_time)
-                current_time += timedelta(minutes=1)
-                if current_time.hour == 9 and current_time.minute == 31:
-                    self.OnTradeDayStart(current_time)
-            
-            # 下午交易时段 13:00-15:00
-            afternoon_start = datetime.combine(trade_day, time(13, 0))
-            afternoon_end = datetime.combine(trade_day, time(15, 0))
-            current_time = afternoon_start
-            while current_time <= afternoon_end:
-                self.AfterTradeMinute(current_time)
-                current_time += timedelta(minutes=1)
-                if current_time.hour == 14 and current_time.minute == 55:
-                    self.OnTradeDayEnd(current_time)
-            
-            # 交易日结束，直接使用 combine
-            trade_day_end = datetime.combine(trade_day, time(16, 0))
-            self.AfterTradeDay(trade_day_end)
-
-    
\ No newline at end of file
+            self.BeforeTradeDay(datetime.combine(trade_day, time(9, 0)))
+            run_trade_day(trade_day)
+            # 交易日结束
+            self.AfterTradeDay(datetime.combine(trade_day, time(16, 0)))
+
+        if self._profiler is not None:
+            self._profiler.Report()
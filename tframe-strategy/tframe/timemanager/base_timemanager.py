@@ -1,10 +1,52 @@
 
 from abc import ABC, abstractmethod
 from datetime import datetime
+from tframe.timemanager.callback_profiler import CallbackProfiler
+
+# 时间事件，与 TimeMethod 的回调函数同名
+EVENT_TRADE_INIT = "TradeInit"
+EVENT_BEFORE_TRADE_DAY = "BeforeTradeDay"
+EVENT_ON_TRADE_DAY_START = "OnTradeDayStart"
+EVENT_ON_TRADE_DAY_END = "OnTradeDayEnd"
+EVENT_AFTER_TRADE_DAY = "AfterTradeDay"
+EVENT_AFTER_TRADE_MINUTE = "AfterTradeMinute"
+ALL_EVENTS = [
+    EVENT_TRADE_INIT,
+    EVENT_BEFORE_TRADE_DAY,
+    EVENT_ON_TRADE_DAY_START,
+    EVENT_ON_TRADE_DAY_END,
+    EVENT_AFTER_TRADE_DAY,
+    EVENT_AFTER_TRADE_MINUTE,
+]
+
+# 订阅频率
+FREQ_1M = "1m"      # 每分钟
+FREQ_DAILY = "1d"   # 只订阅日级别事件，AfterTradeMinute 使用该频率等同于不订阅
+
+
+# 解析订阅频率，返回间隔分钟数，日级别返回 0
+# 支持 "1m"、"5m"、"15min"、"1d"、"daily"
+def ParseFrequency(freq: str) -> int:
+    freq = freq.strip().lower()
+    if freq in (FREQ_DAILY, "daily"):
+        return 0
+    for suffix in ("min", "m"):
+        if freq.endswith(suffix) and freq[:-len(suffix)].isdigit():
+            interval = int(freq[:-len(suffix)])
+            if interval > 0:
+                return interval
+    raise ValueError(f"Unknown frequency: {freq}")
 
 # 时间管理器接口
 class TimeMethod(ABC):
 
+    # 订阅的事件及频率，返回 {事件名: 频率}
+    # 时间管理器在注册时据此构建分发列表，未订阅的事件不会被调用
+    # 频率只对 AfterTradeMinute 生效，如 "1m"、"5m"，"1d" 表示只订阅日级别事件
+    # 默认订阅全部事件，每分钟调用
+    def GetSubscriptions(self) -> dict[str, str]:
+        return dict.fromkeys(ALL_EVENTS, FREQ_1M)
+
     # 交易开始时的回调函数
     @abstractmethod
     def TradeInit(self, time: datetime):
@@ -37,43 +79,87 @@ class TimeMethod(ABC):
 
 # 时间管理器
 class BaseTimeManager:
-    _time_methods: list[TimeMethod] = []
+    _time_methods: list[TimeMethod]
+    _dispatch: dict[str, list]                  # 事件 -> 回调列表(AfterTradeMinute 除外)
+    _minute_dispatch: list[tuple[int, object]]  # (间隔分钟数, 回调)，按注册顺序排列
+    _profiler: CallbackProfiler                 # 回调耗时统计，为 None 时不统计
+
     def __init__(self):
-        pass
+        self._time_methods = []
+        self._dispatch = {event: [] for event in ALL_EVENTS}
+        self._minute_dispatch = []
+        self._profiler = None
+
+    # 设置回调耗时统计，传入 None 关闭统计
+    # 开启后分发列表中的回调会被包装为计时版本，关闭时恢复为原始回调
+    def SetProfiler(self, profiler: CallbackProfiler):
+        self._profiler = profiler
+        self._BuildDispatch()
+
+    # 获取回调耗时统计
+    def GetProfiler(self) -> CallbackProfiler:
+        return self._profiler
 
     # 添加时间方法
     def AddTimeMethod(self, method: TimeMethod):
         self._time_methods.append(method)
+        self._BuildDispatch()
 
-    # 初始化时间方法
-    def InitMethod(self, method: TimeMethod):
+    # 根据已注册时间方法的订阅信息构建分发列表
+    def _BuildDispatch(self):
+        dispatch = {event: [] for event in ALL_EVENTS}
+        minute_dispatch = []
         for method in self._time_methods:
-            method.Init(self)
+            for event, freq in method.GetSubscriptions().items():
+                if event not in dispatch:
+                    raise ValueError(f"Unknown event: {event}")
+                callback = getattr(method, event)
+                if self._profiler is not None:
+                    callback = self._profiler.Wrap(method, event, callback)
+                if event == EVENT_AFTER_TRADE_MINUTE:
+                    interval = ParseFrequency(freq)
+                    if interval > 0:
+                        minute_dispatch.append((interval, callback))
+                else:
+                    dispatch[event].append(callback)
+        self._dispatch = dispatch
+        self._minute_dispatch = minute_dispatch
+
+    # 分发日级别事件
+    def _Dispatch(self, event: str, time: datetime):
+        for callback in self._dispatch[event]:
+            callback(time)
+
+    # 分发分钟事件，间隔大于 1 的订阅者只在 当天分钟数 % 间隔 == 0 时调用
+    def _DispatchMinute(self, time: datetime):
+        minute_of_day = time.hour * 60 + time.minute
+        for interval, callback in self._minute_dispatch:
+            if interval == 1 or minute_of_day % interval == 0:
+                callback(time)
+
+    # 初始化方法
+    def InitMethod(self, time: datetime):
+        self._Dispatch(EVENT_TRADE_INIT, time)
 
     # 交易日开始时的回调函数
     def BeforeTradeDay(self, time: datetime):
-        for method in self._time_methods:
-            method.BeforeTradeDay(time)
+        self._Dispatch(EVENT_BEFORE_TRADE_DAY, time)
 
     # 交易日开始时(09:31:00)的回调函数
     def OnTradeDayStart(self, time: datetime):
-        for method in self._time_methods:
-            method.OnTradeDayStart(time)
+        self._Dispatch(EVENT_ON_TRADE_DAY_START, time)
 
     # 交易日结束时(14:55:00)的回调函数
     def OnTradeDayEnd(self, time: datetime):
-        for method in self._time_methods:
-            method.OnTradeDayEnd(time)
+        self._Dispatch(EVENT_ON_TRADE_DAY_END, time)
 
     # 交易日结束时的回调函数
     def AfterTradeDay(self, time: datetime):
-        for method in self._time_methods:
-            method.AfterTradeDay(time)
+        self._Dispatch(EVENT_AFTER_TRADE_DAY, time)
 
     # 交易分钟结束时的回调函数
     def AfterTradeMinute(self, time: datetime):
-        for method in self._time_methods:
-            method.AfterTradeMinute(time)
+        self._DispatchMinute(time)
 
     # 时间循环
     def TimeLoop(self):
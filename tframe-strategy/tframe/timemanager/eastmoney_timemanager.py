@@ -1,11 +1,12 @@
 import logging
 from datetime import datetime, timedelta
-from tframe.timemanager.base_timemanager import BaseTimeManager, TimeMethod
+from tframe.timemanager.base_timemanager import BaseTimeManager, \
+    EVENT_TRADE_INIT, EVENT_BEFORE_TRADE_DAY, EVENT_ON_TRADE_DAY_START, EVENT_ON_TRADE_DAY_END, EVENT_AFTER_TRADE_DAY
 from tframe.common.tushare_global import TushareProGlobal
 # 时间管理器
 class EastMoneyTimeManager(BaseTimeManager):
-    _time_methods: list[TimeMethod] = []
     def __init__(self):
+        super().__init__()
         self._trade_calendar = None
         self._last_calendar_update = None
         self._update_trade_calendar()
@@ -63,119 +64,98 @@ class EastMoneyTimeManager(BaseTimeManager):
             
         return False
 
-    # 添加时间方法
-    def AddTimeMethod(self, method: TimeMethod):
-        self._time_methods.append(method)
-
     # 初始化方法
     def InitMethod(self, time: datetime):
-        start_timestamp = datetime.now().timestamp()
-        logging.info(f"开始初始化方法 - {time}")
         try:
-            for method in self._time_methods:
-                method.TradeInit(time)
-            logging.info(f"初始化方法完成，耗时: {datetime.now().timestamp() - start_timestamp:.2f}秒")
+            self._Dispatch(EVENT_TRADE_INIT, time)
         except Exception as e:
             logging.error(f"初始化方法出错: {e}")
 
     # 交易日开始时的回调函数
     def BeforeTradeDay(self, time: datetime):
-        start_timestamp = datetime.now().timestamp()
-        logging.info(f"开始执行 BeforeTradeDay 回调函数 - {time}")
         try:
-            for method in self._time_methods:
-                method.BeforeTradeDay(time)
-            logging.info(f"BeforeTradeDay 回调函数执行完成，耗时: {datetime.now().timestamp() - start_timestamp:.2f}秒")
+            self._Dispatch(EVENT_BEFORE_TRADE_DAY, time)
         except Exception as e:
             logging.error(f"BeforeTradeDay 回调函数执行出错: {e}")
 
     # 交易日开始时(09:31:00)的回调函数
     def OnTradeDayStart(self, time: datetime):
-        start_timestamp = datetime.now().timestamp()
-        logging.info(f"开始执行 OnTradeDayStart 回调函数 - {time}")
         try:
-            for method in self._time_methods:
-                method.OnTradeDayStart(time)
-            logging.info(f"OnTradeDayStart 回调函数执行完成，耗时: {datetime.now().timestamp() - start_timestamp:.2f}秒")
+            self._Dispatch(EVENT_ON_TRADE_DAY_START, time)
         except Exception as e:
             logging.error(f"OnTradeDayStart 回调函数执行出错: {e}")
 
     # 交易日结束时(14:55:00)的回调函数
     def OnTradeDayEnd(self, time: datetime):
-        start_timestamp = datetime.now().timestamp()
-        logging.info(f"开始执行 OnTradeDayEnd 回调函数 - {time}")
         try:
-            for method in self._time_methods:
-                method.OnTradeDayEnd(time)
-            logging.info(f"OnTradeDayEnd 回调函数执行完成，耗时: {datetime.now().timestamp() - start_timestamp:.2f}秒")
+            self._Dispatch(EVENT_ON_TRADE_DAY_END, time)
         except Exception as e:
             logging.error(f"OnTradeDayEnd 回调函数执行出错: {e}")
 
     # 交易日结束时的回调函数
     def AfterTradeDay(self, time: datetime):
-        start_timestamp = datetime.now().timestamp()
-        logging.info(f"开始执行 AfterTradeDay 回调函数 - {time}")
         try:
-            for method in self._time_methods:
-                method.AfterTradeDay(time)
-            logging.info(f"AfterTradeDay 回调函数执行完成，耗时: {datetime.now().timestamp() - start_timestamp:.2f}秒")
+            self._Dispatch(EVENT_AFTER_TRADE_DAY, time)
         except Exception as e:
             logging.error(f"AfterTradeDay 回调函数执行出错: {e}")
 
     # 交易分钟结束时的回调函数
     def AfterTradeMinute(self, time: datetime):
-        start_timestamp = datetime.now().timestamp()
-        logging.debug(f"开始执行 AfterTradeMinute 回调函数 - {time}")
         try:
-            for method in self._time_methods:
-                method.AfterTradeMinute(time)
-            logging.debug(f"AfterTradeMinute 回调函数执行完成，耗时: {datetime.now().timestamp() - start_timestamp:.2f}秒")
+            self._DispatchMinute(time)
         except Exception as e:
             logging.error(f"AfterTradeMinute 回调函数执行出错: {e}")
 
     # 时间循环
+    # 设置了 profiler 时，每个交易日收盘处理后和循环退出时输出回调耗时统计
     def TimeLoop(self):
         import time
         self.InitMethod(datetime.now())
-        while True:
-            try:
-                current_time = datetime.now()
-                current_date = current_time.strftime('%Y%m%d')
+        try:
+            while True:
+                try:
+                    current_time = datetime.now()
+                    current_date = current_time.strftime('%Y%m%d')
                 
-                # 检查是否是新的交易日
-                if (current_date in self._trade_calendar):
-                    # 如果是早上9:00整，调用交易日开始前的处理
-                    if current_time.hour == 9 and current_time.minute == 0:
-                        self.BeforeTradeDay(current_time)
-                        time.sleep(60)
+                    # 检查是否是新的交易日
+                    if (current_date in self._trade_calendar):
+                        # 如果是早上9:00整，调用交易日开始前的处理
+                        if current_time.hour == 9 and current_time.minute == 0:
+                            self.BeforeTradeDay(current_time)
+                            time.sleep(60)
                         
-                    # 交易日结束后(15点 30分)的处理
-                    if current_time.hour == 15 and current_time.minute == 30:
-                        self.AfterTradeDay(current_time)
-                        time.sleep(60)
+                        # 交易日结束后(15点 30分)的处理
+                        if current_time.hour == 15 and current_time.minute == 30:
+                            self.AfterTradeDay(current_time)
+                            if self._profiler is not None:
+                                self._profiler.Report()
+                            time.sleep(60)
 
-                # 判断是否在交易时间内
-                if self._is_trading_time(current_time):
-                    # 调用分钟结束的回调函数
-                    self.AfterTradeMinute(current_time)
+                    # 判断是否在交易时间内
+                    if self._is_trading_time(current_time):
+                        # 调用分钟结束的回调函数
+                        self.AfterTradeMinute(current_time)
                     
-                    # 如果是交易日开始时间，调用开始回调
-                    if current_time.hour == 9 and current_time.minute == 31:
-                        self.OnTradeDayStart(current_time)
+                        # 如果是交易日开始时间，调用开始回调
+                        if current_time.hour == 9 and current_time.minute == 31:
+                            self.OnTradeDayStart(current_time)
                         
-                    # 如果是交易日结束时间，调用结束回调
-                    elif current_time.hour == 14 and current_time.minute == 55:
-                        self.OnTradeDayEnd(current_time)
+                        # 如果是交易日结束时间，调用结束回调
+                        elif current_time.hour == 14 and current_time.minute == 55:
+                            self.OnTradeDayEnd(current_time)
 
-                # 计算下一分钟的时间并等待
-                current_time = datetime.now()
-                next_minute = current_time.replace(second=0, microsecond=0) + timedelta(minutes=1)
-                sleep_seconds = (next_minute - current_time).total_seconds()
-                time.sleep(sleep_seconds)
+                    # 计算下一分钟的时间并等待
+                    current_time = datetime.now()
+                    next_minute = current_time.replace(second=0, microsecond=0) + timedelta(minutes=1)
+                    sleep_seconds = (next_minute - current_time).total_seconds()
+                    time.sleep(sleep_seconds)
                 
-            except Exception as e:
-                print(f"时间循环发生错误: {e}")
-                # 等待1分钟后继续
-                time.sleep(60)
+                except Exception as e:
+                    print(f"时间循环发生错误: {e}")
+                    # 等待1分钟后继续
+                    time.sleep(60)
+        finally:
+            if self._profiler is not None:
+                self._profiler.Report()
 
     
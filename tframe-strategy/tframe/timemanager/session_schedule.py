@@ -0,0 +1,81 @@
+import numpy as np
+from datetime import time, timedelta
+
+# 分钟事件标记
+EVENT_NONE = 0
+EVENT_TRADE_DAY_START = 1   # 在该分钟的 AfterTradeMinute 之前触发 OnTradeDayStart
+EVENT_TRADE_DAY_END = 2     # 在该分钟的 AfterTradeMinute 之前触发 OnTradeDayEnd
+
+# A股默认交易时段，上午 9:30-11:30，下午 13:00-15:00，两端都包含
+DEFAULT_SESSIONS = [(time(9, 30), time(11, 30)), (time(13, 0), time(15, 0))]
+
+
+def _minute_of_day(t: time) -> int:
+    return t.hour * 60 + t.minute
+
+
+# 预编译的交易时段分钟表
+# 构建一次，之后每个交易日只需要把分钟偏移加到当天零点上
+# offsets: 每个交易分钟距当天零点的分钟数
+# flags:   长度为 len(offsets) + 1，最后一位表示当天分钟遍历结束后需要补发的事件(如半日市没有 14:55)
+class SessionSchedule:
+    def __init__(self, sessions: list[tuple[time, time]] = None,
+                 trade_day_start: time = time(9, 31), trade_day_end: time = time(14, 55)):
+        if sessions is None:
+            sessions = DEFAULT_SESSIONS
+        self._sessions = list(sessions)
+        self._trade_day_start = trade_day_start
+        self._trade_day_end = trade_day_end
+
+        offsets = []
+        for session_start, session_end in self._sessions:
+            offsets.extend(range(_minute_of_day(session_start), _minute_of_day(session_end) + 1))
+        self._offsets = np.array(offsets, dtype=np.int64)
+
+        self._start_minute = _minute_of_day(trade_day_start)
+        self._end_minute = _minute_of_day(trade_day_end)
+        self._flags = np.zeros(len(self._offsets) + 1, dtype=np.uint8)
+        self._flags[np.searchsorted(self._offsets, self._start_minute, side='left')] |= EVENT_TRADE_DAY_START
+        self._flags[np.searchsorted(self._offsets, self._end_minute, side='left')] |= EVENT_TRADE_DAY_END
+
+        # 供时间循环使用的 Python 视图，避免在热循环里逐个读取 numpy 标量
+        self._ticks = [(timedelta(minutes=offset), flag)
+                       for offset, flag in zip(self._offsets.tolist(), self._flags[:-1].tolist())]
+        self._trailing_flag = int(self._flags[-1])
+        self._start_delta = timedelta(minutes=self._start_minute)
+        self._end_delta = timedelta(minutes=self._end_minute)
+
+    # 获取交易分钟偏移数组
+    def GetOffsets(self) -> np.ndarray:
+        return self._offsets
+
+    # 获取事件标记数组
+    def GetFlags(self) -> np.ndarray:
+        return self._flags
+
+    # 获取 (分钟偏移, 事件标记) 列表
+    def GetTicks(self) -> list[tuple[timedelta, int]]:
+        return self._ticks
+
+    # 获取当天所有分钟遍历结束后需要补发的事件
+    def GetTrailingFlag(self) -> int:
+        return self._trailing_flag
+
+    # OnTradeDayStart 触发时间距当天零点的分钟数
+    def GetTradeDayStartMinute(self) -> int:
+        return self._start_minute
+
+    # OnTradeDayEnd 触发时间距当天零点的分钟数
+    def GetTradeDayEndMinute(self) -> int:
+        return self._end_minute
+
+    # OnTradeDayStart 触发时间距当天零点的时间差
+    def GetTradeDayStartDelta(self) -> timedelta:
+        return self._start_delta
+
+    # OnTradeDayEnd 触发时间距当天零点的时间差
+    def GetTradeDayEndDelta(self) -> timedelta:
+        return self._end_delta
+
+    def __len__(self) -> int:
+        return len(self._offsets)
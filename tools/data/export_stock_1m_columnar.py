@@ -0,0 +1,100 @@
+# 将 tframe_stock_1m 中的股票1分钟数据导出为列式存储，供 ColumnarStockData 读取
+# 用法: python export_stock_1m_columnar.py <输出目录> [证券代码 ...]
+# 不指定证券代码时导出全部表
+# 输出格式 <输出目录>/<证券代码>/<列名>.npy，每只股票先写到临时目录，完成后整体替换，读取方不会看到写了一半的数据
+# 替换时先把旧目录改名为 .old，再把临时目录改名为正式目录，最后删除旧目录；中途崩溃时下次导出会先恢复旧目录
+
+import numpy as np
+import mysql.connector
+import os
+import shutil
+import sys
+sys.path.append('/www/dk_project/dk_app/alpine/data/trading_v2/tframe-strategy')
+from tframe.common.config_reader import ConfigReader
+from tframe.stockdata.columnar_stockdata import COLUMNAR_COLUMNS
+
+DB_DATABASE = "tframe_stock_1m"
+FETCH_SIZE = 100000
+
+
+# 导出单只股票
+def export_table(conn, table_name, output_path):
+    cursor = conn.cursor()
+    # 在 sql 中完成类型转换：时间戳转为分钟数，DECIMAL 转为 double
+    cursor.execute(f"""
+        SELECT
+            TIMESTAMPDIFF(MINUTE, '1970-01-01 00:00:00', timestamp),
+            open + 0E0,
+            high + 0E0,
+            low + 0E0,
+            close + 0E0,
+            COALESCE(volume, 0),
+            amount + 0E0
+        FROM `{table_name}`
+        ORDER BY timestamp ASC
+    """)
+    chunks = {name: [] for name in COLUMNAR_COLUMNS}
+    rows_total = 0
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            break
+        rows_total += len(rows)
+        # 一次转换为二维 float64 数组，None 转为 NaN；整数列单独转换，避免经过 float64 损失精度
+        values = np.array(rows, dtype=np.float64)
+        for index, (name, dtype) in enumerate(COLUMNAR_COLUMNS.items()):
+            if dtype == np.float64:
+                chunks[name].append(values[:, index].copy())
+            else:
+                chunks[name].append(np.fromiter((row[index] for row in rows), dtype=dtype, count=len(rows)))
+    cursor.close()
+
+    target_dir = os.path.join(output_path, table_name)
+    temp_dir = target_dir + ".tmp"
+    old_dir = target_dir + ".old"
+    # 上次导出在替换过程中崩溃
+    if os.path.exists(old_dir):
+        if os.path.exists(target_dir):
+            shutil.rmtree(old_dir)
+        else:
+            os.rename(old_dir, target_dir)
+    if os.path.exists(temp_dir):
+        shutil.rmtree(temp_dir)
+    os.makedirs(temp_dir)
+    for name, dtype in COLUMNAR_COLUMNS.items():
+        column = np.concatenate(chunks[name]) if chunks[name] else np.empty(0, dtype=dtype)
+        np.save(os.path.join(temp_dir, f"{name}.npy"), column)
+
+    if os.path.exists(target_dir):
+        os.rename(target_dir, old_dir)
+    os.rename(temp_dir, target_dir)
+    if os.path.exists(old_dir):
+        shutil.rmtree(old_dir)
+    print(f"Exported {table_name}: {rows_total} rows")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python export_stock_1m_columnar.py <output_path> [stock_id ...]")
+        sys.exit(1)
+    output_path = sys.argv[1]
+    os.makedirs(output_path, exist_ok=True)
+
+    db_config = ConfigReader().get_db_config()
+    db_config['database'] = DB_DATABASE
+    conn = mysql.connector.connect(**db_config)
+    try:
+        table_names = sys.argv[2:]
+        if not table_names:
+            cursor = conn.cursor()
+            cursor.execute("SHOW TABLES")
+            table_names = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+
+        for table_name in table_names:
+            try:
+                export_table(conn, table_name, output_path)
+            except mysql.connector.Error as e:
+                print(f"Error exporting {table_name}: {e}")
+    finally:
+        conn.close()